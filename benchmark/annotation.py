@@ -0,0 +1,129 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image
+
+from benchmark.windows_stubs import install_windows_stubs
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+# The screenshot module imports pywinauto, so the stubs must be installed first.
+install_windows_stubs()
+
+from ufo.automator.ui_control.screenshot import AnnotationDecorator  # noqa: E402
+
+
+def synthetic_labels(
+    width: int, height: int, label_num: int, seed: int = 0
+) -> List[Tuple[Tuple[int, int], str, str]]:
+    """
+    Create labels spread over a frame, with the annotation colors of the control types.
+    :param width: The width of the frame.
+    :param height: The height of the frame.
+    :param label_num: The number of labels.
+    :param seed: The random seed of the positions.
+    :return: The top left coordinate, the text and the button color of each label.
+    """
+    rng = random.Random(seed)
+    colors = list(configs["ANNOTATION_COLORS"].values())
+    return [
+        (
+            (rng.randrange(width - 60), rng.randrange(height - 40)),
+            str(i + 1),
+            colors[i % len(colors)],
+        )
+        for i in range(label_num)
+    ]
+
+
+def benchmark(width: int, height: int, label_num: int, repeat: int) -> Dict[str, Any]:
+    """
+    Measure the time to annotate a frame, loading the font and rendering every label again as before, against pasting
+    the cached sprites.
+    :param width: The width of the frame.
+    :param height: The height of the frame.
+    :param label_num: The number of labels.
+    :param repeat: The repetitions of each measure.
+    :return: The results.
+    """
+    frame = Image.new("RGB", (width, height), "white")
+    labels = synthetic_labels(width, height, label_num)
+
+    # Before: every label loads the font and renders its button.
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        image_before = frame.copy()
+        for coordinate, label_text, button_color in labels:
+            AnnotationDecorator.clear_cache()
+            AnnotationDecorator.draw_rectangles_controls(
+                image_before, coordinate, label_text, button_color=button_color
+            )
+    uncached = (time.perf_counter() - start_time) / repeat
+
+    # After, on the first frame: the font is loaded once and each sprite is rendered once.
+    cold = 0.0
+    for _ in range(repeat):
+        AnnotationDecorator.clear_cache()
+        start_time = time.perf_counter()
+        image_after = AnnotationDecorator.draw_labels(frame.copy(), labels)
+        cold += time.perf_counter() - start_time
+    cold /= repeat
+
+    # After, on the next frames: the sprites are pasted from the cache.
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        image_after = AnnotationDecorator.draw_labels(frame.copy(), labels)
+    warm = (time.perf_counter() - start_time) / repeat
+
+    return {
+        "font": getattr(AnnotationDecorator.load_font(), "path", "default"),
+        "frame_ms_before": uncached * 1000,
+        "frame_ms_after_cold": cold * 1000,
+        "frame_ms_after_warm": warm * 1000,
+        "pixel_identical": image_before.tobytes() == image_after.tobytes(),
+    }
+
+
+def main():
+    """
+    Main function.
+    """
+    args = argparse.ArgumentParser()
+    args.add_argument("--width", help="The width of the frame.", type=int, default=3840)
+    args.add_argument(
+        "--height", help="The height of the frame.", type=int, default=2160
+    )
+    args.add_argument("--labels", help="The number of labels.", type=int, default=1000)
+    args.add_argument(
+        "--repeat", help="The repetitions of each measure.", type=int, default=5
+    )
+    args.add_argument(
+        "--output", help="The json file to save the results.", type=str, default=""
+    )
+    parsed_args = args.parse_args()
+
+    results = benchmark(
+        parsed_args.width, parsed_args.height, parsed_args.labels, parsed_args.repeat
+    )
+
+    print(f"Font: {results['font']}")
+    print(f"{'':>24}{'ms per frame':>14}")
+    print(f"{'before':>24}{results['frame_ms_before']:>14.1f}")
+    print(f"{'after, first frame':>24}{results['frame_ms_after_cold']:>14.1f}")
+    print(f"{'after, next frames':>24}{results['frame_ms_after_warm']:>14.1f}")
+    print(f"Pixel-identical to the uncached rendering: {results['pixel_identical']}")
+
+    if parsed_args.output:
+        with open(parsed_args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
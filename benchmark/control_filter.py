@@ -0,0 +1,132 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+from ufo.automator.ui_control.control_filter import SemanticControlFilter
+
+
+WORDS = [
+    "file", "home", "insert", "design", "layout", "references", "mailings", "review",
+    "view", "help", "save", "undo", "redo", "bold", "italic", "underline", "font",
+    "size", "color", "paste", "copy", "cut", "format", "painter", "styles", "find",
+    "replace", "select", "table", "picture", "shapes", "chart", "comment", "share",
+]
+
+PLANS = [
+    "Click the Insert tab to open the insert ribbon.",
+    "Click the Table button and select a 3x3 table.",
+]
+
+
+def synthetic_controls(control_num: int, seed: int = 0) -> Dict[str, SimpleNamespace]:
+    """
+    Create synthetic controls that only carry the element_info.name read by the filter.
+    :param control_num: The number of controls.
+    :param seed: The random seed.
+    :return: The annotation dictionary of the synthetic controls.
+    """
+    rng = random.Random(seed)
+    return {
+        str(i + 1): SimpleNamespace(
+            element_info=SimpleNamespace(
+                name=" ".join(rng.sample(WORDS, rng.randint(1, 3))).title()
+            )
+        )
+        for i in range(control_num)
+    }
+
+
+def benchmark(
+    model_name: str, control_nums: List[int], top_k: int, repeat: int
+) -> List[Dict[str, float]]:
+    """
+    Measure the latency of the batched filter against the previous per-control scoring.
+    :param model_name: The sentence transformer model of the filter.
+    :param control_nums: The numbers of controls to test.
+    :param top_k: The top k of the filter.
+    :param repeat: The repetitions of each measurement.
+    :return: The results.
+    """
+    control_filter = SemanticControlFilter(model_name)
+    # Warm up the model.
+    control_filter.control_filter(synthetic_controls(10), PLANS, top_k)
+
+    results = []
+    for control_num in control_nums:
+        control_dicts = synthetic_controls(control_num)
+
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            control_filter.control_filter(control_dicts, PLANS, top_k)
+        batched_time = (time.perf_counter() - start_time) / repeat
+
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            for control_item in control_dicts.values():
+                control_filter.control_filter_score(
+                    control_item.element_info.name.lower(), PLANS
+                )
+        per_control_time = (time.perf_counter() - start_time) / repeat
+
+        results.append(
+            {
+                "controls": control_num,
+                "batched_ms": batched_time * 1000,
+                "per_control_ms": per_control_time * 1000,
+                "speedup": per_control_time / batched_time,
+            }
+        )
+    return results
+
+
+def main():
+    """
+    Main function.
+    """
+    args = argparse.ArgumentParser()
+    args.add_argument(
+        "--model",
+        help="The sentence transformer model of the semantic filter.",
+        type=str,
+        default="all-MiniLM-L6-v2",
+    )
+    args.add_argument(
+        "--controls",
+        help="The numbers of synthetic controls.",
+        type=int,
+        nargs="+",
+        default=[50, 300, 1000],
+    )
+    args.add_argument("--top_k", help="The filter top k.", type=int, default=15)
+    args.add_argument(
+        "--repeat", help="The repetitions of each measurement.", type=int, default=3
+    )
+    args.add_argument(
+        "--output", help="The json file to save the results.", type=str, default=""
+    )
+    parsed_args = args.parse_args()
+
+    results = benchmark(
+        parsed_args.model, parsed_args.controls, parsed_args.top_k, parsed_args.repeat
+    )
+
+    print(f"{'controls':>10}{'batched ms':>14}{'per-control ms':>18}{'speedup':>10}")
+    for result in results:
+        print(
+            f"{result['controls']:>10}{result['batched_ms']:>14.1f}"
+            f"{result['per_control_ms']:>18.1f}{result['speedup']:>10.1f}"
+        )
+
+    if parsed_args.output:
+        with open(parsed_args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
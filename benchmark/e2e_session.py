@@ -0,0 +1,352 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from benchmark.windows_stubs import install_windows_stubs
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+# The modules of the sessions import pywinauto, so the stubs must be installed first.
+install_windows_stubs()
+
+from ufo.agents.states.host_agent_state import ContinueHostAgentState  # noqa: E402
+from ufo.automator.ui_control.fake_desktop import FakeDesktop  # noqa: E402
+from ufo.llm.service_pool import ServicePool  # noqa: E402
+from ufo.module.basic import BaseRound, BaseSession  # noqa: E402
+from ufo.module.context import ContextNames  # noqa: E402
+
+
+class BenchmarkSession(BaseSession):
+    """
+    A session running a single round of a fixed request, without asking the user.
+    """
+
+    def __init__(self, task: str, request: str) -> None:
+        """
+        Initialize the session.
+        :param task: The name of the task, the logs are saved in logs/<task>/.
+        :param request: The request of the round.
+        """
+        self._request = request
+        super().__init__(task, should_evaluate=False, id=0)
+
+    def _init_context(self) -> None:
+        """
+        Initialize the context.
+        """
+        super()._init_context()
+
+        self.context.set(ContextNames.MODE, "normal")
+
+    def create_new_round(self) -> Optional[BaseRound]:
+        """
+        Create the round of the request, or None once it is run.
+        :return: The round.
+        """
+        request = self.next_request()
+        if self.is_finished():
+            return None
+
+        self._host_agent.set_state(ContinueHostAgentState())
+
+        round = BaseRound(
+            request=request,
+            agent=self._host_agent,
+            context=self.context,
+            should_evaluate=False,
+            id=self.total_rounds,
+        )
+        self.add_round(round.id, round)
+        return round
+
+    def next_request(self) -> str:
+        """
+        Get the request of the round.
+        :return: The request, empty once the round is run.
+        """
+        if self.total_rounds > 0:
+            self._finish = True
+            return ""
+        return self._request
+
+    def request_to_evaluate(self) -> str:
+        """
+        Get the request to evaluate.
+        :return: The request.
+        """
+        return self._request
+
+
+def host_agent_script(desktop: FakeDesktop) -> List[Dict[str, Any]]:
+    """
+    Create the responses of the HostAgent: select the first application, then finish once the AppAgent is done.
+    :param desktop: The fake desktop.
+    :return: The responses.
+    """
+    window = desktop.windows()[0]
+    select_application = {
+        "Observation": "The fake application is open on the desktop.",
+        "Thought": "The request is completed in the fake application.",
+        "CurrentSubtask": "Click the controls of the fake application.",
+        "Message": [],
+        "ControlLabel": "1",
+        "ControlText": window.window_text(),
+        "Status": "CONTINUE",
+        "Plan": [],
+        "Questions": [],
+        "Comment": "Selecting the fake application.",
+    }
+    finish = dict(
+        select_application,
+        CurrentSubtask="",
+        ControlLabel="",
+        ControlText="",
+        Status="FINISH",
+        Comment="The request is completed.",
+    )
+    return [select_application, finish]
+
+
+def app_agent_script(desktop: FakeDesktop, steps: int) -> List[Dict[str, Any]]:
+    """
+    Create the responses of the AppAgent: click a different control at each step, and finish at the last step.
+    :param desktop: The fake desktop.
+    :param steps: The number of steps of the AppAgent.
+    :return: The responses.
+    """
+    controls = desktop.windows()[0].descendants()
+    responses = []
+    for step in range(steps):
+        index = step % len(controls)
+        is_last = step == steps - 1
+        responses.append(
+            {
+                "Observation": "The fake application shows its controls.",
+                "Thought": f"I need to click the control {index + 1}.",
+                "ControlLabel": "" if is_last else str(index + 1),
+                "ControlText": "" if is_last else controls[index].window_text(),
+                "Function": "" if is_last else "click_input",
+                "Args": {} if is_last else {"button": "left", "double": False},
+                "Status": "FINISH" if is_last else "CONTINUE",
+                "Plan": [] if is_last else [f"Click the control {index + 2}."],
+                "Questions": [],
+                "Comment": "Clicking the controls one by one.",
+                "SaveScreenshot": {"save": False, "reason": ""},
+            }
+        )
+    return responses
+
+
+def configure(
+    desktop: FakeDesktop, steps: int, latency: float, trace_memory: bool
+) -> None:
+    """
+    Configure UFO to run on the fake desktop with the scripted LLM, without the waits meant for the real desktop and
+    without the features calling other services.
+    :param desktop: The fake desktop.
+    :param steps: The number of steps of the AppAgent.
+    :param latency: The latency of each completion in seconds.
+    :param trace_memory: Whether to trace the peak memory allocated in each phase.
+    """
+    configs.update(
+        {
+            "FAKE_DESKTOP": True,
+            "PROFILE_PHASES": True,
+            "PROFILE_MEMORY": trace_memory,
+            "MAX_STEP": steps + 10,
+            "SLEEP_TIME": 0,
+            "SETTLE_WAIT": False,
+            "RECTANGLE_TIME": 0,
+            "SAFE_GUARD": False,
+            "HEDGE_REQUESTS": False,
+            "ACTION_CACHE": False,
+            "USE_CUSTOMIZATION": False,
+            "RAG_OFFLINE_DOCS": False,
+            "RAG_ONLINE_SEARCH": False,
+            "RAG_EXPERIENCE": False,
+            "RAG_DEMONSTRATION": False,
+            "EVA_SESSION": False,
+            "EVA_ROUND": False,
+        }
+    )
+
+    scripts = {
+        "HOST_AGENT": host_agent_script(desktop),
+        "APP_AGENT": app_agent_script(desktop, steps),
+        "BACKUP_AGENT": app_agent_script(desktop, steps),
+    }
+    for agent_type, script in scripts.items():
+        configs[agent_type] = dict(
+            configs.get(agent_type, {}),
+            API_TYPE="scripted",
+            API_BASE="",
+            SCRIPT=script,
+            LATENCY=latency,
+        )
+
+    # The scripted services keep their position in the script, every session starts from new services.
+    ServicePool.clear()
+
+
+def run_scenario(
+    control_num: int, steps: int, latency: float, trace_memory: bool
+) -> Dict[str, Any]:
+    """
+    Run a session on a synthetic desktop and measure it.
+    :param control_num: The number of controls of the application window.
+    :param steps: The number of steps of the AppAgent.
+    :param latency: The latency of each completion in seconds.
+    :param trace_memory: Whether to trace the peak memory allocated in each phase.
+    :return: The results of the scenario.
+    """
+    desktop = FakeDesktop.synthetic(window_num=1, control_num=control_num)
+    FakeDesktop.use(desktop)
+    configure(desktop, steps, latency, trace_memory)
+
+    session = BenchmarkSession(
+        f"benchmark/e2e_{control_num}_controls_{steps}_steps",
+        "Click the controls of the fake application one by one.",
+    )
+
+    process = psutil.Process(os.getpid())
+    rss_before = process.memory_info().rss
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    start_time = time.perf_counter()
+    session.run()
+    elapsed = time.perf_counter() - start_time
+
+    profiler = session.context.get(ContextNames.PROFILER)
+    return {
+        "controls": control_num,
+        "steps": session.step,
+        "app_agent_steps": steps,
+        "latency": latency,
+        "time": elapsed,
+        "steps_per_second": session.step / elapsed if elapsed else 0.0,
+        "actions": len(desktop.action_log),
+        "error": session.is_error(),
+        "rss_growth_bytes": process.memory_info().rss - rss_before,
+        "traced_peak_bytes": (
+            tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        ),
+        "phases": profiler.summary() if profiler is not None else {},
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    """
+    Print the change of the steps per second against the results of a previous run.
+    :param results: The results of the scenarios.
+    :param baseline_path: The json file of the previous run.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {
+            (scenario["controls"], scenario["app_agent_steps"]): scenario
+            for scenario in json.load(f)["scenarios"]
+        }
+
+    print(
+        f"{'controls':>10}{'steps':>8}{'baseline/s':>12}{'current/s':>12}{'change':>10}"
+    )
+    for scenario in results:
+        previous = baseline.get((scenario["controls"], scenario["app_agent_steps"]))
+        if previous is None or not previous["steps_per_second"]:
+            continue
+        change = scenario["steps_per_second"] / previous["steps_per_second"] - 1
+        print(
+            f"{scenario['controls']:>10}{scenario['app_agent_steps']:>8}"
+            f"{previous['steps_per_second']:>12.2f}{scenario['steps_per_second']:>12.2f}"
+            f"{change:>+10.1%}"
+        )
+
+
+def main():
+    """
+    Main function.
+    """
+    args = argparse.ArgumentParser()
+    args.add_argument(
+        "--controls",
+        help="The numbers of controls of the application window.",
+        type=int,
+        nargs="+",
+        default=[50, 500, 5000],
+    )
+    args.add_argument(
+        "--steps",
+        help="The numbers of steps of the AppAgent in a session.",
+        type=int,
+        nargs="+",
+        default=[10, 100],
+    )
+    args.add_argument(
+        "--latency",
+        help="The latency of each scripted completion in seconds.",
+        type=float,
+        default=0.0,
+    )
+    args.add_argument(
+        "--trace_memory",
+        help="Trace the peak memory allocated in each phase, slowing the steps down.",
+        action="store_true",
+    )
+    args.add_argument(
+        "--baseline",
+        help="The json file of a previous run to compare with.",
+        type=str,
+        default="",
+    )
+    args.add_argument(
+        "--output", help="The json file to save the results.", type=str, default=""
+    )
+    parsed_args = args.parse_args()
+
+    results = [
+        run_scenario(control_num, steps, parsed_args.latency, parsed_args.trace_memory)
+        for control_num in parsed_args.controls
+        for steps in parsed_args.steps
+    ]
+
+    print(
+        f"{'controls':>10}{'steps':>8}{'time s':>10}{'steps/s':>10}"
+        f"{'AppAgent p50 ms':>17}{'AppAgent p95 ms':>17}"
+    )
+    for scenario in results:
+        total = scenario["phases"].get("AppAgent", {}).get("total", {})
+        print(
+            f"{scenario['controls']:>10}{scenario['steps']:>8}{scenario['time']:>10.2f}"
+            f"{scenario['steps_per_second']:>10.2f}"
+            f"{total.get('p50', 0) * 1000:>17.1f}{total.get('p95', 0) * 1000:>17.1f}"
+        )
+
+    if parsed_args.baseline:
+        compare(results, parsed_args.baseline)
+
+    if parsed_args.output:
+        with open(parsed_args.output, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "scenarios": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Dict, List
+
+from PIL import Image, ImageDraw
+
+from ufo.automator.ui_control.screenshot import ImageEncodingPolicy
+
+
+POLICIES = {
+    "png_native": ImageEncodingPolicy(),
+    "png_max1920": ImageEncodingPolicy(max_edge=1920),
+    "jpeg_q85": ImageEncodingPolicy(format="JPEG", quality=85),
+    "jpeg_q70_max1920": ImageEncodingPolicy(format="JPEG", quality=70, max_edge=1920),
+    "webp_q80": ImageEncodingPolicy(format="WEBP", quality=80),
+    "webp_q80_max1920": ImageEncodingPolicy(format="WEBP", quality=80, max_edge=1920),
+}
+
+
+def sample_screenshot(width: int = 3840, height: int = 2160) -> Image.Image:
+    """
+    Draw a synthetic screenshot with window-like blocks and text, used when no sample screenshot is given.
+    :param width: The width of the screenshot.
+    :param height: The height of the screenshot.
+    :return: The screenshot.
+    """
+    image = Image.new("RGB", (width, height), "#F3F3F3")
+    draw = ImageDraw.Draw(image)
+    for i in range(0, height, 40):
+        draw.rectangle((0, i, width, i + 32), fill="#FFFFFF" if i % 80 else "#E5E5E5")
+        draw.text((10 + (i * 7) % 200, i + 8), f"Sample control text {i}", fill="#000000")
+    for i in range(0, width, 240):
+        draw.rectangle((i, 0, i + 200, 60), outline="#0078D4", width=2)
+    return image
+
+
+def benchmark(images: Dict[str, Image.Image], repeat: int) -> List[Dict[str, float]]:
+    """
+    Encode every image with every policy and measure the payload size and the encode time.
+    :param images: The images keyed by their names.
+    :param repeat: The number of repetitions of each encoding.
+    :return: The results.
+    """
+    results = []
+    for image_name, image in images.items():
+        for policy_name, policy in POLICIES.items():
+            start_time = time.perf_counter()
+            for _ in range(repeat):
+                encoded = policy.encode(image)
+            encode_time = (time.perf_counter() - start_time) / repeat
+            results.append(
+                {
+                    "image": image_name,
+                    "policy": policy_name,
+                    "bytes": len(encoded),
+                    "base64_bytes": (len(encoded) + 2) // 3 * 4,
+                    "encode_ms": encode_time * 1000,
+                }
+            )
+    return results
+
+
+def main():
+    """
+    Main function.
+    """
+    args = argparse.ArgumentParser()
+    args.add_argument(
+        "--images",
+        help="The sample screenshots, a file or a folder of png files. A synthetic 4K screenshot is used if not given.",
+        type=str,
+        default="",
+    )
+    args.add_argument(
+        "--repeat", help="The repetitions of each encoding.", type=int, default=3
+    )
+    args.add_argument(
+        "--output", help="The json file to save the results.", type=str, default=""
+    )
+    parsed_args = args.parse_args()
+
+    if os.path.isdir(parsed_args.images):
+        paths = sorted(glob.glob(os.path.join(parsed_args.images, "*.png")))
+    elif parsed_args.images:
+        paths = [parsed_args.images]
+    else:
+        paths = []
+
+    images = {os.path.basename(path): Image.open(path).convert("RGB") for path in paths}
+    if not images:
+        images = {"synthetic_4k": sample_screenshot()}
+
+    results = benchmark(images, parsed_args.repeat)
+
+    print(f"{'image':<32}{'policy':<20}{'bytes':>12}{'base64':>12}{'encode ms':>12}")
+    for result in results:
+        print(
+            f"{result['image']:<32}{result['policy']:<20}{result['bytes']:>12}"
+            f"{result['base64_bytes']:>12}{result['encode_ms']:>12.1f}"
+        )
+
+    if parsed_args.output:
+        with open(parsed_args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+# The heavy packages that must only be imported by the features needing them.
+HEAVY_PACKAGES = [
+    "langchain",
+    "langchain_community",
+    "faiss",
+    "sentence_transformers",
+    "transformers",
+    "torch",
+    "nltk",
+    "openai",
+    "google.generativeai",
+    "dashscope",
+    "pandas",
+    "requests",
+    "html2text",
+]
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse the report of python -X importtime.
+    :param output: The standard error of the interpreter.
+    :return: The imported modules, with their self and cumulative times in microseconds.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|", 2)
+        modules.append((name.strip(), int(self_time), int(cumulative)))
+    return modules
+
+
+def measure(module: str) -> Dict[str, Any]:
+    """
+    Import a module in a new interpreter and measure the import time.
+    :param module: The module to import.
+    :return: The wall time of the interpreter, the cumulative import time of the module and the imported modules.
+    """
+    start_time = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    wall = time.perf_counter() - start_time
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}:\n{process.stderr}")
+
+    modules = parse_importtime(process.stderr)
+    import_time = next(
+        (cumulative for name, _, cumulative in modules if name == module), 0
+    )
+    return {"wall": wall, "import_time": import_time / 1e6, "modules": modules}
+
+
+def summarize(runs: List[Dict[str, Any]], top: int, budget: float) -> Dict[str, Any]:
+    """
+    Summarize the runs.
+    :param runs: The measures of the runs.
+    :param top: The number of the slowest packages reported.
+    :param budget: The import time budget in seconds.
+    :return: The summary.
+    """
+    import_time = statistics.median(run["import_time"] for run in runs)
+
+    # The self time of the modules of the last run, aggregated by top-level package.
+    packages: Dict[str, int] = defaultdict(int)
+    names = set()
+    for name, self_time, _ in runs[-1]["modules"]:
+        packages[name.split(".")[0]] += self_time
+        names.add(name)
+
+    return {
+        "import_time": import_time,
+        "first_wall": runs[0]["wall"],
+        "median_wall": statistics.median(run["wall"] for run in runs),
+        "module_count": len(names),
+        "budget": budget,
+        "goal_met": import_time < budget,
+        "heavy_packages": [package for package in HEAVY_PACKAGES if package in names],
+        "slowest_packages": [
+            {"package": package, "self_time": self_time / 1e6}
+            for package, self_time in sorted(
+                packages.items(), key=lambda item: item[1], reverse=True
+            )[:top]
+        ],
+    }
+
+
+def main():
+    """
+    Main function.
+    """
+    args = argparse.ArgumentParser()
+    args.add_argument(
+        "--module",
+        help="The module to import, by default the CLI of UFO.",
+        type=str,
+        default="ufo.ufo",
+    )
+    args.add_argument(
+        "--repeat", help="The number of interpreters started.", type=int, default=5
+    )
+    args.add_argument(
+        "--top", help="The number of the slowest packages.", type=int, default=15
+    )
+    args.add_argument(
+        "--budget", help="The import time budget in seconds.", type=float, default=1.0
+    )
+    args.add_argument(
+        "--output", help="The json file to save the results.", type=str, default=""
+    )
+    parsed_args = args.parse_args()
+
+    runs = [measure(parsed_args.module) for _ in range(parsed_args.repeat)]
+    results = dict(
+        summarize(runs, parsed_args.top, parsed_args.budget), module=parsed_args.module
+    )
+
+    print(f"{'package':>24}{'self ms':>12}")
+    for package in results["slowest_packages"]:
+        print(f"{package['package']:>24}{package['self_time'] * 1000:>12.1f}")
+    print(
+        f"Import time of {parsed_args.module}: {results['import_time'] * 1000:.1f} ms "
+        f"(budget {parsed_args.budget * 1000:.0f} ms, met: {results['goal_met']}), "
+        f"{results['module_count']} modules, first start {results['first_wall'] * 1000:.1f} ms."
+    )
+    print(f"Heavy packages imported: {', '.join(results['heavy_packages']) or 'none'}")
+
+    if parsed_args.output:
+        with open(parsed_args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from ufo.config.config import Config
+from ufo.prompter.agent_prompter import AppAgentPrompter, HostAgentPrompter
+from ufo.prompter.basic import BasicPrompter
+
+configs = Config.get_instance().config_data
+
+
+def dynamic_examples(example_num: int) -> List[Dict[str, str]]:
+    """
+    Create retrieved examples in the format of the experience and demonstration examples.
+    :param example_num: The number of examples.
+    :return: The examples.
+    """
+    return [
+        {
+            "Request": f"Insert a {i + 2}x{i + 2} table in the document.",
+            "Response": {
+                "Observation": "The Word document is open with the Home tab selected.",
+                "Thought": "I need to open the Insert tab to find the Table button.",
+                "ControlLabel": str(i + 1),
+                "ControlText": "Insert",
+                "Function": "click_input",
+                "Args": {"button": "left", "double": False},
+                "Status": "CONTINUE",
+                "Plan": ["Click the Table button.", "Select the table size."],
+                "Comment": "Opening the Insert tab.",
+            },
+        }
+        for i in range(example_num)
+    ]
+
+
+def create_prompters(is_visual: bool) -> List[BasicPrompter]:
+    """
+    Create the prompters of the HostAgent and the AppAgent from the configured templates.
+    :param is_visual: Whether the prompters are for visual models.
+    :return: The HostAgent and AppAgent prompters.
+    """
+    return [
+        HostAgentPrompter(
+            is_visual,
+            configs["HOSTAGENT_PROMPT"],
+            configs["HOSTAGENT_EXAMPLE_PROMPT"],
+            configs["API_PROMPT"],
+        ),
+        AppAgentPrompter(
+            is_visual,
+            configs["APPAGENT_PROMPT"],
+            configs["APPAGENT_EXAMPLE_PROMPT"],
+            configs["API_PROMPT"],
+            "WINWORD.EXE",
+        ),
+    ]
+
+
+def build_system_prompts(
+    prompters: List[BasicPrompter], examples: List[Dict[str, str]], tips: List[str]
+) -> List[str]:
+    """
+    Build the system prompts of one step.
+    :param prompters: The HostAgent and AppAgent prompters.
+    :param examples: The dynamic examples of the AppAgent.
+    :param tips: The dynamic tips of the AppAgent.
+    :return: The system prompts.
+    """
+    host_prompter, app_prompter = prompters
+    return [
+        host_prompter.system_prompt_construction(),
+        app_prompter.system_prompt_construction(examples, tips),
+    ]
+
+
+def benchmark(
+    is_visual: bool, steps: int, example_num: int, repeat: int
+) -> Dict[str, float]:
+    """
+    Measure the prompter creation time and the system prompt build time per step, with and without the caches.
+    :param is_visual: Whether the prompters are for visual models.
+    :param steps: The number of steps of a simulated round.
+    :param example_num: The number of dynamic examples.
+    :param repeat: The repetitions of the prompter creation.
+    :return: The results.
+    """
+    examples = dynamic_examples(example_num)
+    tips = [f"Tip {i}: check the ribbon before clicking." for i in range(example_num)]
+
+    # Prompter creation: parsing the YAML templates every time, against copying the cached templates.
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        BasicPrompter.clear_template_cache()
+        create_prompters(is_visual)
+    uncached_creation = (time.perf_counter() - start_time) / repeat
+
+    create_prompters(is_visual)
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        create_prompters(is_visual)
+    cached_creation = (time.perf_counter() - start_time) / repeat
+
+    # System prompts: rendering them at every step, against the memoized prompts.
+    prompters = create_prompters(is_visual)
+    start_time = time.perf_counter()
+    for _ in range(steps):
+        for prompter in prompters:
+            prompter._system_prompt_cache.clear()
+        build_system_prompts(prompters, examples, tips)
+    uncached_step = (time.perf_counter() - start_time) / steps
+
+    prompts = [build_system_prompts(prompters, examples, tips)]
+    start_time = time.perf_counter()
+    for _ in range(steps):
+        prompts.append(build_system_prompts(prompters, examples, tips))
+    cached_step = (time.perf_counter() - start_time) / steps
+
+    return {
+        "prompter_creation_ms_before": uncached_creation * 1000,
+        "prompter_creation_ms_after": cached_creation * 1000,
+        "system_prompt_ms_per_step_before": uncached_step * 1000,
+        "system_prompt_ms_per_step_after": cached_step * 1000,
+        "byte_stable": all(step_prompts == prompts[0] for step_prompts in prompts),
+    }
+
+
+def main():
+    """
+    Main function.
+    """
+    args = argparse.ArgumentParser()
+    args.add_argument(
+        "--nonvisual", help="Use the non-visual templates.", action="store_true"
+    )
+    args.add_argument(
+        "--steps", help="The number of steps of a round.", type=int, default=50
+    )
+    args.add_argument(
+        "--examples", help="The number of dynamic examples.", type=int, default=3
+    )
+    args.add_argument(
+        "--repeat",
+        help="The repetitions of the prompter creation.",
+        type=int,
+        default=20,
+    )
+    args.add_argument(
+        "--output", help="The json file to save the results.", type=str, default=""
+    )
+    parsed_args = args.parse_args()
+
+    results = benchmark(
+        not parsed_args.nonvisual,
+        parsed_args.steps,
+        parsed_args.examples,
+        parsed_args.repeat,
+    )
+
+    print(f"{'':>24}{'before ms':>12}{'after ms':>12}")
+    print(
+        f"{'prompter creation':>24}{results['prompter_creation_ms_before']:>12.3f}"
+        f"{results['prompter_creation_ms_after']:>12.3f}"
+    )
+    print(
+        f"{'system prompt per step':>24}"
+        f"{results['system_prompt_ms_per_step_before']:>12.3f}"
+        f"{results['system_prompt_ms_per_step_after']:>12.3f}"
+    )
+    print(f"System prompts byte-stable across steps: {results['byte_stable']}")
+
+    if parsed_args.output:
+        with open(parsed_args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
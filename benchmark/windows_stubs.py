@@ -0,0 +1,36 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import types
+
+
+def install_windows_stubs() -> None:
+    """
+    Install placeholder modules for the Windows-only packages imported by the agents and the sessions, so that the
+    sessions run on the fake desktop on Linux. The fake desktop never calls them, and the real packages are used when
+    they can be imported.
+    """
+    try:
+        import pywinauto.controls.uiawrapper  # noqa: F401
+    except ImportError:
+        placeholder = type("WindowsOnly", (), {})
+        modules = {
+            "pywinauto": {"Desktop": placeholder},
+            "pywinauto.controls": {},
+            "pywinauto.controls.uiawrapper": {"UIAWrapper": placeholder},
+            "pywinauto.win32structures": {"RECT": placeholder},
+        }
+        for name, attributes in modules.items():
+            module = types.ModuleType(name)
+            module.__dict__.update(attributes)
+            sys.modules[name] = module
+
+    try:
+        import win32com.client  # noqa: F401
+    except ImportError:
+        client = types.ModuleType("win32com.client")
+        client.CDispatch = type("WindowsOnly", (), {})
+        sys.modules["win32com"] = types.ModuleType("win32com")
+        sys.modules["win32com"].client = client
+        sys.modules["win32com.client"] = client
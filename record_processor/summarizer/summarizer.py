@@ -6,13 +6,13 @@ from typing import Tuple
 
 import yaml
 from langchain.docstore.document import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 
 from record_processor.parser.demonstration_record import DemonstrationRecord
 from record_processor.utils import json_parser
 from ufo.llm.llm_call import get_completions
 from ufo.prompter.demonstration_prompter import DemonstrationPrompter
+from ufo.rag.registry import EmbeddingModelRegistry, VectorDBRegistry
 
 
 class DemonstrationSummarizer:
@@ -183,16 +183,15 @@ class DemonstrationSummarizer:
             request = summary["request"]
             document_list.append(Document(page_content=request, metadata=summary))
 
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2"
-        )
+        embeddings = EmbeddingModelRegistry.get_embedding_model()
         db = FAISS.from_documents(document_list, embeddings)
 
         # Check if the db exists, if not, create a new one.
         if os.path.exists(db_path):
-            prev_db = FAISS.load_local(db_path, embeddings)
+            prev_db = VectorDBRegistry.load_local(db_path)
             db.merge_from(prev_db)
 
         db.save_local(db_path)
+        VectorDBRegistry.invalidate(db_path)
 
         print(f"Updated vector DB successfully: {db_path}")
@@ -0,0 +1,188 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from typing import Optional
+
+import pytest
+
+from ufo.automator.ui_control.text_input import (
+    ChunkedTypeKeysInput,
+    ClipboardPasteInput,
+    TextInputManager,
+)
+
+APP = "app.exe"
+
+
+class Clipboard:
+    """
+    A clipboard holding a text.
+    """
+
+    def __init__(self, text: Optional[str] = None) -> None:
+        self.text = text
+
+    def get_text(self) -> Optional[str]:
+        return self.text
+
+    def set_text(self, text: Optional[str]) -> None:
+        self.text = text
+
+
+class ElementInfo:
+    def __init__(self, control_type: str) -> None:
+        self.control_type = control_type
+
+
+class Control:
+    """
+    An edit control without the ValuePattern, whose paste can be made to fail.
+    :param paste: What a paste does: "works", "ignored" or "mangled", which enters only a part of the text.
+    """
+
+    def __init__(
+        self, text: str = "", control_type: str = "Edit", paste: str = "works"
+    ) -> None:
+        self.text = text
+        self.element_info = ElementInfo(control_type)
+        self.paste = paste
+        self.clipboard = Clipboard()
+        self.calls = []
+
+    def window_text(self) -> str:
+        return self.text
+
+    def type_keys(self, keys: str, **kwargs) -> str:
+        self.calls.append(keys)
+        if keys == "^a{BACKSPACE}":
+            self.text = ""
+        elif keys in ("^v", "^a^v"):
+            if self.paste == "ignored":
+                return ""
+            pasted = self.clipboard.get_text() or ""
+            if self.paste == "mangled":
+                pasted = pasted[: len(pasted) // 2]
+            self.text = pasted if keys == "^a^v" else self.text + pasted
+        else:
+            self.text += keys
+        return ""
+
+
+class ValueControl(Control):
+    """
+    An edit control with the ValuePattern, which can be made to fail.
+    """
+
+    def __init__(self, value_pattern_fails: bool = False, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.value_pattern_fails = value_pattern_fails
+
+    def set_edit_text(self, text: str) -> str:
+        self.calls.append("set_edit_text")
+        if self.value_pattern_fails:
+            raise RuntimeError("The ValuePattern is not supported.")
+        self.text = text
+        return ""
+
+
+@pytest.fixture(autouse=True)
+def text_input(monkeypatch):
+    """
+    Start from no learned strategy, with the clipboard of the control and without the waits of the strategies.
+    """
+    TextInputManager.clear()
+    monkeypatch.setattr(
+        TextInputManager, "clipboard_provider", lambda control: control.clipboard
+    )
+    monkeypatch.setattr(ClipboardPasteInput, "paste_delay", 0)
+    monkeypatch.setattr(ChunkedTypeKeysInput, "chunk_pause", 0)
+    yield
+    TextInputManager.clear()
+
+
+def test_replace_uses_the_value_pattern_first_and_learns_it():
+    control = ValueControl(text="old")
+
+    TextInputManager.input_text(control, "hello", APP, replace=True)
+
+    assert control.text == "hello"
+    assert control.calls == ["set_edit_text"]
+    assert TextInputManager.learned_strategies() == {(APP, "Edit"): "value_pattern"}
+
+
+def test_replace_falls_back_to_the_clipboard_then_to_typing():
+    control = ValueControl(text="old", value_pattern_fails=True, paste="ignored")
+
+    TextInputManager.input_text(control, "hello", APP, replace=True)
+
+    assert control.text == "hello"
+    assert control.calls == ["set_edit_text", "^a^v", "^a{BACKSPACE}", "hello"]
+    assert TextInputManager.learned_strategies() == {(APP, "Edit"): "type_keys"}
+
+
+def test_the_learned_strategy_is_tried_first_and_the_failed_ones_are_skipped():
+    TextInputManager.input_text(
+        ValueControl(value_pattern_fails=True), "first", APP, replace=True
+    )
+    assert TextInputManager.learned_strategies() == {(APP, "Edit"): "clipboard"}
+
+    control = ValueControl(value_pattern_fails=True)
+    TextInputManager.input_text(control, "second", APP, replace=True)
+
+    assert control.text == "second"
+    assert control.calls == ["^a^v"]
+
+
+def test_the_strategies_are_learned_per_application_and_control_type():
+    TextInputManager.input_text(
+        ValueControl(value_pattern_fails=True), "text", APP, replace=True
+    )
+    TextInputManager.input_text(ValueControl(), "text", "other.exe", replace=True)
+    TextInputManager.input_text(
+        ValueControl(control_type="Document"), "text", APP, replace=True
+    )
+
+    assert TextInputManager.learned_strategies() == {
+        (APP, "Edit"): "clipboard",
+        ("other.exe", "Edit"): "value_pattern",
+        (APP, "Document"): "value_pattern",
+    }
+
+
+def test_insert_skips_the_value_pattern_which_replaces_the_content():
+    control = ValueControl(text="a")
+
+    TextInputManager.input_text(control, "b", APP, replace=False)
+
+    assert control.text == "ab"
+    assert control.calls == ["^v"]
+
+
+def test_insert_falls_back_to_typing_when_the_paste_leaves_the_text_unchanged():
+    control = Control(text="a", paste="ignored")
+
+    TextInputManager.input_text(control, "b", APP, replace=False)
+
+    assert control.text == "ab"
+    assert control.calls == ["^v", "b"]
+
+
+def test_insert_never_enters_the_text_twice():
+    control = Control(text="a", paste="mangled")
+
+    TextInputManager.input_text(control, "bbcc", APP, replace=False)
+
+    # The paste entered a part of the text, typing the text again would duplicate that part.
+    assert control.text == "abb"
+    assert control.calls == ["^v"]
+    assert TextInputManager.learned_strategies() == {}
+
+
+def test_the_clipboard_is_restored_after_the_paste():
+    control = ValueControl(value_pattern_fails=True)
+    control.clipboard.set_text("copied by the user")
+
+    TextInputManager.input_text(control, "hello", APP, replace=True)
+
+    assert control.text == "hello"
+    assert control.clipboard.get_text() == "copied by the user"
@@ -5,17 +5,19 @@
 from __future__ import annotations
 
 import os
-from typing import Dict, List, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from ufo import utils
 from ufo.agents.agent.basic import BasicAgent
 from ufo.agents.processors.app_agent_processor import AppAgentProcessor
 from ufo.agents.states.app_agent_state import AppAgentStatus, ContinueAppAgentState
 from ufo.automator import puppeteer
+from ufo.automator.ui_control.screenshot import ImageEncodingPolicy
 from ufo.config.config import Config
 from ufo.module import interactor
 from ufo.module.context import Context
 from ufo.prompter.agent_prompter import AppAgentPrompter
+from ufo.rag.retrieval_cache import RetrievalCache
 
 configs = Config.get_instance().config_data
 
@@ -59,6 +61,20 @@ class AppAgent(BasicAgent):
         self.experience_retriever = None
         self.human_demonstration_retriever = None
 
+        # The RAG prompt fragments built from the retrieved documents, reused while the request and the retrievers are the same.
+        self._rag_prompt_cache: Dict[Tuple[Any, ...], Any] = {}
+
+        # The control tree snapshot of the last step, to take the next snapshot incrementally.
+        self.last_snapshot = None
+
+        # The action cache fingerprint of the last step, not to replay a cached action on an unchanged UI.
+        self.last_action_fingerprint = None
+
+        # The subtask of the action cache, with the signatures of its actions and the fingerprints cached so far.
+        self.action_cache_subtask = None
+        self.action_cache_history: List[str] = []
+        self.action_cache_fingerprints: Set[str] = set()
+
         self.Puppeteer = self.create_puppteer_interface()
         self.set_state(ContinueAppAgentState())
 
@@ -96,6 +112,7 @@ class AppAgent(BasicAgent):
         subtask: str,
         host_message: List[str],
         include_last_screenshot: bool,
+        ui_changes: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Union[str, List[Dict[str, str]]]]]:
         """
         Construct the prompt message for the AppAgent.
@@ -109,6 +126,7 @@ class AppAgent(BasicAgent):
         :param subtask: The subtask for the current AppAgent to process.
         :param host_message: The message from the HostAgent.
         :param include_last_screenshot: The flag indicating whether to include the last screenshot.
+        :param ui_changes: The changes of the controls since the last step.
         :return: The prompt message.
         """
         appagent_prompt_system_message = self.prompter.system_prompt_construction(
@@ -126,11 +144,14 @@ class AppAgent(BasicAgent):
             host_message=host_message,
             retrieved_docs=dynamic_knowledge,
             include_last_screenshot=include_last_screenshot,
+            ui_changes=ui_changes,
         )
 
         if not self.blackboard.is_empty():
 
-            blackboard_prompt = self.blackboard.blackboard_to_prompt()
+            blackboard_prompt = self.blackboard.blackboard_to_prompt(
+                query=subtask, policy=ImageEncodingPolicy.from_config("APP_AGENT")
+            )
             appagent_prompt_user_message = (
                 blackboard_prompt + appagent_prompt_user_message
             )
@@ -163,6 +184,22 @@ class AppAgent(BasicAgent):
         # Generate the function call string
         action = self.Puppeteer.get_command_string(function_call, args)
 
+        # Show all the actions if the response chains several actions.
+        action_list = response_dict.get("ActionList", [])
+        if (
+            configs.get("ACTION_BATCH", False)
+            and isinstance(action_list, list)
+            and len(action_list) > 1
+        ):
+            action = "; ".join(
+                self.Puppeteer.get_command_string(
+                    item.get("Function", ""),
+                    utils.revise_line_breaks(item.get("Args", {})),
+                )
+                for item in action_list
+                if isinstance(item, dict)
+            )
+
         utils.print_with_color(
             "Observations👀: {observation}".format(observation=observation), "cyan"
         )
@@ -196,6 +233,22 @@ class AppAgent(BasicAgent):
                 "yellow",
             )
 
+    def rag_prompt_memoize(self, key: Tuple[Any, ...], build: Callable[[], Any]) -> Any:
+        """
+        Memoize a prompt fragment built from the retrieved documents, so the steps with the same request do no retrieval work.
+        The key includes the generation of the retrieval cache, so the fragments are built again when an index is rebuilt.
+        :param key: The key of the fragment, including the request and the retrievers used.
+        :param build: The function building the fragment.
+        :return: The fragment.
+        """
+        key = key + (RetrievalCache.generation(),)
+        if key not in self._rag_prompt_cache:
+            # The fragments of the previous requests are not needed again.
+            if len(self._rag_prompt_cache) >= 16:
+                self._rag_prompt_cache.clear()
+            self._rag_prompt_cache[key] = build()
+        return self._rag_prompt_cache[key]
+
     def external_knowledge_prompt_helper(
         self, request: str, offline_top_k: int, online_top_k: int
     ) -> str:
@@ -207,6 +260,31 @@ class AppAgent(BasicAgent):
         :return: The prompt message for the external_knowledge.
         """
 
+        return self.rag_prompt_memoize(
+            (
+                "external_knowledge",
+                request,
+                offline_top_k,
+                online_top_k,
+                self.offline_doc_retriever,
+                self.online_doc_retriever,
+            ),
+            lambda: self._external_knowledge_prompt(
+                request, offline_top_k, online_top_k
+            ),
+        )
+
+    def _external_knowledge_prompt(
+        self, request: str, offline_top_k: int, online_top_k: int
+    ) -> str:
+        """
+        Retrieve the external knowledge and construct the prompt, without memoization.
+        :param request: The request.
+        :param offline_top_k: The number of offline documents to retrieve.
+        :param online_top_k: The number of online documents to retrieve.
+        :return: The prompt message for the external_knowledge.
+        """
+
         retrieved_docs = ""
 
         # Retrieve offline documents and construct the prompt
@@ -247,12 +325,29 @@ class AppAgent(BasicAgent):
         :return: The retrieved examples and tips string.
         """
 
+        return self.rag_prompt_memoize(
+            ("experience", request, experience_top_k, self.experience_retriever),
+            lambda: self._rag_experience_retrieve(request, experience_top_k),
+        )
+
+    def _rag_experience_retrieve(
+        self, request: str, experience_top_k: int
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Retrieving experience examples for the user request, without memoization.
+        :param request: The user request.
+        :param experience_top_k: The number of documents to retrieve.
+        :return: The retrieved examples and tips string.
+        """
+
+        app_root_name = self._app_root_name.lower()
+
         # Retrieve experience examples. Only retrieve the examples that are related to the current application.
         experience_docs = self.experience_retriever.retrieve(
             request,
             experience_top_k,
-            filter=lambda x: self._app_root_name.lower()
-            in [app.lower() for app in x["app_list"]],
+            filter=lambda x: app_root_name in [app.lower() for app in x["app_list"]],
+            filter_key=("app_list", app_root_name),
         )
 
         if experience_docs:
@@ -272,6 +367,26 @@ class AppAgent(BasicAgent):
         :return: The retrieved examples and tips string.
         """
 
+        return self.rag_prompt_memoize(
+            (
+                "demonstration",
+                request,
+                demonstration_top_k,
+                self.human_demonstration_retriever,
+            ),
+            lambda: self._rag_demonstration_retrieve(request, demonstration_top_k),
+        )
+
+    def _rag_demonstration_retrieve(
+        self, request: str, demonstration_top_k: int
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Retrieving demonstration examples for the user request, without memoization.
+        :param request: The user request.
+        :param demonstration_top_k: The number of documents to retrieve.
+        :return: The retrieved examples and tips string.
+        """
+
         # Retrieve demonstration examples.
         demonstration_docs = self.human_demonstration_retriever.retrieve(
             request, demonstration_top_k
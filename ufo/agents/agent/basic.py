@@ -5,7 +5,7 @@ from __future__ import annotations
 
 import json
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Dict, List, Optional, Type, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Type, Union
 
 from ufo import utils
 from ufo.agents.memory.memory import Memory, MemoryItem
@@ -17,7 +17,7 @@ from ufo.llm import llm_call
 from ufo.module.context import Context
 from ufo.module.interactor import question_asker
 
-# Lazy import the retriever factory to aviod long loading time.
+# Lazy import the retriever factory to aviod long loading time. The module is only imported when a retriever is built.
 retriever = utils.LazyImport("..rag.retriever")
 
 # To avoid circular import
@@ -44,12 +44,22 @@ class BasicAgent(ABC):
         self._name = name
         self._status = self.status_manager.CONTINUE.value
         self._register_self()
-        self.retriever_factory = retriever.RetrieverFactory()
+        self._retriever_factory = None
         self._memory = Memory()
         self._host = None
         self._processor: Optional[BaseProcessor] = None
         self._state = None
 
+    @property
+    def retriever_factory(self) -> Any:
+        """
+        Get the retriever factory, importing the retriever module on the first call.
+        :return: The retriever factory.
+        """
+        if self._retriever_factory is None:
+            self._retriever_factory = retriever.RetrieverFactory()
+        return self._retriever_factory
+
     @property
     def status(self) -> str:
         """
@@ -138,17 +148,28 @@ class BasicAgent(ABC):
 
     @classmethod
     def get_response(
-        cls, message: List[dict], namescope: str, use_backup_engine: bool
+        cls,
+        message: List[dict],
+        namescope: str,
+        use_backup_engine: bool,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+        on_late_cost: Optional[Callable[[float], None]] = None,
     ) -> str:
         """
         Get the response for the prompt.
         :param message: The message for LLMs.
         :param namescope: The namescope for the LLMs.
         :param use_backup_engine: Whether to use the backup engine.
+        :param on_field: The function called with each field of the response as soon as it is streamed.
+        :param on_late_cost: The function called with the cost of a hedged completion finished after the response.
         :return: The response.
         """
         response_string, cost = llm_call.get_completion(
-            message, namescope, use_backup_engine=use_backup_engine
+            message,
+            namescope,
+            use_backup_engine=use_backup_engine,
+            on_field=on_field,
+            on_late_cost=on_late_cost,
         )
         return response_string, cost
 
@@ -4,8 +4,10 @@
 
 from __future__ import annotations
 
+import json
+import logging
 import time
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
 from pywinauto.controls.uiawrapper import UIAWrapper
 
@@ -18,6 +20,8 @@ from ufo.agents.processors.host_agent_processor import HostAgentProcessor
 from ufo.agents.states.host_agent_state import ContinueHostAgentState, HostAgentStatus
 from ufo.automator.ui_control import openfile
 from ufo.automator.ui_control.inspector import ControlInspectorFacade
+from ufo.automator.ui_control.screenshot import ImageEncodingPolicy
+from ufo.automator.ui_control.settle import SettleWaiter
 from ufo.config.config import Config
 from ufo.module.context import Context
 from ufo.prompter.agent_prompter import HostAgentPrompter
@@ -195,7 +199,9 @@ class HostAgent(BasicAgent):
         )
 
         if not self.blackboard.is_empty():
-            blackboard_prompt = self.blackboard.blackboard_to_prompt()
+            blackboard_prompt = self.blackboard.blackboard_to_prompt(
+                query=request, policy=ImageEncodingPolicy.from_config("HOST_AGENT")
+            )
             hostagent_prompt_user_message = (
                 blackboard_prompt + hostagent_prompt_user_message
             )
@@ -206,24 +212,52 @@ class HostAgent(BasicAgent):
 
         return hostagent_prompt_message
 
-    def app_file_manager(self, app_file_info: Dict[str, str]) -> UIAWrapper:
+    def app_file_manager(
+        self,
+        app_file_info: Dict[str, str],
+        settle_logger: Optional[logging.Logger] = None,
+    ) -> UIAWrapper:
         """
         Open the application or file for the user.
         :param app_file_info: The information of the application or file. {'APP': name of app, 'file_path': path}
+        :param settle_logger: The logger of the waits until the application is settled.
         :return: The window of the application.
         """
 
         utils.print_with_color("Opening the required application or file...", "yellow")
         file_manager = openfile.FileController()
         results = file_manager.execute_code(app_file_info)
-        time.sleep(configs.get("SLEEP_TIME", 5))
-        desktop_windows_dict = ControlInspectorFacade(
-            configs["CONTROL_BACKEND"]
-        ).get_desktop_app_dict(remove_empty=True)
         if not results:
             self.status = "ERROR in openning the application or file."
             return None
-        app_window = file_manager.find_window_by_app_name(desktop_windows_dict)
+
+        backend = configs["CONTROL_BACKEND"]
+        if configs.get("SETTLE_WAIT", False):
+            # Poll the desktop until the window of the application shows up, then wait until it is settled.
+            app_window, waited = SettleWaiter.wait_for(
+                lambda: file_manager.find_window_by_app_name(
+                    ControlInspectorFacade(backend).get_desktop_app_dict(
+                        remove_empty=True
+                    ),
+                    verbose=False,
+                ),
+                configs.get("SETTLE_LAUNCH_MAX_WAIT", 15),
+            )
+            if settle_logger is not None:
+                settle_logger.info(
+                    json.dumps({"launch": app_file_info, "waited": round(waited, 3)})
+                )
+            if app_window is not None:
+                SettleWaiter.wait_until_settled(
+                    app_window, backend, settle_logger, launch=app_file_info
+                )
+        else:
+            time.sleep(configs.get("SLEEP_TIME", 5))
+            desktop_windows_dict = ControlInspectorFacade(
+                backend
+            ).get_desktop_app_dict(remove_empty=True)
+            app_window = file_manager.find_window_by_app_name(desktop_windows_dict)
+
         app_name = app_window.window_text()
 
         utils.print_with_color(
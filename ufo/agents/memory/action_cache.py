@@ -0,0 +1,256 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+
+class ActionCache:
+    """
+    The cache of the actions of the successful AppAgent steps, keyed by the fingerprint of the subtask, the application,
+    the structure of the filtered control list and the previous actions of the subtask. The cache is kept in memory for the process and persisted to a
+    JSON file shared across the sessions.
+    """
+
+    _entries: Dict[str, Dict[str, Any]] = {}
+    _loaded_path: Optional[str] = None
+    _lock = threading.Lock()
+
+    _hits = 0
+    _misses = 0
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        Normalize a text for the fingerprint, ignoring the case, the spacing and the trailing punctuation.
+        :param text: The text.
+        :return: The normalized text.
+        """
+        return re.sub(r"\s+", " ", str(text)).strip().rstrip(".!?;:").lower()
+
+    @classmethod
+    def fingerprint(
+        cls,
+        subtask: str,
+        app_root: str,
+        control_info: List[Dict[str, str]],
+        previous_actions: List[str],
+    ) -> str:
+        """
+        Compute the fingerprint of a step.
+        :param subtask: The subtask of the AppAgent.
+        :param app_root: The root name of the application.
+        :param control_info: The filtered control information of the step, as sent to the LLM.
+        :param previous_actions: The actions of the previous steps of the subtask, which tell apart the steps leaving
+        the control list unchanged.
+        :return: The fingerprint.
+        """
+        structure = [
+            [
+                value
+                for key, value in sorted(control.items())
+                if key != "label" and isinstance(value, str)
+            ]
+            for control in control_info
+        ]
+        content = json.dumps(
+            [
+                cls.normalize_text(subtask),
+                app_root.lower(),
+                structure,
+                previous_actions,
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def action_signature(control_text: str, action: str) -> str:
+        """
+        Get the signature of the action of a step, for the fingerprints of the next steps.
+        :param control_text: The text of the selected control.
+        :param action: The command string of the action, without the control label.
+        :return: The signature.
+        """
+        return f"{control_text}: {action}"
+
+    @staticmethod
+    def _path() -> str:
+        """
+        Get the path of the file of the cache.
+        :return: The path.
+        """
+        return configs.get("ACTION_CACHE_PATH", "vectordb/action_cache/actions.json")
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Read the entries from the file of the cache.
+        :param path: The path of the file.
+        :return: The entries, empty if the file does not exist or is corrupted.
+        """
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @classmethod
+    def _load(cls) -> None:
+        """
+        Load the entries from the file of the cache at the first use. Must be called with the lock.
+        """
+        path = cls._path()
+        if cls._loaded_path != path:
+            cls._entries = cls._read(path)
+            cls._loaded_path = path
+
+    @classmethod
+    def _save(cls, removed: Optional[str] = None) -> None:
+        """
+        Merge the entries with the file, which may have been updated by the other sessions, evict the expired and the
+        least recently used entries, and write the file atomically. Must be called with the lock.
+        :param removed: The fingerprint removed by this session, not to be merged back from the file.
+        """
+        path = cls._path()
+
+        for fingerprint, entry in cls._read(path).items():
+            if fingerprint == removed:
+                continue
+            current = cls._entries.get(fingerprint)
+            if current is None or entry.get("last_used", 0) > current.get(
+                "last_used", 0
+            ):
+                cls._entries[fingerprint] = entry
+
+        now = time.time()
+        ttl = configs.get("ACTION_CACHE_TTL", 604800)
+        entries = sorted(
+            (
+                (fingerprint, entry)
+                for fingerprint, entry in cls._entries.items()
+                if now - entry.get("created", 0) <= ttl
+            ),
+            key=lambda item: item[1].get("last_used", 0),
+            reverse=True,
+        )
+        cls._entries = dict(entries[: configs.get("ACTION_CACHE_MAX_ENTRIES", 1000)])
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(cls._entries, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def get(cls, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached action of a step.
+        :param fingerprint: The fingerprint of the step.
+        :return: The entry with the response and the control of the action, None on a miss or if the entry expired.
+        """
+        with cls._lock:
+            cls._load()
+            entry = cls._entries.get(fingerprint)
+
+            if entry is not None and time.time() - entry.get(
+                "created", 0
+            ) > configs.get("ACTION_CACHE_TTL", 604800):
+                entry = None
+
+            if entry is None:
+                cls._misses += 1
+                return None
+
+            cls._hits += 1
+            return json.loads(json.dumps(entry))
+
+    @classmethod
+    def put(
+        cls,
+        fingerprint: str,
+        response: Dict[str, Any],
+        control_text: str,
+        control_type: str,
+        control_index: int,
+    ) -> None:
+        """
+        Cache the action of a successful step.
+        :param fingerprint: The fingerprint of the step.
+        :param response: The response of the LLM, without the control label.
+        :param control_text: The text of the selected control.
+        :param control_type: The type of the selected control.
+        :param control_index: The index of the selected control among the controls with the same text and type.
+        """
+        now = time.time()
+        with cls._lock:
+            cls._load()
+            cls._entries[fingerprint] = {
+                "response": response,
+                "control_text": control_text,
+                "control_type": control_type,
+                "control_index": control_index,
+                "created": now,
+                "last_used": now,
+                "hits": 0,
+            }
+            cls._save()
+
+    @classmethod
+    def touch(cls, fingerprint: str) -> None:
+        """
+        Mark the cached action of a step as used successfully again.
+        :param fingerprint: The fingerprint of the step.
+        """
+        with cls._lock:
+            cls._load()
+            entry = cls._entries.get(fingerprint)
+            if entry is None:
+                return
+            entry["last_used"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            cls._save()
+
+    @classmethod
+    def invalidate(cls, fingerprint: str) -> None:
+        """
+        Remove the cached action of a step, e.g. when it failed.
+        :param fingerprint: The fingerprint of the step.
+        """
+        with cls._lock:
+            cls._load()
+            if cls._entries.pop(fingerprint, None) is not None:
+                cls._save(removed=fingerprint)
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """
+        Get the counters of the cache.
+        :return: The number of hits, misses and cached actions.
+        """
+        return {"hits": cls._hits, "misses": cls._misses, "size": len(cls._entries)}
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Forget the cached actions loaded in the process, and reset the counters. The file is left untouched.
+        """
+        with cls._lock:
+            cls._entries = {}
+            cls._loaded_path = None
+            cls._hits = 0
+            cls._misses = 0
@@ -3,11 +3,15 @@
 
 import json
 import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
 
 from ufo.agents.memory.memory import Memory, MemoryItem
-from ufo.automator.ui_control.screenshot import PhotographerFacade
+from ufo.automator.ui_control.screenshot import ImageEncodingPolicy, PhotographerFacade
 from ufo.config.config import Config
 
 configs = Config.get_instance().config_data
@@ -36,8 +40,14 @@ class ImageMemoryItem(MemoryItem):
 class Blackboard:
     """
     Class for the blackboard, which stores the data and images which are visible to all the agents.
+    The prompt of the blackboard is bounded by a token budget: the old trajectories are folded into a rolling summary
+    in the background, and only the screenshots most relevant to the current task are inlined.
     """
 
+    # The thread folding the old trajectories into the summaries of the blackboards.
+    _summarizer: Optional[ThreadPoolExecutor] = None
+    _summarizer_lock = threading.Lock()
+
     def __init__(self) -> None:
         """
         Initialize the blackboard.
@@ -47,6 +57,24 @@ class Blackboard:
         self._trajectories: Memory = Memory()
         self._screenshots: Memory = Memory()
 
+        self._lock = threading.Lock()
+
+        # The summary lines of the trajectories folded so far, and the trajectory list they were folded from.
+        self._summary: List[str] = []
+        self._summarized = 0
+        self._summary_source: List[MemoryItem] = self._trajectories.content
+        self._summary_future: Optional[Future] = None
+
+        # The JSON of each trajectory, serialized once, and the prompt rendered at the last call.
+        self._item_texts: Dict[int, Tuple[MemoryItem, str]] = {}
+        self._prompt_cache: Optional[Tuple[Hashable, List[Dict[str, Any]]]] = None
+
+        # The base64 urls of the recently inlined screenshots, keyed by their path and encoding policy.
+        self._image_urls: (
+            "OrderedDict[Tuple[str, Optional[ImageEncodingPolicy]], str]"
+        ) = OrderedDict()
+        self._image_urls_lock = threading.Lock()
+
         if configs.get("USE_CUSTOMIZATION", False):
             self.load_questions(
                 configs.get("QA_PAIR_FILE", ""), configs.get("QA_PAIR_NUM", -1)
@@ -127,6 +155,7 @@ class Blackboard:
         """
 
         self.add_data(trajectories, self.trajectories)
+        self._schedule_summary()
 
     def add_image(
         self,
@@ -134,28 +163,24 @@ class Blackboard:
         metadata: Optional[Dict[str, str]] = None,
     ) -> None:
         """
-        Add the image to the blackboard.
+        Add the image to the blackboard. The image is kept as a reference to its path, and encoded only when it is
+        inlined in the prompt.
         :param screenshot_path: The path of the image.
         :param metadata: The metadata of the image.
         """
 
-        if os.path.exists(screenshot_path):
-
-            screenshot_str = PhotographerFacade().encode_image_from_path(
-                screenshot_path
-            )
-        else:
+        if not PhotographerFacade.image_exists(screenshot_path):
             print(f"Screenshot path {screenshot_path} does not exist.")
-            screenshot_str = ""
 
         image_memory_item = ImageMemoryItem()
         image_memory_item.set_values_from_dict(
             {
+                # The metadata may be given directly or under the metadata key.
                 ImageMemoryItemNames.METADATA: metadata.get(
-                    ImageMemoryItemNames.METADATA
+                    ImageMemoryItemNames.METADATA, metadata
                 ),
                 ImageMemoryItemNames.IMAGE_PATH: screenshot_path,
-                ImageMemoryItemNames.IMAGE_STR: screenshot_str,
+                ImageMemoryItemNames.IMAGE_STR: "",
             }
         )
 
@@ -211,9 +236,47 @@ class Blackboard:
 
         return user_content
 
-    def screenshots_to_prompt(self) -> List[str]:
+    def screenshot_url(
+        self,
+        screenshot_dict: Dict[str, Any],
+        policy: Optional[ImageEncodingPolicy] = None,
+    ) -> str:
+        """
+        Get the base64 url of a screenshot of the blackboard. The urls of the recently inlined screenshots are kept, up to
+        twice BLACKBOARD_INLINE_IMAGES for the HostAgent and the AppAgent, so they are not encoded again at each step.
+        :param screenshot_dict: The screenshot memory item as a dictionary.
+        :param policy: The encoding policy of the agent. If not provided, the file is sent as it is.
+        :return: The base64 url, empty if the image does not exist.
+        """
+        image_str = screenshot_dict.get(ImageMemoryItemNames.IMAGE_STR, "")
+        if image_str:
+            return image_str
+
+        image_path = screenshot_dict.get(ImageMemoryItemNames.IMAGE_PATH, "")
+        key = (image_path, policy)
+        with self._image_urls_lock:
+            image_url = self._image_urls.get(key)
+            if image_url is not None:
+                self._image_urls.move_to_end(key)
+                return image_url
+
+        if not PhotographerFacade.image_exists(image_path):
+            return ""
+        image_url = PhotographerFacade.encode_image_from_path(image_path, policy=policy)
+
+        max_urls = 2 * configs.get("BLACKBOARD_INLINE_IMAGES", 2)
+        with self._image_urls_lock:
+            self._image_urls[key] = image_url
+            while len(self._image_urls) > max_urls:
+                self._image_urls.popitem(last=False)
+        return image_url
+
+    def screenshots_to_prompt(
+        self, policy: Optional[ImageEncodingPolicy] = None
+    ) -> List[str]:
         """
         Convert the images to a prompt.
+        :param policy: The encoding policy of the agent.
         :return: The prompt.
         """
 
@@ -230,17 +293,193 @@ class Blackboard:
             user_content.append(
                 {
                     "type": "image_url",
-                    "image_url": {
-                        "url": screenshot_dict.get(ImageMemoryItemNames.IMAGE_STR, "")
-                    },
+                    "image_url": {"url": self.screenshot_url(screenshot_dict, policy)},
                 }
             )
 
         return user_content
 
-    def blackboard_to_prompt(self) -> List[str]:
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        Estimate the number of tokens of a text, about four characters per token.
+        :param text: The text.
+        :return: The estimated number of tokens.
+        """
+        return len(text) // 4 + 1
+
+    @staticmethod
+    def summarize_trajectory(trajectory: MemoryItem) -> str:
+        """
+        Summarize a trajectory in one line, with the BLACKBOARD_SUMMARY_KEYS fields truncated.
+        :param trajectory: The trajectory.
+        :return: The summary line.
+        """
+        values = trajectory.to_dict()
+        max_length = configs.get("BLACKBOARD_SUMMARY_FIELD_LENGTH", 100)
+
+        fields = []
+        for key in configs.get(
+            "BLACKBOARD_SUMMARY_KEYS", ["Step", "Subtask", "Action", "Results"]
+        ):
+            value = values.get(key)
+            if value is None or value == "" or value == [] or value == {}:
+                continue
+            text = value if isinstance(value, str) else json.dumps(value)
+            text = re.sub(r"\s+", " ", text).strip()
+            if len(text) > max_length:
+                text = text[: max_length - 3] + "..."
+            fields.append(f"{key}: {text}")
+
+        return "; ".join(fields)
+
+    @classmethod
+    def _get_summarizer(cls) -> ThreadPoolExecutor:
+        """
+        Get the thread folding the trajectories.
+        :return: The thread pool of one worker.
+        """
+        with cls._summarizer_lock:
+            if cls._summarizer is None:
+                cls._summarizer = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="ufo-blackboard"
+                )
+            return cls._summarizer
+
+    def _check_summary_source(self) -> None:
+        """
+        Reset the summary if the trajectories were cleared or replaced. Must be called with the lock.
+        """
+        content = self.trajectories.content
+        if content is not self._summary_source or self._summarized > len(content):
+            self._summary = []
+            self._summarized = 0
+            self._summary_source = content
+            self._item_texts = {}
+
+    def _schedule_summary(self) -> None:
+        """
+        Fold the trajectories older than the BLACKBOARD_RECENT_TRAJECTORIES most recent ones into the summary, in the
+        background so that the step is not delayed.
+        """
+        keep = configs.get("BLACKBOARD_RECENT_TRAJECTORIES", 10)
+        with self._lock:
+            self._check_summary_source()
+            if self.trajectories.length - self._summarized <= keep:
+                return
+            if self._summary_future is not None and not self._summary_future.done():
+                return
+            self._summary_future = self._get_summarizer().submit(
+                self._fold_trajectories, keep
+            )
+
+    def _fold_trajectories(self, keep: int) -> None:
         """
-        Convert the blackboard to a prompt.
+        Fold the old trajectories into the summary, until only the most recent ones are left.
+        :param keep: The number of the most recent trajectories kept verbatim.
+        """
+        while True:
+            with self._lock:
+                self._check_summary_source()
+                content = self._summary_source
+                start = self._summarized
+                end = len(content) - keep
+                if end <= start:
+                    return
+
+            lines = [self.summarize_trajectory(item) for item in content[start:end]]
+
+            with self._lock:
+                # The trajectories may have been cleared while the lines were computed.
+                if content is self._summary_source and self._summarized == start:
+                    self._summary.extend(lines)
+                    self._summarized = end
+
+    def wait_for_summary(self) -> None:
+        """
+        Wait until the trajectories scheduled for the summary are folded.
+        """
+        future = self._summary_future
+        if future is not None:
+            future.result()
+
+    def _item_text(self, item: MemoryItem) -> str:
+        """
+        Get the JSON of a trajectory, serialized at the first use.
+        :param item: The trajectory.
+        :return: The JSON.
+        """
+        cached = self._item_texts.get(id(item))
+        if cached is None or cached[0] is not item:
+            cached = self._item_texts[id(item)] = (item, json.dumps(item.to_dict()))
+        return cached[1]
+
+    def _signature(self, query: str, policy: Optional[ImageEncodingPolicy]) -> Hashable:
+        """
+        Get the signature of the content of the blackboard, which changes whenever the prompt would change.
+        :param query: The query the screenshots are ranked with.
+        :param policy: The encoding policy of the screenshots.
+        :return: The signature.
+        """
+        memories = tuple(
+            (
+                id(memory.content),
+                memory.length,
+                id(memory.content[-1]) if memory.content else None,
+            )
+            for memory in [
+                self.questions,
+                self.requests,
+                self.trajectories,
+                self.screenshots,
+            ]
+        )
+        return (query, policy, memories, self._summarized)
+
+    def rank_screenshots(self, query: str) -> List[int]:
+        """
+        Rank the screenshots by relevance to a query, the number of words their metadata shares with the query, with
+        the most recent screenshot first among the equally relevant ones.
+        :param query: The query, e.g. the current subtask.
+        :return: The indices of the screenshots, the most relevant first.
+        """
+        query_words = set(re.findall(r"\w+", query.lower()))
+
+        def relevance(index: int) -> Tuple[int, int]:
+            metadata = self.screenshots.content[index].get_value(
+                ImageMemoryItemNames.METADATA
+            )
+            words = set(re.findall(r"\w+", json.dumps(metadata).lower()))
+            return len(words & query_words), index
+
+        return sorted(range(self.screenshots.length), key=relevance, reverse=True)
+
+    def blackboard_to_prompt(
+        self, query: str = "", policy: Optional[ImageEncodingPolicy] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Convert the blackboard to a prompt, bounded by the BLACKBOARD_TOKEN_BUDGET. The prompt is cached until the
+        content of the blackboard changes.
+        :param query: The query the screenshots are ranked with, e.g. the current subtask.
+        :param policy: The encoding policy of the agent for the inlined screenshots.
+        :return: The prompt.
+        """
+        with self._lock:
+            self._check_summary_source()
+            signature = self._signature(query, policy)
+            if self._prompt_cache is None or self._prompt_cache[0] != signature:
+                self._prompt_cache = (signature, self._render_prompt(query, policy))
+            return list(self._prompt_cache[1])
+
+    def _render_prompt(
+        self, query: str, policy: Optional[ImageEncodingPolicy]
+    ) -> List[Dict[str, Any]]:
+        """
+        Render the prompt of the blackboard. The questions and the requests are always included. The most recent
+        trajectories, the most relevant screenshots, and the most recent lines of the summary then take the rest of the
+        token budget in this order. Must be called with the lock.
+        :param query: The query the screenshots are ranked with.
+        :param policy: The encoding policy of the inlined screenshots.
         :return: The prompt.
         """
         prefix = [
@@ -249,16 +488,103 @@ class Blackboard:
                 "text": "[Blackboard:]",
             }
         ]
-
-        blackboard_prompt = (
+        fixed_prompt = (
             prefix
             + self.texts_to_prompt(self.questions, "[Questions & Answers:]")
             + self.texts_to_prompt(self.requests, "[Request History:]")
-            + self.texts_to_prompt(self.trajectories, "[Step Trajectories:]")
-            + self.screenshots_to_prompt()
+        )
+        budget = configs.get("BLACKBOARD_TOKEN_BUDGET", 8000) - sum(
+            self.estimate_tokens(content["text"]) for content in fixed_prompt
+        )
+
+        # The most recent trajectories, verbatim.
+        content = self.trajectories.content
+        recent_start = max(
+            self._summarized,
+            len(content) - configs.get("BLACKBOARD_RECENT_TRAJECTORIES", 10),
+        )
+        recent_texts = []
+        for item in reversed(content[recent_start:]):
+            text = self._item_text(item)
+            if self.estimate_tokens(text) > budget:
+                break
+            recent_texts.insert(0, text)
+            budget -= self.estimate_tokens(text)
+        trajectory_prompt = [
+            {
+                "type": "text",
+                "text": "[Step Trajectories:]\n [" + ", ".join(recent_texts) + "]",
+            }
+        ]
+
+        # The most relevant screenshots are inlined, the others are referenced by their path.
+        image_tokens = configs.get("BLACKBOARD_IMAGE_TOKENS", 765)
+        inlined = []
+        for index in self.rank_screenshots(query):
+            if len(inlined) >= configs.get("BLACKBOARD_INLINE_IMAGES", 2):
+                break
+            if image_tokens > budget:
+                break
+            inlined.append(index)
+            budget -= image_tokens
+
+        screenshot_prompt = []
+        references = []
+        for index, screenshot_dict in enumerate(self.screenshots.list_content):
+            metadata = screenshot_dict.get(ImageMemoryItemNames.METADATA, "")
+            if index not in inlined:
+                references.append(
+                    {
+                        ImageMemoryItemNames.METADATA: metadata,
+                        ImageMemoryItemNames.IMAGE_PATH: screenshot_dict.get(
+                            ImageMemoryItemNames.IMAGE_PATH, ""
+                        ),
+                    }
+                )
+                continue
+            screenshot_prompt.append({"type": "text", "text": json.dumps(metadata)})
+            screenshot_prompt.append(
+                {
+                    "type": "image_url",
+                    "image_url": {"url": self.screenshot_url(screenshot_dict, policy)},
+                }
+            )
+        if references:
+            reference_text = f"[Screenshot References:]\n {json.dumps(references)}"
+            screenshot_prompt.append({"type": "text", "text": reference_text})
+            budget -= self.estimate_tokens(reference_text)
+
+        # The summary of the older trajectories, including the ones not folded yet, the most recent lines first.
+        summary = self._summary + [
+            self.summarize_trajectory(item)
+            for item in content[self._summarized : recent_start]
+        ]
+        summary += [
+            self.summarize_trajectory(item)
+            for item in content[recent_start : len(content) - len(recent_texts)]
+        ]
+        summary_lines = []
+        for line in reversed(summary):
+            if self.estimate_tokens(line) > budget:
+                break
+            summary_lines.insert(0, line)
+            budget -= self.estimate_tokens(line)
+        if len(summary_lines) < len(summary):
+            summary_lines.insert(
+                0, f"({len(summary) - len(summary_lines)} earlier steps omitted.)"
+            )
+        summary_prompt = (
+            [
+                {
+                    "type": "text",
+                    "text": "[Step Trajectories Summary:]\n" + "\n".join(summary_lines),
+                }
+            ]
+            if summary
+            else []
         )
 
-        return blackboard_prompt
+        return fixed_prompt + summary_prompt + trajectory_prompt + screenshot_prompt
 
     def is_empty(self) -> bool:
         """
@@ -280,6 +606,8 @@ class Blackboard:
         self.requests.clear()
         self.trajectories.clear()
         self.screenshots.clear()
+        with self._image_urls_lock:
+            self._image_urls.clear()
 
     @staticmethod
     def read_json_file(file_path: str, last_k=-1) -> Dict[str, str]:
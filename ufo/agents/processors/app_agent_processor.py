@@ -5,13 +5,16 @@
 import json
 import os
 import time
-from typing import TYPE_CHECKING, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Union
 
 from pywinauto.controls.uiawrapper import UIAWrapper
 
 from ufo import utils
+from ufo.agents.memory.action_cache import ActionCache
 from ufo.agents.processors.basic import BaseProcessor
 from ufo.automator.ui_control.control_filter import ControlFilterFactory
+from ufo.automator.ui_control.controller import ControlReceiver
+from ufo.automator.ui_control.screenshot import ImageEncodingPolicy
 from ufo.config.config import Config
 from ufo.module.context import Context, ContextNames
 
@@ -44,6 +47,19 @@ class AppAgentProcessor(BaseProcessor):
         self._operation = None
         self._args = None
         self._image_url = []
+        self._frame = None
+        self._snapshot = None
+        self._ui_diff = None
+        self._ui_changes = None
+        self._action_batch = []
+        self._batch_records = []
+        self._action_fingerprint = None
+        self._cached_response = None
+        self._streamed_action = {}
+        self._prefetched_control = None
+        self._response_start_time = None
+        self._time_to_first_action = None
+        self._completion_time = None
         self.control_filter_factory = ControlFilterFactory()
         self.filtered_annotation_dict = None
 
@@ -103,12 +119,21 @@ class AppAgentProcessor(BaseProcessor):
         if type(self.control_reannotate) == list and len(self.control_reannotate) > 0:
             control_list = self.control_reannotate
         else:
+            # Walk the UI tree once, the controls found read their properties from the snapshot for the rest of the step.
+            if configs.get("CONTROL_SNAPSHOT", True):
+                self._take_snapshot()
             control_list = self.control_inspector.find_control_elements_in_descendants(
                 self.application_window,
                 control_type_list=configs["CONTROL_LIST"],
                 class_name_list=configs["CONTROL_LIST"],
+                snapshot=self._snapshot,
             )
 
+        # Grab the window and the control rectangles once, all the screenshots of the step are rendered from this frame.
+        self._frame = self.photographer.capture_app_window_frame(
+            self.application_window, control_list
+        )
+
         # Get the annotation dictionary for the control items, in a format of {control_label: control_element}.
         self._annotation_dict = self.photographer.get_annotation_dict(
             self.application_window, control_list, annotation_type="number"
@@ -118,18 +143,28 @@ class AppAgentProcessor(BaseProcessor):
         self.filtered_annotation_dict = self.get_filtered_annotation_dict(
             self._annotation_dict
         )
-        self.photographer.capture_app_window_screenshot(
-            self.application_window, save_path=screenshot_save_path
+        screenshot = self.photographer.capture_app_window_screenshot(
+            self.application_window, frame=self._frame
         )
 
-        # Capture the screenshot of the selected control items with annotation and save it.
-        self.photographer.capture_app_window_screenshot_with_annotation_dict(
-            self.application_window,
-            self.filtered_annotation_dict,
-            annotation_type="number",
-            save_path=annotated_screenshot_save_path,
+        # Capture the screenshot of the selected control items with annotation.
+        screenshot_annotated = (
+            self.photographer.capture_app_window_screenshot_with_annotation_dict(
+                self.application_window,
+                self.filtered_annotation_dict,
+                annotation_type="number",
+                frame=self._frame,
+            )
         )
 
+        # The screenshots are written to disk in the background, the prompt images are encoded from memory.
+        self.photographer.save_image(screenshot, screenshot_save_path)
+        self.photographer.save_image(
+            screenshot_annotated, annotated_screenshot_save_path
+        )
+
+        encoding_policy = ImageEncodingPolicy.from_config("APP_AGENT")
+
         # If the configuration is set to include the last screenshot with selected controls tagged, save the last screenshot.
         if configs["INCLUDE_LAST_SCREENSHOT"]:
             last_screenshot_save_path = (
@@ -139,30 +174,38 @@ class AppAgentProcessor(BaseProcessor):
                 self.log_path
                 + f"action_step{self.session_step - 1}_selected_controls.png"
             )
+            last_control_screenshot_exists = self.photographer.image_exists(
+                last_control_screenshot_save_path
+            )
             self._image_url += [
                 self.photographer.encode_image_from_path(
-                    last_control_screenshot_save_path
-                    if os.path.exists(last_control_screenshot_save_path)
-                    else last_screenshot_save_path
+                    (
+                        last_control_screenshot_save_path
+                        if last_control_screenshot_exists
+                        else last_screenshot_save_path
+                    ),
+                    policy=encoding_policy,
+                    clean=not last_control_screenshot_exists,
                 )
             ]
 
         # Whether to concatenate the screenshots of clean screenshot and annotated screenshot into one image.
         if configs["CONCAT_SCREENSHOT"]:
-            self.photographer.concat_screenshots(
-                screenshot_save_path,
-                annotated_screenshot_save_path,
+            self.photographer.save_image(
+                self.photographer.concat_images(screenshot, screenshot_annotated),
                 concat_screenshot_save_path,
             )
             self._image_url += [
-                self.photographer.encode_image_from_path(concat_screenshot_save_path)
+                self.photographer.encode_image_from_path(
+                    concat_screenshot_save_path, policy=encoding_policy, clean=False
+                )
             ]
         else:
             screenshot_url = self.photographer.encode_image_from_path(
-                screenshot_save_path
+                screenshot_save_path, policy=encoding_policy, clean=True
             )
             screenshot_annotated_url = self.photographer.encode_image_from_path(
-                annotated_screenshot_save_path
+                annotated_screenshot_save_path, policy=encoding_policy, clean=False
             )
             self._image_url += [screenshot_url, screenshot_annotated_url]
 
@@ -171,6 +214,31 @@ class AppAgentProcessor(BaseProcessor):
 
             self._save_to_xml()
 
+    def _take_snapshot(self) -> None:
+        """
+        Take the control tree snapshot of the application window. The snapshot of the last step is refreshed incrementally,
+        and its diff to the new snapshot is kept for the prompt and the logs.
+        """
+
+        previous_snapshot = (
+            self.app_agent.last_snapshot
+            if configs.get("INCREMENTAL_SNAPSHOT", True)
+            else None
+        )
+
+        self._snapshot = self.control_inspector.take_snapshot(
+            self.application_window, previous_snapshot
+        )
+
+        if (
+            previous_snapshot is not None
+            and self._snapshot is not None
+            and previous_snapshot.window == self._snapshot.window
+        ):
+            self._ui_diff = self._snapshot.diff(previous_snapshot)
+
+        self.app_agent.last_snapshot = self._snapshot
+
     def get_control_info(self) -> None:
         """
         Get the control information.
@@ -191,11 +259,154 @@ class AppAgentProcessor(BaseProcessor):
             )
         )
 
+        # The changes of the controls since the last step, labeled with the annotation of this step.
+        if self._ui_diff is not None:
+            self._ui_changes = self._ui_diff.to_dict(
+                self._annotation_dict, configs.get("UI_CHANGES_MAX_ITEMS", 10)
+            )
+            self._memory_data.set_values_from_dict({"UIChanges": self._ui_changes})
+
+        self.lookup_action_cache()
+
+    def lookup_action_cache(self) -> None:
+        """
+        Look up the action of the step in the action cache. The cached control is resolved by its text and type in the
+        filtered control list of this step, instead of its label.
+        """
+        if not configs.get("ACTION_CACHE", False):
+            return
+
+        # The actions are fingerprinted with the previous actions of the same subtask.
+        if self.app_agent.action_cache_subtask != self.subtask:
+            self.app_agent.action_cache_subtask = self.subtask
+            self.app_agent.action_cache_history = []
+            self.app_agent.action_cache_fingerprints = set()
+
+        self._action_fingerprint = ActionCache.fingerprint(
+            self.subtask,
+            self.control_inspector.get_application_root_name(self.application_window),
+            self.filtered_control_info,
+            self.app_agent.action_cache_history,
+        )
+
+        # The UI did not change since the last step, replaying a cached action could loop.
+        if self._action_fingerprint == self.app_agent.last_action_fingerprint:
+            return
+
+        entry = ActionCache.get(self._action_fingerprint)
+        if entry is None:
+            return
+
+        labels = self.get_control_labels(entry["control_text"], entry["control_type"])
+        if (
+            entry["control_index"] >= len(labels)
+            or entry["response"].get("Function")
+            not in ControlReceiver._command_registry
+            or entry["response"].get("Status", "").upper()
+            != self._agent_status_manager.CONTINUE.value
+        ):
+            return
+
+        self._cached_response = dict(
+            entry["response"],
+            ControlLabel=labels[entry["control_index"]],
+            ControlText=entry["control_text"],
+        )
+
+    def get_control_labels(self, control_text: str, control_type: str) -> List[str]:
+        """
+        Get the labels of the filtered controls with a text and a type.
+        :param control_text: The text of the controls.
+        :param control_type: The type of the controls.
+        :return: The labels in the order of the filtered control list.
+        """
+        return [
+            control["label"]
+            for control in self.filtered_control_info
+            if control.get("control_text") == control_text
+            and self.get_control_type(control) == control_type
+        ]
+
+    @staticmethod
+    def get_control_type(control: Dict[str, str]) -> str:
+        """
+        Get the type of a control in the control information, the control type or the control class by the backend.
+        :param control: The control information.
+        :return: The type of the control.
+        """
+        return control.get("control_type", control.get("control_class", ""))
+
+    def update_action_cache(self) -> None:
+        """
+        Update the action cache with the outcome of the step. The action of a successful step from the LLM is cached,
+        a cached action is refreshed if it succeeded again, and removed if it failed. The steps finishing the subtask are
+        not cached, and an action cached earlier in the same subtask is not overwritten.
+        """
+        if not configs.get("ACTION_CACHE", False) or self._action_fingerprint is None:
+            return
+
+        self.app_agent.action_cache_history.append(
+            ActionCache.action_signature(self.control_text, self.action)
+        )
+
+        failed = (
+            bool(self._action_batch)
+            or self.status.upper()
+            not in [
+                self._agent_status_manager.CONTINUE.value,
+                self._agent_status_manager.FINISH.value,
+            ]
+            or self.app_agent.Puppeteer.is_error_result(self._results)
+        )
+        cacheable = (
+            self.status.upper() == self._agent_status_manager.CONTINUE.value
+            and self._action_fingerprint
+            not in self.app_agent.action_cache_fingerprints
+        )
+
+        if self._cached_response is not None:
+            if failed:
+                ActionCache.invalidate(self._action_fingerprint)
+            else:
+                ActionCache.touch(self._action_fingerprint)
+            return
+
+        selected = [
+            control
+            for control in self.filtered_control_info
+            if control["label"] == self._control_label
+        ]
+        if failed or not cacheable or not selected or not self._operation:
+            return
+
+        control_text = selected[0].get("control_text", "")
+        control_type = self.get_control_type(selected[0])
+        response = {
+            key: value
+            for key, value in self._response_json.items()
+            if key != "ControlLabel"
+        }
+
+        self.app_agent.action_cache_fingerprints.add(self._action_fingerprint)
+        ActionCache.put(
+            self._action_fingerprint,
+            response,
+            control_text,
+            control_type,
+            self.get_control_labels(control_text, control_type).index(
+                self._control_label
+            ),
+        )
+
     def get_prompt_message(self) -> None:
         """
         Get the prompt message for the AppAgent.
         """
 
+        # The LLM is skipped on an action cache hit.
+        if self._cached_response is not None:
+            return
+
         examples, tips = self.demonstration_prompt_helper()
 
         # Get the external knowledge prompt for the AppAgent using the offline and online retrievers.
@@ -218,6 +429,13 @@ class AppAgentProcessor(BaseProcessor):
             subtask=self.subtask,
             host_message=self.host_message,
             include_last_screenshot=configs["INCLUDE_LAST_SCREENSHOT"],
+            ui_changes=(
+                self._ui_changes
+                if configs.get("UI_CHANGES_IN_PROMPT", True)
+                and self._ui_diff is not None
+                and not self._ui_diff.is_empty()
+                else None
+            ),
         )
 
         # Log the prompt message. Only save them in debug mode.
@@ -237,16 +455,90 @@ class AppAgentProcessor(BaseProcessor):
         Get the response from the LLM.
         """
 
+        if self._cached_response is not None:
+            utils.print_with_color(
+                "Action cache hit, the LLM is skipped for this step.", "magenta"
+            )
+            self._response = json.dumps(self._cached_response)
+            self.cost = 0
+            return
+
+        streaming = configs.get("STREAM_COMPLETIONS", False)
+        self._response_start_time = time.time()
+
         # Try to get the response from the LLM. If an error occurs, catch the exception and log the error.
         try:
             self._response, self.cost = self.app_agent.get_response(
-                self._prompt_message, "APPAGENT", use_backup_engine=True
+                self._prompt_message,
+                "APPAGENT",
+                use_backup_engine=True,
+                on_field=self.on_response_field if streaming else None,
+                on_late_cost=self.add_late_cost,
             )
 
         except Exception:
             self.llm_error_handler()
             return
 
+        self._completion_time = time.time() - self._response_start_time
+
+        # Without streaming, the action is only known with the whole response.
+        if self._time_to_first_action is None:
+            self._time_to_first_action = self._completion_time
+
+        if streaming:
+            utils.print_with_color(
+                "Time to first action: {ttfa:.2f}s, completion time: {total:.2f}s.".format(
+                    ttfa=self._time_to_first_action, total=self._completion_time
+                ),
+                "magenta",
+            )
+
+    def on_response_field(self, key: str, value: Any) -> None:
+        """
+        Handle a field of the response as soon as it is streamed. Once the control label and the function are both
+        decoded, the time to the first action is recorded and the selected control is prefetched.
+        :param key: The key of the field.
+        :param value: The value of the field.
+        """
+        if (
+            key not in ["ControlLabel", "Function"]
+            or self._time_to_first_action is not None
+        ):
+            return
+
+        self._streamed_action[key] = value
+        if len(self._streamed_action) < 2:
+            return
+
+        self._time_to_first_action = time.time() - self._response_start_time
+        self.prefetch_control(
+            self._streamed_action["ControlLabel"], self._streamed_action["Function"]
+        )
+
+    def prefetch_control(self, control_label: str, function: str) -> None:
+        """
+        Prepare the control selected by the streamed response while the rest of the response is generated, by creating
+        its receiver. The UI is left unchanged, since the status of the step is not known yet and the response may still
+        fail. Only the UI control actions are prefetched.
+        :param control_label: The label of the selected control.
+        :param function: The function of the action.
+        """
+        control = self._annotation_dict.get(str(control_label))
+        if control is None or function not in ControlReceiver._command_registry:
+            return
+
+        try:
+            self.app_agent.Puppeteer.receiver_manager.create_ui_control_receiver(
+                control, self.application_window
+            )
+            self._prefetched_control = control
+        except Exception as e:
+            utils.print_with_color(
+                f"Warning: Failed to prefetch the control {control_label}: {e}",
+                "yellow",
+            )
+
     def parse_response(self) -> None:
         """
         Parse the response.
@@ -274,15 +566,56 @@ class AppAgentProcessor(BaseProcessor):
             self._operation, self._args
         )
 
+        self._action_batch = self.parse_action_batch()
+        if self._action_batch:
+            self.action = "; ".join(
+                self.app_agent.Puppeteer.get_command_string(
+                    action["Function"], action["Args"]
+                )
+                for action in self._action_batch
+            )
+
         self.status = self._response_json.get("Status", "")
         self.app_agent.print_response(self._response_json)
 
+    def parse_action_batch(self) -> List[Dict[str, Any]]:
+        """
+        Parse the actions chained in the ActionList of the response, if the action batch is enabled.
+        :return: The actions, empty if the response has a single action.
+        """
+        action_list = self._response_json.get("ActionList", [])
+
+        if (
+            not configs.get("ACTION_BATCH", False)
+            or not isinstance(action_list, list)
+            or len(action_list) < 2
+        ):
+            return []
+
+        return [
+            {
+                "ControlLabel": str(action.get("ControlLabel", "")),
+                "ControlText": action.get("ControlText", ""),
+                "Function": action.get("Function", ""),
+                "Args": utils.revise_line_breaks(action.get("Args", {})),
+            }
+            for action in action_list
+            if isinstance(action, dict)
+        ]
+
     def execute_action(self) -> None:
         """
         Execute the action.
         """
 
         try:
+            if (
+                self._action_batch
+                and self.status.upper() != self._agent_status_manager.SCREENSHOT.value
+            ):
+                self.execute_action_batch()
+                return
+
             # Get the selected control item from the annotation dictionary and LLM response.
             # The LLM response is a number index corresponding to the key in the annotation dictionary.
             control_selected = self._annotation_dict.get(self._control_label, "")
@@ -291,9 +624,13 @@ class AppAgentProcessor(BaseProcessor):
                 control_selected.draw_outline(colour="red", thickness=3)
                 time.sleep(configs.get("RECTANGLE_TIME", 0))
 
-            self.app_agent.Puppeteer.receiver_manager.create_ui_control_receiver(
-                control_selected, self.application_window
-            )
+            # The control prefetched while the response was streamed already has its receiver.
+            if not (
+                control_selected and control_selected is self._prefetched_control
+            ):
+                self.app_agent.Puppeteer.receiver_manager.create_ui_control_receiver(
+                    control_selected, self.application_window
+                )
 
             # Save the screenshot of the tagged selected control.
             self.capture_control_screenshot(control_selected)
@@ -313,10 +650,80 @@ class AppAgentProcessor(BaseProcessor):
         except Exception:
             self.general_error_handler()
 
-    def capture_control_screenshot(self, control_selected: UIAWrapper) -> None:
+    def execute_action_batch(self) -> None:
+        """
+        Execute the actions of the batch in one go through the command queue of the puppeteer.
+        The batch is cut before the first action whose control is not in the annotation dictionary or whose function is
+        not a UI control command, and the execution stops at the first failed action.
+        """
+        puppeteer = self.app_agent.Puppeteer
+        supported_commands = ControlReceiver._command_registry
+
+        self._batch_records = []
+        controls_selected = []
+
+        for action in self._action_batch:
+            record = dict(
+                action,
+                Action=puppeteer.get_command_string(action["Function"], action["Args"]),
+                Results="",
+                Status="skipped",
+            )
+            self._batch_records.append(record)
+
+            control = self._annotation_dict.get(action["ControlLabel"])
+            if control is None:
+                record["Results"] = (
+                    f"The control {action['ControlLabel']} is not in the current application window."
+                )
+                record["Status"] = "invalid"
+                break
+            if action["Function"] not in supported_commands:
+                record["Results"] = (
+                    f"The function {action['Function']} is not a UI control action."
+                )
+                record["Status"] = "invalid"
+                break
+
+            puppeteer.add_control_command(
+                control, self.application_window, action["Function"], action["Args"]
+            )
+            controls_selected.append(control)
+
+        if controls_selected:
+            # Save the screenshot of all the tagged selected controls.
+            self.capture_control_screenshot(controls_selected)
+
+        results = puppeteer.execute_all_commands(is_failure=puppeteer.is_error_result)
+
+        for record, result in zip(self._batch_records, results):
+            record["Results"] = result if utils.is_json_serializable(result) else ""
+            record["Status"] = (
+                "failed" if puppeteer.is_error_result(result) else "success"
+            )
+
+        executed_records = [
+            record
+            for record in self._batch_records
+            if record["Status"] in ["success", "failed"]
+        ]
+        self.action = "; ".join(record["Action"] for record in executed_records)
+        self._results = [record["Results"] for record in executed_records]
+        self.control_reannotate = None
+
+        utils.print_with_color(
+            "Action batch: {executed}/{total} actions executed.".format(
+                executed=len(executed_records), total=len(self._batch_records)
+            ),
+            "magenta",
+        )
+
+    def capture_control_screenshot(
+        self, control_selected: Union[UIAWrapper, List[UIAWrapper]]
+    ) -> None:
         """
         Capture the screenshot of the selected control.
-        :param control_selected: The selected control item.
+        :param control_selected: The selected control item, or the list of the selected control items of a batch.
         """
         control_screenshot_save_path = (
             self.log_path + f"action_step{self.session_step}_selected_controls.png"
@@ -326,11 +733,18 @@ class AppAgentProcessor(BaseProcessor):
             {"SelectedControlScreenshot": control_screenshot_save_path}
         )
 
-        self.photographer.capture_app_window_screenshot_with_rectangle(
-            self.application_window,
-            sub_control_list=[control_selected],
-            save_path=control_screenshot_save_path,
+        control_screenshot = (
+            self.photographer.capture_app_window_screenshot_with_rectangle(
+                self.application_window,
+                sub_control_list=(
+                    control_selected
+                    if isinstance(control_selected, list)
+                    else [control_selected]
+                ),
+                frame=self._frame,
+            )
         )
+        self.photographer.save_image(control_screenshot, control_screenshot_save_path)
 
     def handle_screenshot_status(self) -> None:
         """
@@ -350,6 +764,9 @@ class AppAgentProcessor(BaseProcessor):
         Update the memory of the Agent.
         """
 
+        self.update_action_cache()
+        self.app_agent.last_action_fingerprint = self._action_fingerprint
+
         app_root = self.control_inspector.get_application_root_name(
             self.application_window
         )
@@ -371,6 +788,17 @@ class AppAgentProcessor(BaseProcessor):
             "Cost": self._cost,
             "Results": self._results,
         }
+        if self._action_batch:
+            additional_memory["ActionBatch"] = self._batch_records
+        if self._completion_time is not None:
+            additional_memory["TimeToFirstAction"] = round(
+                self._time_to_first_action, 3
+            )
+            additional_memory["CompletionTime"] = round(self._completion_time, 3)
+        if self._action_fingerprint is not None:
+            additional_memory["ActionCache"] = (
+                "hit" if self._cached_response is not None else "miss"
+            )
         self._memory_data.set_values_from_dict(self._response_json)
         self._memory_data.set_values_from_dict(additional_memory)
 
@@ -517,7 +945,7 @@ class AppAgentProcessor(BaseProcessor):
             )
 
             cropped_icons_dict = self.photographer.get_cropped_icons_dict(
-                self.application_window, annotation_dict
+                self.application_window, annotation_dict, frame=self._frame
             )
             filtered_icon_dict = model_icon.control_filter(
                 annotation_dict,
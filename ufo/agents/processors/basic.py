@@ -3,10 +3,11 @@
 
 
 import json
-import time
+import logging
+import threading
 import traceback
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
 from pywinauto.controls.uiawrapper import UIAWrapper
 
@@ -15,8 +16,12 @@ from ufo.agents.agent.basic import BasicAgent
 from ufo.agents.memory.memory import MemoryItem
 from ufo.automator.ui_control.inspector import ControlInspectorFacade
 from ufo.automator.ui_control.screenshot import PhotographerFacade
+from ufo.automator.ui_control.settle import SettleWaiter
 from ufo.config.config import Config
 from ufo.module.context import Context, ContextNames
+from ufo.module.profiler import PhaseProfiler, StepProfile
+from ufo.module.scheduler import DesktopScheduler
+from ufo.module.warmup import WarmUp
 
 configs = Config.get_instance().config_data
 BACKEND = configs["CONTROL_BACKEND"]
@@ -29,6 +34,9 @@ class BaseProcessor(ABC):
     Each processor is responsible for processing the user request and updating the HostAgent and AppAgent at a single step in a round.
     """
 
+    # Guard the costs of the context, which the completions finished in the background also add to.
+    _cost_lock = threading.Lock()
+
     def __init__(self, agent: BasicAgent, context: Context) -> None:
         """
         Initialize the processor.
@@ -72,51 +80,87 @@ class BaseProcessor(ABC):
         9. Update the memory.
         10. Update the step and status.
         11. Update the step.
+        Each phase is timed if the profiler of the session is enabled.
+        """
+
+        profile = self.start_profile()
+        try:
+            self._process(profile)
+        finally:
+            profile.finish()
+
+    def _process(self, profile: StepProfile) -> None:
+        """
+        Process the phases of a single step, each phase timed by the profile of the step.
+        :param profile: The profile of the step.
         """
 
         # Step 1: Print the step information.
-        self.print_step_info()
+        with profile.phase("print_step_info"):
+            self.print_step_info()
+
+        # Wait for the resources loaded in the background since the session started, only the first steps may wait.
+        warm_up: Optional[WarmUp] = self.context.get(ContextNames.WARM_UP)
+        if warm_up is not None and not warm_up.ready:
+            with profile.phase("wait_for_warm_up"):
+                warm_up.wait()
 
-        # Step 2: Capture the screenshot.
-        self.capture_screenshot()
+        # The desktop phases are serialised with the other sessions running concurrently.
+        with DesktopScheduler.desktop_phase():
+            # Step 2: Capture the screenshot.
+            with profile.phase("capture_screenshot"):
+                self.capture_screenshot()
 
-        # Step 3: Get the control information.
-        self.get_control_info()
+            # Step 3: Get the control information.
+            with profile.phase("get_control_info"):
+                self.get_control_info()
 
         # Step 4: Get the prompt message.
-        self.get_prompt_message()
+        with profile.phase("get_prompt_message"):
+            self.get_prompt_message()
 
         # Step 5: Get the response.
-        self.get_response()
+        with profile.phase("get_response"):
+            self.get_response()
 
         if self.is_error():
             return
 
         # Step 6: Update the context.
-        self.update_cost()
+        with profile.phase("update_cost"):
+            self.update_cost()
 
         # Step 7: Parse the response, if there is no error.
-        self.parse_response()
+        with profile.phase("parse_response"):
+            self.parse_response()
 
         if self.is_error() or self.is_paused():
             # If the session is pending, update the step and memory, and return.
             if self.is_pending():
-                self.update_step()
-                self.update_memory()
+                with profile.phase("update_step"):
+                    self.update_step()
+                with profile.phase("update_memory"):
+                    self.update_memory()
 
             return
 
         # Step 8: Execute the action.
-        self.execute_action()
+        with DesktopScheduler.desktop_phase():
+            with profile.phase("execute_action"):
+                self.execute_action()
 
         # Step 9: Update the memory.
-        self.update_memory()
+        with profile.phase("update_memory"):
+            self.update_memory()
 
         # Step 10: Update the status.
-        self.update_status()
+        with DesktopScheduler.desktop_phase():
+            with profile.phase("update_status"):
+                self.update_status()
 
         # Step 11: Update the context.
-        self.update_step()
+        with profile.phase("update_step"):
+            self.update_step()
 
     def resume(self) -> None:
         """
@@ -124,21 +168,50 @@ class BaseProcessor(ABC):
         """
 
         self._is_resumed = True
+        profile = self.start_profile(resumed=True)
 
-        # Step 1: Execute the action.
-        self.execute_action()
+        try:
+            # Step 1: Execute the action.
+            with DesktopScheduler.desktop_phase():
+                with profile.phase("execute_action"):
+                    self.execute_action()
 
-        # Step 2: Update the memory.
-        self.update_memory()
+            # Step 2: Update the memory.
+            with profile.phase("update_memory"):
+                self.update_memory()
 
-        # Step 3: Update the status.
-        self.update_status()
+            # Step 3: Update the status.
+            with DesktopScheduler.desktop_phase():
+                with profile.phase("update_status"):
+                    self.update_status()
 
-        # Step 4: Update the step.
-        self.update_step()
+            # Step 4: Update the step.
+            with profile.phase("update_step"):
+                self.update_step()
+        finally:
+            profile.finish()
 
         self._is_resumed = False
 
+    def start_profile(self, resumed: bool = False) -> StepProfile:
+        """
+        Start the profile of the step, which does nothing if the profiler of the session is disabled.
+        :param resumed: Whether the step is resumed after the session was paused.
+        :return: The profile of the step.
+        """
+        profiler: Optional[PhaseProfiler] = self.context.get(ContextNames.PROFILER)
+        if profiler is None:
+            return PhaseProfiler.disabled
+
+        return profiler.start_step(
+            self.agent.__class__.__name__,
+            Step=self.session_step,
+            Round=self.round_num,
+            Processor=self.name,
+            AgentName=self.agent.name,
+            Resumed=resumed,
+        )
+
     @abstractmethod
     def print_step_info(self) -> None:
         """
@@ -203,7 +276,13 @@ class BaseProcessor(ABC):
         self.agent.status = self.status
 
         if self.status != self._agent_status_manager.FINISH.value:
-            time.sleep(configs["SLEEP_TIME"])
+            SettleWaiter.wait_until_settled(
+                self.application_window,
+                BACKEND,
+                self.settle_logger,
+                processor=self.name,
+                step=self.session_step,
+            )
 
     @property
     def context(self) -> Context:
@@ -218,8 +297,19 @@ class BaseProcessor(ABC):
         Update the cost.
         """
 
-        self.round_cost += self.cost
-        self.session_cost += self.cost
+        with self._cost_lock:
+            self.round_cost += self.cost
+            self.session_cost += self.cost
+
+    def add_late_cost(self, cost: float) -> None:
+        """
+        Add the cost of a completion of the step finished after its response was used, e.g. the losing completion of a
+        hedged request, to the session cost. It is called from the thread of the completion.
+        :param cost: The cost.
+        """
+
+        with self._cost_lock:
+            self.session_cost += cost
 
     def update_step(self) -> None:
         """
@@ -484,6 +574,14 @@ class BaseProcessor(ABC):
         """
         return self.context.get(ContextNames.LOGGER)
 
+    @property
+    def settle_logger(self) -> logging.Logger:
+        """
+        Get the logger of the waits until the UI is settled.
+        :return: The settle logger.
+        """
+        return self.context.get(ContextNames.SETTLE_LOGGER)
+
     @property
     def subtask(self) -> str:
         """
@@ -33,6 +33,10 @@ class FollowerAppAgentProcessor(AppAgentProcessor):
         Get the prompt message for the AppAgent in the follower mode. It may accept additional prompts as input.
         """
 
+        # The LLM is skipped on an action cache hit.
+        if self._cached_response is not None:
+            return
+
         examples, tips = self.demonstration_prompt_helper()
 
         external_knowledge_prompt = self.app_agent.external_knowledge_prompt_helper(
@@ -9,6 +9,7 @@ from pywinauto.controls.uiawrapper import UIAWrapper
 
 from ufo import utils
 from ufo.agents.processors.basic import BaseProcessor
+from ufo.automator.ui_control.screenshot import ImageEncodingPolicy
 from ufo.config.config import Config
 from ufo.module.context import Context, ContextNames
 
@@ -60,14 +61,15 @@ class HostAgentProcessor(BaseProcessor):
 
         self._memory_data.set_values_from_dict({"CleanScreenshot": desktop_save_path})
 
-        # Capture the desktop screenshot for all screens.
-        self.photographer.capture_desktop_screen_screenshot(
-            all_screens=True, save_path=desktop_save_path
+        # Capture the desktop screenshot for all screens, and save it in the background.
+        desktop_screenshot = self.photographer.capture_desktop_screen_screenshot(
+            all_screens=True
         )
+        self.photographer.save_image(desktop_screenshot, desktop_save_path)
 
         # Encode the desktop screenshot into base64 format as required by the LLM.
         self._desktop_screen_url = self.photographer.encode_image_from_path(
-            desktop_save_path
+            desktop_save_path, policy=ImageEncodingPolicy.from_config("HOST_AGENT")
         )
 
     def get_control_info(self) -> None:
@@ -119,7 +121,10 @@ class HostAgentProcessor(BaseProcessor):
         # Try to get the response from the LLM. If an error occurs, catch the exception and log the error.
         try:
             self._response, self.cost = self.host_agent.get_response(
-                self._prompt_message, "HOSTAGENT", use_backup_engine=True
+                self._prompt_message,
+                "HOSTAGENT",
+                use_backup_engine=True,
+                on_late_cost=self.add_late_cost,
             )
 
         except Exception:
@@ -160,7 +165,9 @@ class HostAgentProcessor(BaseProcessor):
 
         # When the required application is not opened, try to open the application and set the focus to the application window.
         if self.app_to_open is not None:
-            new_app_window = self.host_agent.app_file_manager(self.app_to_open)
+            new_app_window = self.host_agent.app_file_manager(
+                self.app_to_open, self.settle_logger
+            )
             self.control_text = new_app_window.window_text()
         else:
             # Get the application window
@@ -208,8 +208,8 @@ class ContinueHostAgentState(HostAgentState):
                 f"The {context.get(ContextNames.MODE)} mode is not supported."
             )
 
-        # Create the COM receiver for the app agent.
-        if configs.get("USE_APIS", False):
+        # Create the COM receiver for the app agent. The fake desktop has no real application to connect to.
+        if configs.get("USE_APIS", False) and not configs.get("FAKE_DESKTOP", False):
             app_agent.Puppeteer.receiver_manager.create_api_receiver(
                 application_root_name, application_window_name
             )
@@ -3,11 +3,13 @@
 
 from typing import Any, Dict, List, Type
 
-import pandas as pd
-
+from ufo import utils
 from ufo.automator.app_apis.basic import WinCOMCommand, WinCOMReceiverBasic
 from ufo.automator.basic import CommandBasic
 
+# Lazy import pandas until a table is read, it is slow to load.
+pd = utils.LazyImport("pandas")
+
 
 class ExcelWinCOMReceiver(WinCOMReceiverBasic):
     """
@@ -3,7 +3,17 @@
 
 import os
 from collections import deque
-from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Type, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Type,
+    Union,
+)
 
 from pywinauto.controls.uiawrapper import UIAWrapper
 
@@ -73,15 +83,32 @@ class AppPuppeteer:
         command = self.create_command(command_name, params, *args, **kwargs)
         return command.execute()
 
-    def execute_all_commands(self) -> List[Any]:
+    def execute_all_commands(
+        self, is_failure: Optional[Callable[[Any], bool]] = None
+    ) -> List[Any]:
         """
         Execute all the commands in the command queue.
+        :param is_failure: The function telling whether a result is a failure. If given, the execution stops at the
+        first failed command, an exception counts as a failure, and the rest of the queue is dropped.
         :return: The execution results.
         """
         results = []
         while self.command_queue:
             command = self.command_queue.popleft()
-            results.append(command.execute())
+
+            if is_failure is None:
+                results.append(command.execute())
+                continue
+
+            try:
+                result = command.execute()
+            except Exception as e:
+                result = f"An error occurred: {e}"
+            results.append(result)
+
+            if is_failure(result):
+                self.command_queue.clear()
+                break
 
         return results
 
@@ -96,6 +123,28 @@ class AppPuppeteer:
         command = self.create_command(command_name, params, *args, **kwargs)
         self.command_queue.append(command)
 
+    def add_control_command(
+        self,
+        control: UIAWrapper,
+        application: UIAWrapper,
+        command_name: str,
+        params: Dict[str, Any],
+    ) -> None:
+        """
+        Add a command on a UI control to the command queue. The receiver of the control is created when the command is
+        executed, so that the control is focused and waited for after the commands before it.
+        :param control: The control element.
+        :param application: The application element.
+        :param command_name: The command name.
+        :param params: The arguments.
+        """
+
+        def create_command() -> CommandBasic:
+            self.receiver_manager.create_ui_control_receiver(control, application)
+            return self.create_command(command_name, params)
+
+        self.command_queue.append(DeferredCommand(create_command))
+
     def get_command_queue_length(self) -> int:
         """
         Get the length of the command queue.
@@ -144,6 +193,18 @@ class AppPuppeteer:
         if com_receiver is not None:
             com_receiver.close()
 
+    @staticmethod
+    def is_error_result(result: Any) -> bool:
+        """
+        Check whether the result of a command is the error message returned by the receivers.
+        :param result: The result of the command.
+        :return: True if the command failed.
+        """
+        return isinstance(result, str) and (
+            result.startswith("An error occurred")
+            or "doesn't have a method named" in result
+        )
+
     @staticmethod
     def get_command_string(command_name: str, params: Dict[str, str]) -> str:
         """
@@ -159,6 +220,36 @@ class AppPuppeteer:
         return f"{command_name}({args_str})"
 
 
+class DeferredCommand(CommandBasic):
+    """
+    The command created only when it is executed, for the queued commands depending on the state left by the commands
+    before them.
+    """
+
+    def __init__(self, create_command: Callable[[], CommandBasic]) -> None:
+        """
+        Initialize the deferred command.
+        :param create_command: The function creating the command.
+        """
+        super().__init__(None)
+        self.create_command = create_command
+
+    def execute(self) -> Any:
+        """
+        Create and execute the command.
+        :return: The execution result.
+        """
+        return self.create_command().execute()
+
+    @classmethod
+    def name(cls) -> str:
+        """
+        Get the name of the command.
+        :return: The name of the command.
+        """
+        return "deferred_command"
+
+
 class ReceiverManager:
     """
     The class for the receiver manager.
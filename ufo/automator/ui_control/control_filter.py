@@ -1,10 +1,11 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
-import heapq
 import re
+import threading
 import warnings
 from abc import abstractmethod
-from typing import Dict, List
+from collections import OrderedDict
+from typing import Dict, List, Tuple
 
 warnings.filterwarnings("ignore")
 
@@ -68,18 +69,21 @@ class BasicControlFilter:
     """
 
     _instances = {}
+    _lock = threading.Lock()
 
     def __new__(cls, model_path):
         """
-        Creates a new instance of BasicControlFilter.
+        Creates a new instance of BasicControlFilter. The model is loaded once, even if the filter is created by the
+        warm-up and a step at the same time.
         :param model_path: The path to the model.
         :return: The BasicControlFilter instance.
         """
-        if model_path not in cls._instances:
-            instance = super(BasicControlFilter, cls).__new__(cls)
-            instance.model = cls.load_model(model_path)
-            cls._instances[model_path] = instance
-        return cls._instances[model_path]
+        with cls._lock:
+            if model_path not in cls._instances:
+                instance = super(BasicControlFilter, cls).__new__(cls)
+                instance.model = cls.load_model(model_path)
+                cls._instances[model_path] = instance
+            return cls._instances[model_path]
 
     @staticmethod
     def load_model(model_path):
@@ -162,6 +166,21 @@ class BasicControlFilter:
 
         return sentence_transformers.util.cos_sim(embedding1, embedding2)
 
+    @staticmethod
+    def topk_labels(labels: List[str], scores, top_k: int) -> List[str]:
+        """
+        Selects the labels of the top-k scores.
+        :param labels: The labels of the scored items.
+        :param scores: The 1-D tensor of the scores, aligned with the labels.
+        :param top_k: The number of top labels to return.
+        :return: The labels of the top-k scores.
+        """
+        if top_k <= 0 or len(labels) == 0:
+            return []
+
+        topk_indices = scores.topk(min(top_k, len(labels))).indices.tolist()
+        return [labels[index] for index in topk_indices]
+
 
 class TextControlFilter:
     """
@@ -209,34 +228,113 @@ class SemanticControlFilter(BasicControlFilter):
     def control_filter(self, control_dicts, plans, top_k):
         """
         Filters control items based on their similarity to a set of keywords.
+        The plans are embedded once, and all the control texts are embedded in one batch.
         :param control_dicts: The dictionary of control items to be filtered.
         :param plans: The list of plans to be used for filtering.
         :param top_k: The number of top control items to return.
         :return: The filtered control items.
         """
-        scores_items = []
-        filtered_control_dict = {}
+        if not control_dicts or not plans:
+            return {}
 
-        for label, control_item in control_dicts.items():
-            control_text = control_item.element_info.name.lower()
-            score = self.control_filter_score(control_text, plans)
-            scores_items.append((label, score))
-        topk_scores_items = heapq.nlargest(top_k, (scores_items), key=lambda x: x[1])
-        topk_items = [
-            (score_item[0], score_item[1]) for score_item in topk_scores_items
+        labels = list(control_dicts.keys())
+        control_texts = [
+            control_item.element_info.name.lower()
+            for control_item in control_dicts.values()
         ]
 
-        for label, control_item in control_dicts.items():
-            if label in topk_items:
-                filtered_control_dict[label] = control_item
-        return filtered_control_dict
+        plans_embedding = self.get_embedding(plans)
+        control_texts_embedding = self.get_embedding(control_texts)
+
+        # The score of a control is its highest similarity to any of the plans.
+        similarity = self.cos_sim(control_texts_embedding, plans_embedding)
+        scores = similarity.max(dim=1).values
+        topk_labels = set(self.topk_labels(labels, scores, top_k))
+
+        return {
+            label: control_item
+            for label, control_item in control_dicts.items()
+            if label in topk_labels
+        }
 
 
 class IconControlFilter(BasicControlFilter):
     """
     A class that represents a icon model for control filtering.
+    The icon embeddings are cached by the perceptual hash of the icon pixels, so the icons unchanged between steps are not encoded again.
     """
 
+    icon_cache_size = 2048
+
+    def __new__(cls, model_path):
+        """
+        Creates a new instance of IconControlFilter with an empty icon embedding cache.
+        :param model_path: The path to the model.
+        :return: The IconControlFilter instance.
+        """
+        instance = super().__new__(cls, model_path)
+        if not hasattr(instance, "icon_embedding_cache"):
+            instance.icon_embedding_cache = OrderedDict()
+            instance.icon_cache_lock = threading.Lock()
+            instance.icon_cache_hits = 0
+            instance.icon_cache_misses = 0
+        return instance
+
+    @staticmethod
+    def icon_hash(control_icon) -> Tuple[int, int, int]:
+        """
+        Computes the perceptual (difference) hash of the icon pixels.
+        :param control_icon: The control icon image.
+        :return: The size of the icon and its 256-bit difference hash.
+        """
+        pixels = list(control_icon.convert("L").resize((17, 16)).getdata())
+
+        icon_hash = 0
+        for row in range(16):
+            for col in range(16):
+                left = pixels[row * 17 + col]
+                right = pixels[row * 17 + col + 1]
+                icon_hash = (icon_hash << 1) | (left > right)
+
+        return control_icon.width, control_icon.height, icon_hash
+
+    def get_icon_embeddings(self, control_icons: List):
+        """
+        Gets the embeddings of the icons, encoding only the icons missing in the cache in one batch.
+        :param control_icons: The list of the control icon images.
+        :return: The embeddings of the icons, aligned with the list.
+        """
+        import numpy as np
+
+        icon_hashes = [self.icon_hash(control_icon) for control_icon in control_icons]
+        embeddings = [None] * len(control_icons)
+        missing_indices = []
+
+        with self.icon_cache_lock:
+            for index, icon_hash in enumerate(icon_hashes):
+                embedding = self.icon_embedding_cache.get(icon_hash)
+                if embedding is None:
+                    missing_indices.append(index)
+                else:
+                    self.icon_embedding_cache.move_to_end(icon_hash)
+                    embeddings[index] = embedding
+            self.icon_cache_hits += len(control_icons) - len(missing_indices)
+            self.icon_cache_misses += len(missing_indices)
+
+        if missing_indices:
+            missing_embeddings = self.get_embedding(
+                [control_icons[index] for index in missing_indices]
+            )
+
+            with self.icon_cache_lock:
+                for index, embedding in zip(missing_indices, missing_embeddings):
+                    embeddings[index] = embedding
+                    self.icon_embedding_cache[icon_hashes[index]] = embedding
+                while len(self.icon_embedding_cache) > self.icon_cache_size:
+                    self.icon_embedding_cache.popitem(last=False)
+
+        return np.stack(embeddings)
+
     def control_filter_score(self, control_icon, plans):
         """
         Calculates the score of a control icon based on its similarity to the given keywords.
@@ -246,29 +344,36 @@ class IconControlFilter(BasicControlFilter):
         """
 
         plans_embedding = self.get_embedding(plans)
-        control_icon_embedding = self.get_embedding(control_icon)
+        control_icon_embedding = self.get_icon_embeddings([control_icon])
         return max(self.cos_sim(control_icon_embedding, plans_embedding).tolist()[0])
 
     def control_filter(self, control_dicts, cropped_icons_dict, plans, top_k):
         """
         Filters control items based on their scores and returns the top-k items.
+        The plans are embedded once, and the icons missing in the cache are embedded in one batch.
         :param control_dicts: The dictionary of all control items.
         :param cropped_icons_dict: The dictionary of the cropped icons.
         :param plans: The plans to compare the control icons against.
         :param top_k: The number of top items to return.
         :return: The list of top-k control items based on their scores.
         """
+        if not cropped_icons_dict or not plans:
+            return {}
 
-        scores_items = []
-        filtered_control_dict = {}
-
-        for label, cropped_icon in cropped_icons_dict.items():
-            score = self.control_filter_score(cropped_icon, plans)
-            scores_items.append((score, label))
-        topk_scores_items = heapq.nlargest(top_k, scores_items, key=lambda x: x[0])
-        topk_labels = [scores_items[1] for scores_items in topk_scores_items]
+        labels = list(cropped_icons_dict.keys())
 
-        for label, control_item in control_dicts.items():
-            if label in topk_labels:
-                filtered_control_dict[label] = control_item
-        return filtered_control_dict
+        plans_embedding = self.get_embedding(plans)
+        control_icons_embedding = self.get_icon_embeddings(
+            list(cropped_icons_dict.values())
+        )
+
+        # The score of an icon is its highest similarity to any of the plans.
+        similarity = self.cos_sim(control_icons_embedding, plans_embedding)
+        scores = similarity.max(dim=1).values
+        topk_labels = set(self.topk_labels(labels, scores, top_k))
+
+        return {
+            label: control_item
+            for label, control_item in control_dicts.items()
+            if label in topk_labels
+        }
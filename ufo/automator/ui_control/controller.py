@@ -10,6 +10,8 @@ from pywinauto.controls.uiawrapper import UIAWrapper
 
 from ufo.automator.basic import CommandBasic, ReceiverBasic, ReceiverFactory
 from ufo.automator.puppeteer import ReceiverManager
+from ufo.automator.ui_control.inspector import ControlInspectorFacade
+from ufo.automator.ui_control.text_input import TextInputManager
 from ufo.config.config import Config
 from ufo.utils import print_with_color
 
@@ -94,6 +96,9 @@ class ControlReceiver(ReceiverBasic):
 
         text = params.get("text", "")
 
+        if configs.get("INPUT_TEXT_FAST", False):
+            return self.fast_input_text(text)
+
         if configs["INPUT_TEXT_API"] == "set_text":
             method_name = "set_edit_text"
             args = {"text": text}
@@ -130,6 +135,27 @@ class ControlReceiver(ReceiverBasic):
             else:
                 return f"An error occurred: {e}"
 
+    def fast_input_text(self, text: str) -> str:
+        """
+        Enter the text with the fastest text input strategy that works on the control, see TextInputManager.
+        The text replaces the content of the control with the set_text input API, otherwise it is inserted at the caret.
+        :param text: The text to enter.
+        :return: The result of the input action.
+        """
+
+        try:
+            result = TextInputManager.input_text(
+                self.control,
+                text,
+                ControlInspectorFacade.get_application_root_name(self.application),
+                replace=configs["INPUT_TEXT_API"] == "set_text",
+            )
+            if configs["INPUT_TEXT_ENTER"]:
+                self.atomic_execution("type_keys", params={"keys": "{ENTER}"})
+            return result
+        except Exception as e:
+            return f"An error occurred: {e}"
+
     def keyboard_input(self, params: Dict[str, str]) -> str:
         """
         Keyboard input on the control element.
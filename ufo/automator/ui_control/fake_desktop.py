@@ -0,0 +1,659 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+import random
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+from PIL import Image, ImageDraw
+
+from ufo.automator.ui_control.inspector import BackendFactory, UIABackendStrategy
+from ufo.automator.ui_control.screenshot import Photographer, PhotographerFactory
+from ufo.automator.ui_control.text_input import SystemClipboard, TextInputManager
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+
+class FakeRect:
+    """
+    The rectangle of a fake control, with the same interface as the pywinauto RECT.
+    """
+
+    def __init__(self, left: int, top: int, right: int, bottom: int) -> None:
+        """
+        Initialize the rectangle.
+        :param left: The left coordinate.
+        :param top: The top coordinate.
+        :param right: The right coordinate.
+        :param bottom: The bottom coordinate.
+        """
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+
+    def width(self) -> int:
+        """
+        Get the width of the rectangle.
+        :return: The width.
+        """
+        return self.right - self.left
+
+    def height(self) -> int:
+        """
+        Get the height of the rectangle.
+        :return: The height.
+        """
+        return self.bottom - self.top
+
+    def mid_point(self) -> Tuple[int, int]:
+        """
+        Get the center of the rectangle.
+        :return: The center point.
+        """
+        return (self.left + self.width() // 2, self.top + self.height() // 2)
+
+    def to_list(self) -> List[int]:
+        """
+        Get the coordinates of the rectangle.
+        :return: The list of (left, top, right, bottom).
+        """
+        return [self.left, self.top, self.right, self.bottom]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FakeRect) and self.to_list() == other.to_list()
+
+    def __repr__(self) -> str:
+        return "(L{}, T{}, R{}, B{})".format(*self.to_list())
+
+
+class FakeClipboard:
+    """
+    The clipboard of a fake desktop, with the same interface as the system clipboard used by the text input.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the clipboard.
+        """
+        self.text: Optional[str] = None
+
+    def get_text(self) -> Optional[str]:
+        """
+        Get the text on the clipboard.
+        :return: The text, None if the clipboard has no text.
+        """
+        return self.text
+
+    def set_text(self, text: Optional[str]) -> None:
+        """
+        Put the text on the clipboard.
+        :param text: The text, None to empty the clipboard.
+        """
+        self.text = text
+
+
+class FakeElementInfo:
+    """
+    The element info of a fake control, with the fields read by UFO from the pywinauto element info.
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        control_type: str = "Pane",
+        class_name: str = "",
+        rectangle: Optional[FakeRect] = None,
+        process_id: int = 0,
+        runtime_id: Tuple[int, ...] = (),
+        control_id: int = 0,
+        automation_id: str = "",
+        enabled: bool = True,
+        visible: bool = True,
+    ) -> None:
+        """
+        Initialize the element info.
+        """
+        self.name = name
+        self.control_type = control_type
+        self.class_name = class_name
+        self.rectangle = rectangle if rectangle is not None else FakeRect(0, 0, 0, 0)
+        self.process_id = process_id
+        self.runtime_id = runtime_id
+        self.control_id = control_id
+        self.automation_id = automation_id
+        self.enabled = enabled
+        self.visible = visible
+        self.handle = 0
+
+
+class FakeControl:
+    """
+    An in-memory control that stands in for the pywinauto UIAWrapper. The actions on it are recorded to the fake desktop instead of being sent to the real UI.
+    """
+
+    def __init__(
+        self,
+        element_info: FakeElementInfo,
+        desktop: "FakeDesktop",
+        application_root_name: str = "",
+    ) -> None:
+        """
+        Initialize the fake control.
+        :param element_info: The element info of the control.
+        :param desktop: The fake desktop that owns the control.
+        :param application_root_name: The process name of the application, only set for the top-level windows.
+        """
+        self.element_info = element_info
+        self.desktop = desktop
+        self.parent: Optional[FakeControl] = None
+        self._children: List[FakeControl] = []
+        self._application_root_name = application_root_name
+        self.value = element_info.name if element_info.control_type == "Edit" else ""
+
+    def add_child(self, child: "FakeControl") -> None:
+        """
+        Add a child control.
+        :param child: The child control.
+        """
+        child.parent = self
+        self._children.append(child)
+
+    def top_level_parent(self) -> "FakeControl":
+        """
+        Get the top-level window of the control.
+        :return: The top-level window.
+        """
+        control = self
+        while control.parent is not None:
+            control = control.parent
+        return control
+
+    def application_root_name(self) -> str:
+        """
+        Get the process name of the application of the control.
+        :return: The process name.
+        """
+        return self.top_level_parent()._application_root_name
+
+    def window_text(self) -> str:
+        """
+        Get the text of the control.
+        :return: The text.
+        """
+        return (
+            self.value
+            if self.element_info.control_type == "Edit"
+            else self.element_info.name
+        )
+
+    def texts(self) -> List[str]:
+        """
+        Get the texts of the control.
+        :return: The texts.
+        """
+        return [self.window_text()]
+
+    def rectangle(self) -> FakeRect:
+        """
+        Get the rectangle of the control.
+        :return: The rectangle.
+        """
+        return self.element_info.rectangle
+
+    def process_id(self) -> int:
+        """
+        Get the process id of the control.
+        :return: The process id.
+        """
+        return self.element_info.process_id
+
+    def is_visible(self) -> bool:
+        return self.element_info.visible
+
+    def is_enabled(self) -> bool:
+        return self.element_info.enabled
+
+    def is_normal(self) -> bool:
+        return True
+
+    def children(self, **criteria: Any) -> List["FakeControl"]:
+        """
+        Get the child controls matching the criteria.
+        :param criteria: The control_type or class_name to match.
+        :return: The child controls.
+        """
+        return [child for child in self._children if child._match(**criteria)]
+
+    def descendants(
+        self,
+        control_type: Optional[str] = None,
+        class_name: Optional[str] = None,
+        depth: Optional[int] = None,
+    ) -> List["FakeControl"]:
+        """
+        Get the descendant controls in depth-first order, like the pywinauto descendants.
+        :param control_type: The control type to match.
+        :param class_name: The class name to match.
+        :param depth: The maximum depth to search, unlimited if not given.
+        :return: The descendant controls.
+        """
+        result = []
+        stack = [(child, 1) for child in reversed(self._children)]
+        while stack:
+            control, level = stack.pop()
+            if control._match(control_type=control_type, class_name=class_name):
+                result.append(control)
+            if depth is None or level < depth:
+                stack.extend(
+                    (child, level + 1) for child in reversed(control._children)
+                )
+        return result
+
+    def _match(
+        self, control_type: Optional[str] = None, class_name: Optional[str] = None
+    ) -> bool:
+        """
+        Check whether the control matches the criteria.
+        """
+        return (
+            control_type is None or self.element_info.control_type == control_type
+        ) and (class_name is None or self.element_info.class_name == class_name)
+
+    def capture_as_image(self, rect: Optional[FakeRect] = None) -> Image.Image:
+        """
+        Render the control area of the fake desktop.
+        :param rect: The area to render, the control rectangle if not given.
+        :return: The rendered image.
+        """
+        return self.desktop.render(rect if rect is not None else self.rectangle())
+
+    def set_focus(self) -> "FakeControl":
+        self.desktop.focus = self.top_level_parent()
+        return self
+
+    def draw_outline(self, **kwargs: Any) -> None:
+        pass
+
+    def click_input(self, **kwargs: Any) -> str:
+        return self.desktop.record_action(self, "click_input", kwargs)
+
+    def click(self, **kwargs: Any) -> str:
+        return self.desktop.record_action(self, "click", kwargs)
+
+    def wheel_mouse_input(self, **kwargs: Any) -> str:
+        return self.desktop.record_action(self, "wheel_mouse_input", kwargs)
+
+    def type_keys(self, keys: str = "", **kwargs: Any) -> str:
+        if self.element_info.control_type == "Edit":
+            self.value = self._apply_keys(self.value, keys)
+        return self.desktop.record_action(self, "type_keys", dict(kwargs, keys=keys))
+
+    def _apply_keys(self, value: str, keys: str) -> str:
+        """
+        Apply the keys in the pywinauto format to the value of an edit control. Supports the text keys, {ENTER}, {TAB},
+        {BACKSPACE}, and ^a and ^v for selecting all and pasting the clipboard of the desktop.
+        :param value: The value before the keys.
+        :param keys: The keys.
+        :return: The value after the keys.
+        """
+        selected = False
+        for key in re.findall(r"\{[^}]+\}|[\^%+].|.", keys, flags=re.DOTALL):
+            if key == "^a":
+                selected = True
+                continue
+
+            if key == "{BACKSPACE}":
+                value = "" if selected else value[:-1]
+            else:
+                if key == "^v":
+                    text = self.desktop.clipboard.get_text() or ""
+                else:
+                    text = {"{ENTER}": "\n", "{TAB}": "\t"}.get(key, key)
+                if len(key) > 1 and text == key:
+                    # Other special keys and shortcuts do not change the value.
+                    continue
+                value = text if selected else value + text
+            selected = False
+
+        return value
+
+    def set_edit_text(self, text: str = "", **kwargs: Any) -> str:
+        self.value = text
+        return self.desktop.record_action(
+            self, "set_edit_text", dict(kwargs, text=text)
+        )
+
+    def __repr__(self) -> str:
+        return "FakeControl({name!r}, {control_type})".format(
+            name=self.element_info.name, control_type=self.element_info.control_type
+        )
+
+
+class FakeDesktop:
+    """
+    An in-memory desktop of fake controls, built from a recording of real windows or generated synthetically.
+    Each thread has its own current desktop, so concurrent sessions never share UI state.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        """
+        Build the desktop from its spec.
+        :param spec: The spec of the desktop: {"width", "height", "windows": [node]}, where a node is
+        {"name", "control_type", "class_name", "rect", "enabled", "visible", "process_name", "children": [node]}.
+        """
+        self.width = spec.get("width", 1920)
+        self.height = spec.get("height", 1080)
+        self.action_log: List[Dict[str, Any]] = []
+        self.focus: Optional[FakeControl] = None
+        self.clipboard = FakeClipboard()
+        self._next_runtime_id = 1
+
+        self._windows = [
+            self._build(node, process_id=index + 1)
+            for index, node in enumerate(spec.get("windows", []))
+        ]
+
+    def _build(self, node: Dict[str, Any], process_id: int) -> FakeControl:
+        """
+        Build the control tree of a node.
+        :param node: The node spec.
+        :param process_id: The fake process id of the window.
+        :return: The control.
+        """
+        element_info = FakeElementInfo(
+            name=node.get("name", ""),
+            control_type=node.get("control_type", "Pane"),
+            class_name=node.get("class_name", ""),
+            rectangle=FakeRect(*node.get("rect", [0, 0, 0, 0])),
+            process_id=process_id,
+            runtime_id=(42, process_id, self._next_runtime_id),
+            enabled=node.get("enabled", True),
+            visible=node.get("visible", True),
+        )
+        self._next_runtime_id += 1
+
+        control = FakeControl(element_info, self, node.get("process_name", ""))
+        for child in node.get("children", []):
+            control.add_child(self._build(child, process_id))
+        return control
+
+    def windows(self) -> List[FakeControl]:
+        """
+        Get the top-level windows.
+        :return: The windows.
+        """
+        return list(self._windows)
+
+    def record_action(
+        self, control: FakeControl, action: str, params: Dict[str, Any]
+    ) -> str:
+        """
+        Record an action executed on a control.
+        :param control: The control.
+        :param action: The action name.
+        :param params: The parameters of the action.
+        :return: The result of the action, always empty.
+        """
+        self.action_log.append(
+            {
+                "control_text": control.element_info.name,
+                "control_type": control.element_info.control_type,
+                "action": action,
+                "params": params,
+            }
+        )
+        return ""
+
+    def render(self, rect: Optional[FakeRect] = None) -> Image.Image:
+        """
+        Render the area of the desktop, drawing the outline and the name of every visible control.
+        :param rect: The area to render, the whole desktop if not given.
+        :return: The rendered image.
+        """
+        rect = rect if rect is not None else FakeRect(0, 0, self.width, self.height)
+        image = Image.new("RGB", (max(1, rect.width()), max(1, rect.height())), "white")
+        draw = ImageDraw.Draw(image)
+
+        for window in self._windows:
+            for control in [window] + window.descendants():
+                if not control.is_visible():
+                    continue
+                control_rect = control.rectangle()
+                box = (
+                    control_rect.left - rect.left,
+                    control_rect.top - rect.top,
+                    control_rect.right - rect.left - 1,
+                    control_rect.bottom - rect.top - 1,
+                )
+                if box[2] < 0 or box[3] < 0 or box[2] <= box[0] or box[3] <= box[1]:
+                    continue
+                draw.rectangle(box, outline="#808080")
+                draw.text(
+                    (box[0] + 2, box[1] + 2), control.window_text()[:40], fill="black"
+                )
+
+        return image
+
+    @classmethod
+    def current(cls) -> "FakeDesktop":
+        """
+        Get the desktop of the current thread, creating it from the configuration on the first call.
+        :return: The desktop.
+        """
+        desktop = getattr(cls._local, "desktop", None)
+        if desktop is None:
+            desktop = cls.from_config()
+            cls._local.desktop = desktop
+        return desktop
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Drop the desktop of the current thread, so the next session starts from a fresh desktop.
+        """
+        cls._local.desktop = None
+
+    @classmethod
+    def use(cls, desktop: "FakeDesktop") -> None:
+        """
+        Set the desktop of the current thread, e.g. a synthetic desktop of a benchmark scenario.
+        :param desktop: The desktop.
+        """
+        cls._local.desktop = desktop
+
+    @staticmethod
+    def clipboard_of(control: Any) -> Any:
+        """
+        Get the clipboard used by the text input on a control.
+        :param control: The control.
+        :return: The clipboard of the fake desktop for a fake control, otherwise the system clipboard.
+        """
+        if isinstance(control, FakeControl):
+            return control.desktop.clipboard
+        return SystemClipboard
+
+    @classmethod
+    def from_config(cls) -> "FakeDesktop":
+        """
+        Create the desktop from the FAKE_DESKTOP_RECORDING configuration, or a synthetic desktop if no recording is given.
+        :return: The desktop.
+        """
+        recording_path = configs.get("FAKE_DESKTOP_RECORDING", "")
+        if recording_path:
+            return cls.from_recording(recording_path)
+        return cls.synthetic()
+
+    @classmethod
+    def from_recording(cls, path: str) -> "FakeDesktop":
+        """
+        Load the desktop from a recording saved by record_desktop.
+        :param path: The path of the recording.
+        :return: The desktop.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def synthetic(
+        cls,
+        window_num: int = 2,
+        control_num: int = 50,
+        seed: int = 0,
+        control_types: Optional[List[str]] = None,
+    ) -> "FakeDesktop":
+        """
+        Generate a desktop of windows with controls laid out in a grid.
+        :param window_num: The number of windows.
+        :param control_num: The number of controls in each window.
+        :param seed: The random seed of the control names.
+        :param control_types: The control types to use, the CONTROL_LIST configuration if not given.
+        :return: The desktop.
+        """
+        rng = random.Random(seed)
+        control_types = control_types or configs.get("CONTROL_LIST", ["Button"])
+        width, height = 1920, 1080
+        columns = 20
+        cell_width = width // columns
+        cell_height = max(
+            8, (height - 40) // max(1, (control_num + columns - 1) // columns)
+        )
+
+        windows = []
+        for window_index in range(window_num):
+            children = []
+            for index in range(control_num):
+                left = (index % columns) * cell_width
+                top = 40 + (index // columns) * cell_height
+                control_type = control_types[index % len(control_types)]
+                children.append(
+                    {
+                        "name": "{control_type} {word} {index}".format(
+                            control_type=control_type,
+                            word=rng.choice(
+                                ["File", "Edit", "View", "Insert", "Format", "Help"]
+                            ),
+                            index=index + 1,
+                        ),
+                        "control_type": control_type,
+                        "rect": [
+                            left,
+                            top,
+                            left + cell_width - 2,
+                            top + cell_height - 2,
+                        ],
+                    }
+                )
+            windows.append(
+                {
+                    "name": "Fake Application {index}".format(index=window_index + 1),
+                    "control_type": "Window",
+                    "class_name": "FakeWindow",
+                    "rect": [0, 0, width, height],
+                    "process_name": "fakeapp{index}.exe".format(index=window_index + 1),
+                    "children": children,
+                }
+            )
+
+        return cls({"width": width, "height": height, "windows": windows})
+
+    @staticmethod
+    def record_desktop(
+        windows: List[Any], path: str, width: int = 1920, height: int = 1080
+    ) -> None:
+        """
+        Record the control trees of real windows into a file, to be replayed by from_recording.
+        :param windows: The pywinauto windows to record.
+        :param path: The path to save the recording.
+        :param width: The width of the desktop.
+        :param height: The height of the desktop.
+        """
+
+        def record(control: Any) -> Dict[str, Any]:
+            rect = control.rectangle()
+            return {
+                "name": control.element_info.name,
+                "control_type": control.element_info.control_type,
+                "class_name": control.element_info.class_name,
+                "rect": [rect.left, rect.top, rect.right, rect.bottom],
+                "enabled": control.is_enabled(),
+                "visible": control.is_visible(),
+                "children": [record(child) for child in control.children()],
+            }
+
+        recorded_windows = []
+        for window in windows:
+            node = record(window)
+            try:
+                node["process_name"] = psutil.Process(window.process_id()).name()
+            except psutil.NoSuchProcess:
+                node["process_name"] = ""
+            recorded_windows.append(node)
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"width": width, "height": height, "windows": recorded_windows}, f
+            )
+
+
+# The text input pastes through the clipboard of the fake desktop of a fake control.
+TextInputManager.clipboard_provider = FakeDesktop.clipboard_of
+
+
+@BackendFactory.register_fake
+class FakeBackendStrategy(UIABackendStrategy):
+    """
+    The backend strategy for the in-memory fake desktop, which replaces the UI automator to run sessions without the real desktop.
+    """
+
+    def get_desktop_windows(self, remove_empty: bool) -> List[FakeControl]:
+        """
+        Get all the apps on the fake desktop of the current thread.
+        :param remove_empty: Whether to remove empty titles.
+        :return: The apps on the desktop.
+        """
+        desktop_windows = FakeDesktop.current().windows()
+        if remove_empty:
+            desktop_windows = [
+                app for app in desktop_windows if app.window_text() != ""
+            ]
+        return desktop_windows
+
+    def get_application_root_name(self, window: FakeControl) -> str:
+        """
+        Get the process name of the application of the window, given by the fake desktop.
+        :param window: The window to get the application name.
+        :return: The root application name of the window.
+        """
+        return window.application_root_name()
+
+
+@PhotographerFactory.register_fake("desktop_window")
+class FakeDesktopPhotographer(Photographer):
+    """
+    Class to capture the fake desktop of the current thread.
+    """
+
+    def __init__(self, all_screens: bool = True) -> None:
+        """
+        Initialize the FakeDesktopPhotographer.
+        :param all_screens: Whether to capture all screens, ignored as the fake desktop has a single screen.
+        """
+        self.all_screens = all_screens
+
+    def capture(self, save_path: str = None):
+        """
+        Capture a screenshot.
+        :param save_path: The path to save the screenshot.
+        :return: The screenshot.
+        """
+        screenshot = FakeDesktop.current().render()
+        if save_path is not None:
+            screenshot.save(save_path)
+        return screenshot
@@ -0,0 +1,235 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+
+class ImageStore:
+    """
+    The content-addressed store of the screenshots of a log directory. Each distinct image is saved once as a blob named
+    by the hash of its pixels, and the manifest of the directory maps the file names of the steps to the blobs, so that
+    identical frames of consecutive steps are not saved again. The file names missing from the manifest are resolved to
+    the files themselves, so that the logs of the old layout are still read.
+    """
+
+    manifest_name = "screenshots.json"
+    blob_dir_name = "blobs"
+
+    _stores: Dict[str, "ImageStore"] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, directory: str) -> None:
+        """
+        Initialize the store of a directory, loading its manifest if it exists.
+        :param directory: The log directory.
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, Dict[str, Any]] = self._read_manifest()
+        self._blobs = {entry["blob"] for entry in self._manifest.values()}
+        self._dirty = False
+
+        self._saved = 0
+        self._deduplicated = 0
+
+    @classmethod
+    def for_directory(cls, directory: str) -> "ImageStore":
+        """
+        Get the store of a directory.
+        :param directory: The log directory.
+        :return: The store.
+        """
+        directory = os.path.abspath(directory)
+        with cls._stores_lock:
+            store = cls._stores.get(directory)
+            if store is None:
+                store = cls._stores[directory] = cls(directory)
+            return store
+
+    @classmethod
+    def for_path(cls, path: str) -> "ImageStore":
+        """
+        Get the store of the directory of an image path.
+        :param path: The path of the image, e.g. logs/task/action_step1.png.
+        :return: The store.
+        """
+        return cls.for_directory(os.path.dirname(path) or ".")
+
+    @property
+    def manifest_path(self) -> str:
+        """
+        Get the path of the manifest.
+        :return: The path.
+        """
+        return os.path.join(self.directory, self.manifest_name)
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Read the manifest of the directory.
+        :return: The entries of the manifest, empty if there is no valid manifest.
+        """
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def flush(self) -> None:
+        """
+        Write the manifest if images were stored since the last write.
+        """
+        with self._lock:
+            if self._dirty:
+                self._write_manifest()
+                self._dirty = False
+
+    @classmethod
+    def flush_all(cls) -> None:
+        """
+        Write the manifests of all the stores loaded in the process.
+        """
+        with cls._stores_lock:
+            stores = list(cls._stores.values())
+        for store in stores:
+            store.flush()
+
+    def _write_manifest(self) -> None:
+        """
+        Write the manifest atomically. Must be called with the lock.
+        """
+        temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=1)
+        os.replace(temp_path, self.manifest_path)
+
+    @staticmethod
+    def image_hash(image: Image.Image) -> str:
+        """
+        Compute the hash of the pixels of an image.
+        :param image: The image.
+        :return: The hex digest.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.mode}:{image.width}x{image.height}:".encode("ascii"))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def put(self, image: Image.Image, name: str) -> str:
+        """
+        Store an image under a file name, saving its blob only if the same pixels are not stored yet. The manifest is
+        written by the next flush.
+        :param image: The image.
+        :param name: The file name of the image in the directory, e.g. action_step1.png.
+        :return: The path of the blob.
+        """
+        image_hash = self.image_hash(image)
+        blob = f"{self.blob_dir_name}/{image_hash}.png"
+        blob_path = os.path.join(self.directory, blob)
+
+        with self._lock:
+            is_new = blob not in self._blobs and not os.path.exists(blob_path)
+
+        if is_new:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            temp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+            image.save(temp_path, format="PNG")
+            os.replace(temp_path, blob_path)
+
+        with self._lock:
+            if is_new:
+                self._saved += 1
+            else:
+                self._deduplicated += 1
+            self._blobs.add(blob)
+            self._manifest[name] = {
+                "blob": blob,
+                "width": image.width,
+                "height": image.height,
+            }
+            self._dirty = True
+
+        return blob_path
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Resolve a file name to the path of its blob.
+        :param name: The file name.
+        :return: The path of the blob, None if the name is not in the manifest.
+        """
+        with self._lock:
+            entry = self._manifest.get(name)
+            if entry is None:
+                # The manifest may have been written since it was loaded, e.g. by another process.
+                self._manifest = dict(self._read_manifest(), **self._manifest)
+                entry = self._manifest.get(name)
+        if entry is None:
+            return None
+        return os.path.join(self.directory, entry["blob"])
+
+    def names(self) -> List[str]:
+        """
+        Get the file names stored in the manifest.
+        :return: The file names.
+        """
+        with self._lock:
+            return list(self._manifest.keys())
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the counters of the store.
+        :return: The number of the images stored, of the blobs saved, and of the images deduplicated.
+        """
+        with self._lock:
+            return {
+                "images": len(self._manifest),
+                "blobs": len(self._blobs),
+                "saved": self._saved,
+                "deduplicated": self._deduplicated,
+            }
+
+    @classmethod
+    def resolve_path(cls, path: str) -> str:
+        """
+        Resolve the path of a step image to the file holding its pixels.
+        :param path: The path of the image, e.g. logs/task/action_step1.png.
+        :return: The path of the blob if the image is in the manifest of its directory, otherwise the path itself.
+        """
+        if os.path.exists(path):
+            return path
+        blob_path = cls.for_path(path).resolve(os.path.basename(path))
+        return blob_path if blob_path is not None else path
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """
+        Check whether a step image is stored, as a file or in the manifest of its directory.
+        :param path: The path of the image.
+        :return: True if the image exists.
+        """
+        return os.path.exists(cls.resolve_path(path))
+
+    @classmethod
+    def list_names(cls, directory: str) -> List[str]:
+        """
+        List the file names of a log directory, including the images stored in its manifest.
+        :param directory: The log directory.
+        :return: The file names.
+        """
+        names = set(os.listdir(directory))
+        names.update(cls.for_directory(directory).names())
+        return sorted(names)
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Forget the stores loaded in the process. The files are left untouched.
+        """
+        with cls._stores_lock:
+            cls._stores.clear()
@@ -4,15 +4,15 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Dict, List
+from typing import Dict, List, Optional, Type
 
 import psutil
 from pywinauto import Desktop
 from pywinauto.controls.uiawrapper import UIAWrapper
 
+from ufo.automator.ui_control.snapshot import TreeProviderFactory, UITreeSnapshot
 from ufo.config.config import Config
 
-
 configs = Config.get_instance().config_data
 
 
@@ -21,14 +21,35 @@ class BackendFactory:
     A factory class to create backend strategies.
     """
 
-    @staticmethod
-    def create_backend(backend: str) -> BackendStrategy:
+    # The strategy of the fake desktop, registered by the fake desktop module and used for any backend if FAKE_DESKTOP is set.
+    _fake_backend: Optional[Type[BackendStrategy]] = None
+
+    @classmethod
+    def register_fake(
+        cls, strategy_class: Type[BackendStrategy]
+    ) -> Type[BackendStrategy]:
+        """
+        Decorator to register the backend strategy of the fake desktop.
+        :param strategy_class: The backend strategy class to be registered.
+        :return: The backend strategy class.
+        """
+        cls._fake_backend = strategy_class
+        return strategy_class
+
+    @classmethod
+    def create_backend(cls, backend: str) -> BackendStrategy:
         """
         Create a backend strategy.
         :param backend: The backend to use.
         :return: The backend strategy.
         """
-        if backend == "uia":
+        if configs.get("FAKE_DESKTOP", False):
+            if cls._fake_backend is None:
+                raise ValueError(
+                    "The fake desktop is not loaded, import ufo.automator.ui_control.fake_desktop first."
+                )
+            return cls._fake_backend()
+        elif backend == "uia":
             return UIABackendStrategy()
         elif backend == "win32":
             return Win32BackendStrategy()
@@ -60,6 +81,7 @@ class BackendStrategy(ABC):
         is_visible: bool = True,
         is_enabled: bool = True,
         depth: int = 0,
+        snapshot: Optional[UITreeSnapshot] = None,
     ) -> List[UIAWrapper]:
         """
         Find control elements in descendants of the window.
@@ -70,11 +92,24 @@ class BackendStrategy(ABC):
         :param is_visible: Whether the control elements are visible.
         :param is_enabled: Whether the control elements are enabled.
         :param depth: The depth of the descendants to find.
+        :param snapshot: The snapshot of the window to search in, instead of walking the live UI tree.
         :return: The control elements found.
         """
 
         pass
 
+    def get_application_root_name(self, window: UIAWrapper) -> str:
+        """
+        Get the name of the process of the window.
+        :param window: The window to get the application name.
+        :return: The root application name of the window. Empty string ("") if failed to get the name.
+        """
+        try:
+            process = psutil.Process(window.process_id())
+            return process.name()
+        except psutil.NoSuchProcess:
+            return ""
+
 
 class UIABackendStrategy(BackendStrategy):
     """
@@ -106,6 +141,7 @@ class UIABackendStrategy(BackendStrategy):
         is_visible: bool = True,
         is_enabled: bool = True,
         depth: int = 0,
+        snapshot: Optional[UITreeSnapshot] = None,
     ) -> List[UIAWrapper]:
         """
         Find control elements in descendants of the window for uia backend.
@@ -116,21 +152,25 @@ class UIABackendStrategy(BackendStrategy):
         :param is_visible: Whether the control elements are visible.
         :param is_enabled: Whether the control elements are enabled.
         :param depth: The depth of the descendants to find.
+        :param snapshot: The snapshot of the window to search in, instead of walking the live UI tree.
         :return: The control elements found.
         """
 
         if window == None:
             return []
 
+        # The snapshot has the same descendants interface as the window, and answers without a call to the UI.
+        tree = snapshot if snapshot is not None else window
+
         control_elements = []
         if len(control_type_list) == 0:
-            control_elements += window.descendants()
+            control_elements += tree.descendants()
         else:
             for control_type in control_type_list:
                 if depth == 0:
-                    subcontrols = window.descendants(control_type=control_type)
+                    subcontrols = tree.descendants(control_type=control_type)
                 else:
-                    subcontrols = window.descendants(
+                    subcontrols = tree.descendants(
                         control_type=control_type, depth=depth
                     )
                 control_elements += subcontrols
@@ -192,6 +232,7 @@ class Win32BackendStrategy(BackendStrategy):
         is_visible: bool = True,
         is_enabled: bool = True,
         depth: int = 0,
+        snapshot: Optional[UITreeSnapshot] = None,
     ) -> List[UIAWrapper]:
         """
         Find control elements in descendants of the window for win32 backend.
@@ -202,21 +243,24 @@ class Win32BackendStrategy(BackendStrategy):
         :param is_visible: Whether the control elements are visible.
         :param is_enabled: Whether the control elements are enabled.
         :param depth: The depth of the descendants to find.
+        :param snapshot: The snapshot of the window to search in, instead of walking the live UI tree.
         :return: The control elements found.
         """
 
         if window == None:
             return []
 
+        tree = snapshot if snapshot is not None else window
+
         control_elements = []
         if len(class_name_list) == 0:
-            control_elements += window.descendants()
+            control_elements += tree.descendants()
         else:
             for class_name in class_name_list:
                 if depth == 0:
-                    subcontrols = window.descendants(class_name=class_name)
+                    subcontrols = tree.descendants(class_name=class_name)
                 else:
-                    subcontrols = window.descendants(class_name=class_name, depth=depth)
+                    subcontrols = tree.descendants(class_name=class_name, depth=depth)
                 control_elements += subcontrols
 
         if is_visible:
@@ -287,6 +331,7 @@ class ControlInspectorFacade:
         is_visible: bool = True,
         is_enabled: bool = True,
         depth: int = 0,
+        snapshot: Optional[UITreeSnapshot] = None,
     ) -> List[UIAWrapper]:
         """
         Find control elements in descendants of the window.
@@ -297,19 +342,48 @@ class ControlInspectorFacade:
         :param is_visible: Whether the control elements are visible.
         :param is_enabled: Whether the control elements are enabled.
         :param depth: The depth of the descendants to find.
+        :param snapshot: The snapshot of the window to search in, instead of walking the live UI tree.
         :return: The control elements found.
         """
         if self.backend == "uia":
             return self.backend_strategy.find_control_elements_in_descendants(
-                window, control_type_list, [], title_list, is_visible, is_enabled, depth
+                window,
+                control_type_list,
+                [],
+                title_list,
+                is_visible,
+                is_enabled,
+                depth,
+                snapshot,
             )
         elif self.backend == "win32":
             return self.backend_strategy.find_control_elements_in_descendants(
-                window, [], class_name_list, title_list, is_visible, is_enabled, depth
+                window,
+                [],
+                class_name_list,
+                title_list,
+                is_visible,
+                is_enabled,
+                depth,
+                snapshot,
             )
         else:
             return []
 
+    def take_snapshot(
+        self, window: UIAWrapper, previous: Optional[UITreeSnapshot] = None
+    ) -> Optional[UITreeSnapshot]:
+        """
+        Walk the control tree of the window once and fetch the control properties into a snapshot.
+        The controls found in the snapshot read their properties from it, including in get_control_info.
+        :param window: The window to take the snapshot.
+        :param previous: The snapshot of the window at the previous step. The controls in it are only refreshed.
+        :return: The snapshot of the window, None if the window is None.
+        """
+        if window == None:
+            return None
+        return TreeProviderFactory.take_snapshot(self.backend, window, previous)
+
     def get_desktop_app_dict(self, remove_empty: bool = True) -> Dict[str, UIAWrapper]:
         """
         Get all the apps on the desktop and return as a dict.
@@ -404,9 +478,5 @@ class ControlInspectorFacade:
         """
         if window == None:
             return ""
-        process_id = window.process_id()
-        try:
-            process = psutil.Process(process_id)
-            return process.name()
-        except psutil.NoSuchProcess:
-            return ""
+        inspector = ControlInspectorFacade(configs.get("CONTROL_BACKEND", "uia"))
+        return inspector.backend_strategy.get_application_root_name(window)
@@ -67,7 +67,8 @@ class FileController:
             code_snippet = code_snippet.replace("\\", "\\\\")
             try:
                 exec(code_snippet, globals())
-                time.sleep(3)  # wait for the app to boot
+                if not configs.get("SETTLE_WAIT", False):
+                    time.sleep(3)  # wait for the app to boot
                 return True
 
             except Exception as e:
@@ -118,11 +119,12 @@ class FileController:
         # TODO: open third party app
         pass
 
-    def find_window_by_app_name(self, desktop_windows_dict):
+    def find_window_by_app_name(self, desktop_windows_dict, verbose=True):
         """
         Find the window on windows control panel by the app name.
         :param desktop_windows_dict: The windows on the desktop.
         :param app_name: The app name to find.
+        :param verbose: Whether to print when the window is not found.
         """
         title_pattern = self.app_map.get_app_name(self.APP)
         if title_pattern is None:
@@ -134,7 +136,8 @@ class FileController:
                 and title_pattern == "Explorer"
             ):
                 return window_wrapper
-        print("Window not found.")
+        if verbose:
+            print("Window not found.")
         return None
 
 
@@ -4,19 +4,102 @@
 import base64
 import mimetypes
 import os
+import queue
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
 from io import BytesIO
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 
 from PIL import Image, ImageDraw, ImageFont, ImageGrab
 from pywinauto.controls.uiawrapper import UIAWrapper
 from pywinauto.win32structures import RECT
 
+from ufo.automator.ui_control.image_store import ImageStore
 from ufo.config.config import Config
 
 configs = Config.get_instance().config_data
 
 
+@dataclass(frozen=True)
+class ImageEncodingPolicy:
+    """
+    The policy to encode the images sent to the LLM.
+    """
+
+    format: str = "PNG"
+    quality: int = 85
+    max_edge: int = 0
+    downscale_clean_only: bool = False
+
+    @classmethod
+    def from_config(cls, agent_type: str) -> "ImageEncodingPolicy":
+        """
+        Get the encoding policy of an agent from the IMAGE_ENCODING configuration.
+        :param agent_type: The agent type, e.g. "HOST_AGENT", "APP_AGENT" or "EVALUATION_AGENT".
+        :return: The encoding policy. Lossless PNG at the native resolution if the agent is not configured.
+        """
+        policy = configs.get("IMAGE_ENCODING", {}).get(agent_type, {})
+        return cls(
+            format=policy.get("FORMAT", cls.format).upper(),
+            quality=policy.get("QUALITY", cls.quality),
+            max_edge=policy.get("MAX_EDGE", cls.max_edge),
+            downscale_clean_only=policy.get(
+                "DOWNSCALE_CLEAN_ONLY", cls.downscale_clean_only
+            ),
+        )
+
+    @property
+    def mime_type(self) -> str:
+        """
+        Get the mime type of the encoded image.
+        :return: The mime type.
+        """
+        return f"image/{self.format.lower()}"
+
+    def resize(self, image: Image.Image, clean: bool = True) -> Image.Image:
+        """
+        Downscale the image so that its longest edge fits the cap. The aspect ratio is kept, so the labels stay on their controls.
+        :param image: The image to resize.
+        :param clean: Whether the image is a clean screenshot, which is the only one downscaled if downscale_clean_only is set.
+        :return: The resized image.
+        """
+        if self.max_edge <= 0 or (self.downscale_clean_only and not clean):
+            return image
+
+        longest_edge = max(image.size)
+        if longest_edge <= self.max_edge:
+            return image
+
+        scale = self.max_edge / longest_edge
+        new_size = (
+            max(1, round(image.width * scale)),
+            max(1, round(image.height * scale)),
+        )
+        return image.resize(new_size, Image.LANCZOS)
+
+    def encode(self, image: Image.Image, clean: bool = True) -> bytes:
+        """
+        Encode the image with the policy.
+        :param image: The image to encode.
+        :param clean: Whether the image is a clean screenshot.
+        :return: The encoded bytes.
+        """
+        image = self.resize(image, clean)
+        buffered = BytesIO()
+
+        if self.format == "PNG":
+            image.save(buffered, format="PNG")
+        else:
+            # JPEG has no alpha channel.
+            if self.format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.save(buffered, format=self.format, quality=self.quality)
+
+        return buffered.getvalue()
+
+
 class Photographer(ABC):
     """
     Abstract class for the photographer.
@@ -26,6 +109,14 @@ class Photographer(ABC):
     def capture(self):
         pass
 
+    def control_rectangle(self, control: UIAWrapper) -> RECT:
+        """
+        Get the rectangle of a control.
+        :param control: The control item.
+        :return: The rectangle of the control.
+        """
+        return control.rectangle()
+
 
 class ControlPhotographer(Photographer):
     """
@@ -51,6 +142,59 @@ class ControlPhotographer(Photographer):
         return screenshot
 
 
+class ScreenshotFrame(Photographer):
+    """
+    Class to hold a frame-scoped capture of a window. The window pixels and the control rectangles are grabbed once,
+    and all the screenshot variants of a step are rendered from this in-memory frame.
+    """
+
+    def __init__(self, control: UIAWrapper, control_list: List[UIAWrapper] = None):
+        """
+        Initialize the ScreenshotFrame and grab the window.
+        :param control: The window to capture.
+        :param control_list: The controls whose rectangles are grabbed together with the window.
+        """
+        self.control = control
+        self.window_rect = control.rectangle()
+        self.image = control.capture_as_image(rect=self.window_rect)
+
+        # The rectangles are keyed by the id of the control, the control is kept to pin the id.
+        self._rectangles: Dict[int, Tuple[UIAWrapper, RECT]] = {}
+        self.cache_rectangles(control_list or [])
+
+    def cache_rectangles(self, control_list: List[UIAWrapper]) -> None:
+        """
+        Grab the rectangles of the controls into the frame.
+        :param control_list: The list of the controls.
+        """
+        for control in control_list:
+            if control and id(control) not in self._rectangles:
+                self._rectangles[id(control)] = (control, control.rectangle())
+
+    def control_rectangle(self, control: UIAWrapper) -> RECT:
+        """
+        Get the rectangle of a control at the time of the frame.
+        :param control: The control item.
+        :return: The rectangle of the control.
+        """
+        if control is self.control:
+            return self.window_rect
+        if id(control) not in self._rectangles:
+            self.cache_rectangles([control])
+        return self._rectangles[id(control)][1]
+
+    def capture(self, save_path: str = None):
+        """
+        Get a copy of the frame image, so that the decorators can draw on it freely.
+        :param save_path: The path to save the screenshot.
+        :return: The screenshot.
+        """
+        screenshot = self.image.copy()
+        if save_path is not None:
+            screenshot.save(save_path)
+        return screenshot
+
+
 class DesktopPhotographer(Photographer):
     """
     Class to capture the desktop screenshot.
@@ -95,6 +239,14 @@ class PhotographerDecorator(Photographer):
         """
         return self.photographer.capture(save_path)
 
+    def control_rectangle(self, control: UIAWrapper) -> RECT:
+        """
+        Get the rectangle of a control from the decorated photographer.
+        :param control: The control item.
+        :return: The rectangle of the control.
+        """
+        return self.photographer.control_rectangle(control)
+
     @staticmethod
     def coordinate_adjusted(window_rect: RECT, control_rect: RECT):
         """
@@ -162,11 +314,11 @@ class RectangleDecorator(PhotographerDecorator):
         :return: The screenshot with rectangles.
         """
         screenshot = self.photographer.capture()
-        window_rect = self.photographer.control.rectangle()
+        window_rect = self.control_rectangle(self.photographer.control)
 
         for control in self.sub_control_list:
             if control:
-                control_rect = control.rectangle()
+                control_rect = self.control_rectangle(control)
                 adjusted_rect = self.coordinate_adjusted(window_rect, control_rect)
                 screenshot = self.draw_rectangles(
                     screenshot, coordinate=adjusted_rect, color=self.color
@@ -181,6 +333,18 @@ class AnnotationDecorator(PhotographerDecorator):
     Class to annotate the controls on the screenshot.
     """
 
+    # The fonts tried when the configured font of the labels is not installed, e.g. on Linux without arial.ttf.
+    fallback_fonts = ["DejaVuSans.ttf", "LiberationSans-Regular.ttf"]
+
+    # The loaded fonts of the labels, keyed by the font size.
+    _fonts: Dict[int, ImageFont.FreeTypeFont] = {}
+    _fonts_lock = threading.Lock()
+
+    # The rendered label sprites, keyed by the label text, the colors and the sizes, the least recent dropped first.
+    _sprites: "OrderedDict[Tuple[Any, ...], Image.Image]" = OrderedDict()
+    _sprites_lock = threading.Lock()
+    _max_sprites = 4096
+
     def __init__(
         self,
         screenshot: Image.Image,
@@ -203,40 +367,80 @@ class AnnotationDecorator(PhotographerDecorator):
         self.color_diff = color_diff
         self.color_default = color_default
 
-    @staticmethod
-    def draw_rectangles_controls(
-        image: Image.Image,
-        coordinate: tuple,
+    @classmethod
+    def load_font(cls, font_size: int = 25) -> ImageFont.FreeTypeFont:
+        """
+        Load the font of the labels, once per size.
+        :param font_size: The size of the font.
+        :return: The font.
+        """
+        with cls._fonts_lock:
+            font = cls._fonts.get(font_size)
+            if font is None:
+                font = cls._fonts[font_size] = cls._open_font(font_size)
+            return font
+
+    @classmethod
+    def _open_font(cls, font_size: int) -> ImageFont.FreeTypeFont:
+        """
+        Open the ANNOTATION_FONT, or the first fallback font installed, or the default font of Pillow.
+        :param font_size: The size of the font.
+        :return: The font.
+        """
+        for font_name in [
+            configs.get("ANNOTATION_FONT", "arial.ttf")
+        ] + cls.fallback_fonts:
+            try:
+                return ImageFont.truetype(font_name, font_size)
+            except OSError:
+                continue
+        return ImageFont.load_default(size=font_size)
+
+    @classmethod
+    def label_sprite(
+        cls,
         label_text: str,
-        botton_margin: int = 5,
-        border_width: int = 2,
+        button_color: str = "#FFF68F",
         font_size: int = 25,
         font_color: str = "#000000",
         border_color: str = "#FF0000",
-        button_color: str = "#FFF68F",
+        botton_margin: int = 5,
+        border_width: int = 2,
     ) -> Image.Image:
         """
-        Draw a rectangle around the control and label it.
-        :param image: The image to draw on.
-        :param coordinate: The coordinate of the control.
-        :param label_text: The text label of the control.
-        :param botton_margin: The margin of the button.
-        :param border_width: The width of the border.
+        Get the sprite of a label, rendering it on the first call. The sprite is shared and must not be modified.
+        :param label_text: The text of the label.
+        :param button_color: The color of the button.
         :param font_size: The size of the font.
         :param font_color: The color of the font.
         :param border_color: The color of the border.
-        :param button_color: The color of the button.
-        return: The image with the control rectangle and label.
+        :param botton_margin: The margin of the button.
+        :param border_width: The width of the border.
+        :return: The sprite.
         """
-        _ = ImageDraw.Draw(image)
-        font = ImageFont.truetype("arial.ttf", font_size)
+        key = (
+            label_text,
+            button_color,
+            font_size,
+            font_color,
+            border_color,
+            botton_margin,
+            border_width,
+        )
+        with cls._sprites_lock:
+            sprite = cls._sprites.get(key)
+            if sprite is not None:
+                cls._sprites.move_to_end(key)
+                return sprite
+
+        font = cls.load_font(font_size)
         text_size = font.getbbox(label_text)
 
         # set button size + margins
         button_size = (text_size[2] + botton_margin, text_size[3] + botton_margin)
         # create image with correct size and black background
-        button_img = Image.new("RGBA", button_size, button_color)
-        button_draw = ImageDraw.Draw(button_img)
+        sprite = Image.new("RGBA", button_size, button_color)
+        button_draw = ImageDraw.Draw(sprite)
         button_draw.text(
             (botton_margin / 2, botton_margin / 2),
             label_text,
@@ -245,14 +449,86 @@ class AnnotationDecorator(PhotographerDecorator):
         )
 
         # draw red rectangle around button
-        ImageDraw.Draw(button_img).rectangle(
+        button_draw.rectangle(
             [(0, 0), (button_size[0] - 1, button_size[1] - 1)],
             outline=border_color,
             width=border_width,
         )
 
+        with cls._sprites_lock:
+            cls._sprites[key] = sprite
+            while len(cls._sprites) > cls._max_sprites:
+                cls._sprites.popitem(last=False)
+
+        return sprite
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """
+        Forget the loaded fonts and the rendered sprites.
+        """
+        with cls._fonts_lock:
+            cls._fonts.clear()
+        with cls._sprites_lock:
+            cls._sprites.clear()
+
+    @classmethod
+    def draw_labels(
+        cls,
+        image: Image.Image,
+        labels: List[Tuple[Tuple[int, int], str, str]],
+        font_size: int = 25,
+    ) -> Image.Image:
+        """
+        Draw the labels of the controls in a single pass over the image, pasting their cached sprites.
+        :param image: The image to draw on.
+        :param labels: The top left coordinate, the text and the button color of each label.
+        :param font_size: The size of the font.
+        :return: The image with the labels.
+        """
+        for coordinate, label_text, button_color in labels:
+            image.paste(
+                cls.label_sprite(label_text, button_color, font_size), coordinate
+            )
+        return image
+
+    @staticmethod
+    def draw_rectangles_controls(
+        image: Image.Image,
+        coordinate: tuple,
+        label_text: str,
+        botton_margin: int = 5,
+        border_width: int = 2,
+        font_size: int = 25,
+        font_color: str = "#000000",
+        border_color: str = "#FF0000",
+        button_color: str = "#FFF68F",
+    ) -> Image.Image:
+        """
+        Draw a rectangle around the control and label it.
+        :param image: The image to draw on.
+        :param coordinate: The coordinate of the control.
+        :param label_text: The text label of the control.
+        :param botton_margin: The margin of the button.
+        :param border_width: The width of the border.
+        :param font_size: The size of the font.
+        :param font_color: The color of the font.
+        :param border_color: The color of the border.
+        :param button_color: The color of the button.
+        return: The image with the control rectangle and label.
+        """
+        sprite = AnnotationDecorator.label_sprite(
+            label_text,
+            button_color,
+            font_size,
+            font_color,
+            border_color,
+            botton_margin,
+            border_width,
+        )
+
         # put button on source image
-        image.paste(button_img, (coordinate[0], coordinate[1]))
+        image.paste(sprite, (coordinate[0], coordinate[1]))
         return image
 
     @staticmethod
@@ -298,10 +574,10 @@ class AnnotationDecorator(PhotographerDecorator):
         """
         cropped_icons_dict = {}
         image = self.photographer.capture()
-        window_rect = self.photographer.control.rectangle()
+        window_rect = self.control_rectangle(self.photographer.control)
 
         for label_text, control in annotation_dict.items():
-            control_rect = control.rectangle()
+            control_rect = self.control_rectangle(control)
             cropped_icons_dict[label_text] = image.crop(
                 self.coordinate_adjusted(window_rect, control_rect)
             )
@@ -312,27 +588,29 @@ class AnnotationDecorator(PhotographerDecorator):
         self, annotation_dict: Dict[str, UIAWrapper], save_path: Optional[str] = None
     ):
 
-        window_rect = self.photographer.control.rectangle()
+        window_rect = self.control_rectangle(self.photographer.control)
         screenshot_annotated = self.photographer.capture()
 
         color_dict = configs["ANNOTATION_COLORS"]
 
+        labels = []
         for label_text, control in annotation_dict.items():
-            control_rect = control.rectangle()
+            control_rect = self.control_rectangle(control)
             adjusted_rect = self.coordinate_adjusted(window_rect, control_rect)
-            adjusted_coordinate = (adjusted_rect[0], adjusted_rect[1])
-            screenshot_annotated = self.draw_rectangles_controls(
-                screenshot_annotated,
-                adjusted_coordinate,
-                label_text,
-                button_color=(
-                    color_dict.get(
-                        control.element_info.control_type, self.color_default
-                    )
-                    if self.color_diff
-                    else self.color_default
-                ),
+            labels.append(
+                (
+                    (adjusted_rect[0], adjusted_rect[1]),
+                    label_text,
+                    (
+                        color_dict.get(
+                            control.element_info.control_type, self.color_default
+                        )
+                        if self.color_diff
+                        else self.color_default
+                    ),
+                )
             )
+        screenshot_annotated = self.draw_labels(screenshot_annotated, labels)
 
         if save_path is not None:
             screenshot_annotated.save(save_path)
@@ -350,15 +628,100 @@ class AnnotationDecorator(PhotographerDecorator):
         self.capture_with_annotation_dict(annotation_dict, save_path)
 
 
+class ScreenshotWriter:
+    """
+    Class to save the screenshots to disk on a background thread, out of the critical path of the step.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the ScreenshotWriter. The writer thread is started on the first save.
+        """
+        self._queue: "queue.Queue[Tuple[Image.Image, str]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def save(self, image: Image.Image, save_path: str) -> None:
+        """
+        Queue the image to be saved.
+        :param image: The image to save. It must not be modified afterwards.
+        :param save_path: The path to save the image.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._queue.put((image, save_path))
+
+    def flush(self) -> None:
+        """
+        Block until all the queued images are saved.
+        """
+        self._queue.join()
+
+    def _run(self) -> None:
+        """
+        The loop of the writer thread.
+        """
+        while True:
+            image, save_path = self._queue.get()
+            try:
+                if configs.get("SCREENSHOT_STORE", False):
+                    ImageStore.for_path(save_path).put(
+                        image, os.path.basename(save_path)
+                    )
+                else:
+                    image.save(save_path)
+            except Exception as e:
+                print(f"Warning: Failed to save the screenshot to {save_path}: {e}")
+
+            # The manifests are written once the queued screenshots, e.g. those of a step, are all stored.
+            if self._queue.empty():
+                try:
+                    ImageStore.flush_all()
+                except Exception as e:
+                    print(f"Warning: Failed to write the screenshot manifest: {e}")
+
+            self._queue.task_done()
+
+
 class PhotographerFactory:
-    @staticmethod
-    def create_screenshot(screenshot_type: str, *args, **kwargs):
+    """
+    A factory class to create the photographers.
+    """
+
+    # The photographers of the fake desktop registered by screenshot type, used instead of the others if FAKE_DESKTOP is set.
+    _fake_photographers: Dict[str, Type[Photographer]] = {}
+
+    @classmethod
+    def register_fake(
+        cls, screenshot_type: str
+    ) -> Callable[[Type[Photographer]], Type[Photographer]]:
+        """
+        Decorator to register a photographer of the fake desktop.
+        :param screenshot_type: The type of the screenshot taken by the photographer.
+        :return: The decorator registering the photographer class.
+        """
+
+        def decorator(photographer_class: Type[Photographer]) -> Type[Photographer]:
+            cls._fake_photographers[screenshot_type] = photographer_class
+            return photographer_class
+
+        return decorator
+
+    @classmethod
+    def create_screenshot(cls, screenshot_type: str, *args, **kwargs):
         """
         Create a screenshot.
         :param screenshot_type: The type of the screenshot.
         :return: The screenshot photographer.
         """
-        if screenshot_type == "app_window":
+        if (
+            configs.get("FAKE_DESKTOP", False)
+            and screenshot_type in cls._fake_photographers
+        ):
+            return cls._fake_photographers[screenshot_type](*args, **kwargs)
+        elif screenshot_type == "app_window":
             return ControlPhotographer(*args, **kwargs)
         elif screenshot_type == "desktop_window":
             return DesktopPhotographer(*args, **kwargs)
@@ -373,6 +736,13 @@ class PhotographerFacade:
 
     _instance = None
 
+    # The recently saved images and their encoded payloads keyed by the save path, so that the images of the last step are not read back from disk.
+    _recent_images: "OrderedDict[str, Image.Image]" = OrderedDict()
+    _encoded_images: "OrderedDict[str, str]" = OrderedDict()
+    _cache_size = 8
+    _cache_lock = threading.Lock()
+    _writer = ScreenshotWriter()
+
     def __new__(cls):
         """
         Singleton pattern.
@@ -385,13 +755,43 @@ class PhotographerFacade:
     def __init__(self):
         pass
 
-    def capture_app_window_screenshot(self, control: UIAWrapper, save_path=None):
+    def capture_app_window_frame(
+        self, control: UIAWrapper, control_list: List[UIAWrapper] = None
+    ) -> ScreenshotFrame:
+        """
+        Grab the window and the control rectangles once into a frame for the current step.
+        :param control: The window to capture.
+        :param control_list: The controls whose rectangles are grabbed with the frame.
+        :return: The frame.
+        """
+        return ScreenshotFrame(control, control_list)
+
+    def _app_window_photographer(
+        self, control: UIAWrapper, frame: Optional[ScreenshotFrame] = None
+    ) -> Photographer:
+        """
+        Get the photographer of the window, reusing the frame if it is captured from the same window.
+        :param control: The window to capture.
+        :param frame: The frame of the current step.
+        :return: The photographer.
+        """
+        if frame is not None and frame.control is control:
+            return frame
+        return self.screenshot_factory.create_screenshot("app_window", control)
+
+    def capture_app_window_screenshot(
+        self,
+        control: UIAWrapper,
+        save_path=None,
+        frame: Optional[ScreenshotFrame] = None,
+    ):
         """
         Capture the control screenshot.
         :param control: The control item to capture.
+        :param frame: The frame to render from instead of grabbing the window again.
         :return: The screenshot.
         """
-        screenshot = self.screenshot_factory.create_screenshot("app_window", control)
+        screenshot = self._app_window_photographer(control, frame)
         return screenshot.capture(save_path)
 
     def capture_desktop_screen_screenshot(self, all_screens=True, save_path=None):
@@ -412,6 +812,7 @@ class PhotographerFacade:
         width=3,
         sub_control_list: List[UIAWrapper] = None,
         save_path: Optional[str] = None,
+        frame: Optional[ScreenshotFrame] = None,
     ) -> Image.Image:
         """
         Capture the control screenshot with a rectangle.
@@ -420,9 +821,10 @@ class PhotographerFacade:
         :param color: The color of the rectangle.
         :param width: The width of the rectangle.
         :param sub_control_list: The list of the controls to draw rectangles on.
+        :param frame: The frame to render from instead of grabbing the window again.
         :return: The screenshot.
         """
-        screenshot = self.screenshot_factory.create_screenshot("app_window", control)
+        screenshot = self._app_window_photographer(control, frame)
         screenshot = RectangleDecorator(screenshot, color, width, sub_control_list)
         return screenshot.capture(save_path)
 
@@ -434,6 +836,7 @@ class PhotographerFacade:
         color_diff: bool = True,
         color_default: str = "#FFF68F",
         save_path: Optional[str] = None,
+        frame: Optional[ScreenshotFrame] = None,
     ) -> Image.Image:
         """
         Capture the control screenshot with annotations.
@@ -442,9 +845,10 @@ class PhotographerFacade:
         :param annotation_type: The type of the annotation.
         :param color_diff: Whether to use different colors for different control types.
         :param color_default: The default color of the annotation.
+        :param frame: The frame to render from instead of grabbing the window again.
         :return: The screenshot.
         """
-        screenshot = self.screenshot_factory.create_screenshot("app_window", control)
+        screenshot = self._app_window_photographer(control, frame)
         sub_control_list = list(annotation_control_dict.values())
         screenshot = AnnotationDecorator(
             screenshot, sub_control_list, annotation_type, color_diff, color_default
@@ -497,17 +901,20 @@ class PhotographerFacade:
         return screenshot.get_annotation_dict()
 
     def get_cropped_icons_dict(
-        self, control: UIAWrapper, annotation_dict: Dict[str, UIAWrapper]
+        self,
+        control: UIAWrapper,
+        annotation_dict: Dict[str, UIAWrapper],
+        frame: Optional[ScreenshotFrame] = None,
     ) -> Dict[str, Image.Image]:
         """
         Get the dictionary of the cropped icons.
         :param control: The control item to capture.
-        :param sub_control_list: The list of the controls to annotate.
-        :param annotation_type: The type of the annotation.
+        :param annotation_dict: The dictionary of the controls with annotation labels as keys.
+        :param frame: The frame to crop from instead of grabbing the window again.
         :return: The dictionary of the cropped icons.
         """
 
-        screenshot = self.screenshot_factory.create_screenshot("app_window", control)
+        screenshot = self._app_window_photographer(control, frame)
         screenshot = AnnotationDecorator(screenshot, sub_control_list=[])
         return screenshot.get_cropped_icons_dict(annotation_dict)
 
@@ -523,9 +930,24 @@ class PhotographerFacade:
         :return: The concatenated image.
         """
         # Open the images
-        image1 = Image.open(image1_path)
-        image2 = Image.open(image2_path)
+        image1 = Image.open(ImageStore.resolve_path(image1_path))
+        image2 = Image.open(ImageStore.resolve_path(image2_path))
+
+        result = PhotographerFacade.concat_images(image1, image2)
+
+        # Save the result
+        result.save(output_path)
 
+        return result
+
+    @staticmethod
+    def concat_images(image1: Image.Image, image2: Image.Image) -> Image.Image:
+        """
+        Concatenate two in-memory images horizontally.
+        :param image1: The first image.
+        :param image2: The second image.
+        :return: The concatenated image.
+        """
         # Ensure both images have the same height
         min_height = min(image1.height, image2.height)
         image1 = image1.crop((0, 0, image1.width, min_height))
@@ -536,32 +958,133 @@ class PhotographerFacade:
         result.paste(image1, (0, 0))
         result.paste(image2, (image1.width, 0))
 
-        # Save the result
-        result.save(output_path)
-
         return result
 
     @staticmethod
-    def image_to_base64(image: Image.Image) -> str:
+    def image_to_base64(
+        image: Image.Image,
+        policy: Optional[ImageEncodingPolicy] = None,
+        clean: bool = True,
+    ) -> str:
         """
         Convert image to base64 string.
 
         :param image: The image to convert.
+        :param policy: The encoding policy, lossless PNG at the native resolution if not provided.
+        :param clean: Whether the image is a clean screenshot.
         :return: The base64 string.
         """
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+        policy = policy if policy is not None else ImageEncodingPolicy()
+        return base64.b64encode(policy.encode(image, clean)).decode("utf-8")
+
+    @staticmethod
+    def save_image(image: Image.Image, save_path: str) -> None:
+        """
+        Save the image to disk in the background and keep it in memory for the following encodings.
+        :param image: The image to save. It must not be modified afterwards.
+        :param save_path: The path to save the image.
+        """
+        with PhotographerFacade._cache_lock:
+            for key in list(PhotographerFacade._encoded_images):
+                if key[0] == save_path:
+                    PhotographerFacade._encoded_images.pop(key)
+            PhotographerFacade._cache_put(
+                PhotographerFacade._recent_images, save_path, image
+            )
+        PhotographerFacade._writer.save(image, save_path)
+
+    @staticmethod
+    def flush_saved_images() -> None:
+        """
+        Block until all the images queued by save_image are written to disk.
+        """
+        PhotographerFacade._writer.flush()
+
+    @staticmethod
+    def image_exists(image_path: str) -> bool:
+        """
+        Check whether the image is saved or queued to be saved.
+        :param image_path: The path of the image file.
+        :return: True if the image is available, otherwise False.
+        """
+        return image_path in PhotographerFacade._recent_images or ImageStore.exists(
+            image_path
+        )
+
+    @staticmethod
+    def encode_image(
+        image: Image.Image,
+        policy: Optional[ImageEncodingPolicy] = None,
+        clean: bool = True,
+    ) -> str:
+        """
+        Encode an in-memory image to a base64 data url.
+        :param image: The image to encode.
+        :param policy: The encoding policy, lossless PNG at the native resolution if not provided.
+        :param clean: Whether the image is a clean screenshot.
+        :return: The base64 data url.
+        """
+        policy = policy if policy is not None else ImageEncodingPolicy()
+        encoded_image = base64.b64encode(policy.encode(image, clean)).decode("ascii")
+        return f"data:{policy.mime_type};base64," + encoded_image
+
+    @staticmethod
+    def _cache_put(cache: OrderedDict, key, value) -> None:
+        """
+        Put the value into a bounded cache, evicting the oldest entries.
+        :param cache: The cache.
+        :param key: The key.
+        :param value: The value.
+        """
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > PhotographerFacade._cache_size:
+            cache.popitem(last=False)
 
     @staticmethod
-    def encode_image_from_path(image_path: str, mime_type: Optional[str] = None) -> str:
+    def encode_image_from_path(
+        image_path: str,
+        mime_type: Optional[str] = None,
+        policy: Optional[ImageEncodingPolicy] = None,
+        clean: bool = True,
+    ) -> str:
         """
         Encode an image file to base64 string.
+        The recently saved images are encoded from memory, and their payloads are cached.
         :param image_path: The path of the image file.
         :param mime_type: The mime type of the image.
+        :param policy: The encoding policy. If not provided, the file is sent as it is.
+        :param clean: Whether the image is a clean screenshot.
         :return: The base64 string.
         """
 
+        cache_key = (image_path, policy, clean)
+        with PhotographerFacade._cache_lock:
+            encoded_url = PhotographerFacade._encoded_images.get(cache_key)
+            image = PhotographerFacade._recent_images.get(image_path)
+
+        if encoded_url is not None:
+            return encoded_url
+
+        if image is not None and (mime_type is None or mime_type == "image/png"):
+            encoded_url = PhotographerFacade.encode_image(image, policy, clean)
+            with PhotographerFacade._cache_lock:
+                PhotographerFacade._cache_put(
+                    PhotographerFacade._encoded_images, cache_key, encoded_url
+                )
+            return encoded_url
+
+        # The image may still be in the queue of the writer.
+        if not ImageStore.exists(image_path):
+            PhotographerFacade.flush_saved_images()
+
+        # The image may be stored as a blob of the content-addressed store.
+        image_path = ImageStore.resolve_path(image_path)
+
+        if policy is not None:
+            with Image.open(image_path) as image_file:
+                return PhotographerFacade.encode_image(image_file, policy, clean)
+
         file_name = os.path.basename(image_path)
         mime_type = (
             mime_type if mime_type is not None else mimetypes.guess_type(file_name)[0]
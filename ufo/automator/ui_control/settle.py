@@ -0,0 +1,463 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import psutil
+from PIL import Image, ImageChops, ImageStat
+
+from ufo.automator.ui_control.snapshot import TreeProviderFactory, UITreeSnapshot
+from ufo.config.config import Config
+from ufo.utils import print_with_color
+
+configs = Config.get_instance().config_data
+
+
+class SettleSignal(ABC):
+    """
+    A signal sampled repeatedly to tell whether the UI is still changing.
+    """
+
+    @classmethod
+    @abstractmethod
+    def name(cls) -> str:
+        """
+        Get the name of the signal.
+        :return: The name.
+        """
+        pass
+
+    @abstractmethod
+    def sample(self) -> Any:
+        """
+        Sample the signal.
+        :return: The sample.
+        """
+        pass
+
+    def is_stable(self, previous: Any, current: Any) -> bool:
+        """
+        Check whether the signal is stable between two consecutive samples.
+        :param previous: The previous sample.
+        :param current: The current sample.
+        :return: True if the signal is stable.
+        """
+        return previous == current
+
+    def restart(self) -> None:
+        """
+        Restart the measure of the signal once all the signals are sampled, so that the load of the sampling on the
+        application is not measured.
+        """
+        pass
+
+
+class TreeSignal(SettleSignal):
+    """
+    The structural hash of the UI tree of a window, stable when no control is added, removed, moved or renamed.
+    The UIA providers run in the application, so the tree is fetched on a slower cadence than the other signals.
+    """
+
+    def __init__(self, tree_source: Callable[[], Hashable]) -> None:
+        """
+        Initialize the signal.
+        :param tree_source: The function returning the hash of the UI tree.
+        """
+        self.tree_source = tree_source
+
+    @classmethod
+    def name(cls) -> str:
+        return "tree"
+
+    def sample(self) -> Hashable:
+        return self.tree_source()
+
+    @classmethod
+    def from_window(
+        cls,
+        window: Any,
+        backend: str,
+        interval: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> "TreeSignal":
+        """
+        Create the signal of the UI tree of a window, fetched incrementally from the previous sample.
+        :param window: The window.
+        :param backend: The backend of the control inspector.
+        :param interval: The minimum time between two fetches of the tree, the last hash is sampled in between.
+        :param clock: The clock in seconds.
+        :return: The signal.
+        """
+        previous: List[Optional[UITreeSnapshot]] = [None]
+        last_hash: List[Optional[int]] = [None]
+        last_time: List[float] = [0.0]
+
+        def tree_hash() -> int:
+            now = clock()
+            if previous[0] is not None and now - last_time[0] < interval:
+                return last_hash[0]
+
+            snapshot = TreeProviderFactory.take_snapshot(backend, window, previous[0])
+            previous[0] = snapshot
+            last_time[0] = now
+            last_hash[0] = hash(
+                tuple(
+                    snapshot.hashes[i]
+                    for i, parent in enumerate(snapshot.parents)
+                    if parent < 0
+                )
+            )
+            return last_hash[0]
+
+        return cls(tree_hash)
+
+
+class FrameSignal(SettleSignal):
+    """
+    The pixels of consecutive low resolution frames, stable when their mean difference is under a threshold.
+    """
+
+    def __init__(
+        self,
+        frame_source: Callable[[], Image.Image],
+        threshold: float = 1.0,
+        size: Tuple[int, int] = (96, 64),
+    ) -> None:
+        """
+        Initialize the signal.
+        :param frame_source: The function returning the frame.
+        :param threshold: The mean difference of the gray levels (0-255) under which two frames are the same.
+        :param size: The size the frames are reduced to before the comparison.
+        """
+        self.frame_source = frame_source
+        self.threshold = threshold
+        self.size = size
+
+    @classmethod
+    def name(cls) -> str:
+        return "frame"
+
+    def sample(self) -> Image.Image:
+        return self.frame_source().convert("L").resize(self.size)
+
+    def is_stable(self, previous: Image.Image, current: Image.Image) -> bool:
+        difference = ImageChops.difference(previous, current)
+        return ImageStat.Stat(difference).mean[0] <= self.threshold
+
+    @classmethod
+    def from_window(cls, window: Any, threshold: float = 1.0) -> "FrameSignal":
+        """
+        Create the signal of the frames of a window.
+        :param window: The window.
+        :param threshold: The mean difference of the gray levels under which two frames are the same.
+        :return: The signal.
+        """
+        return cls(window.capture_as_image, threshold)
+
+
+class BusySignal(SettleSignal):
+    """
+    The busy state of an application, stable when the application is not busy.
+    """
+
+    # The cursor ids of IDC_WAIT and IDC_APPSTARTING.
+    busy_cursor_ids = (32514, 32650)
+
+    def __init__(
+        self,
+        busy_source: Callable[[], bool],
+        restart_source: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        """
+        Initialize the signal.
+        :param busy_source: The function returning whether the application is busy.
+        :param restart_source: The function restarting the measure of the busy state, if any.
+        """
+        self.busy_source = busy_source
+        self.restart_source = restart_source
+
+    @classmethod
+    def name(cls) -> str:
+        return "busy"
+
+    def sample(self) -> bool:
+        return bool(self.busy_source())
+
+    def is_stable(self, previous: bool, current: bool) -> bool:
+        return not current
+
+    def restart(self) -> None:
+        if self.restart_source is not None:
+            self.restart_source()
+
+    @classmethod
+    def is_cursor_busy(cls) -> bool:
+        """
+        Check whether the cursor is the busy cursor.
+        :return: True if the cursor is the wait or the app starting cursor, False if it cannot be read.
+        """
+        try:
+            import win32gui
+
+            cursor = win32gui.GetCursorInfo()[1]
+            return any(
+                cursor == win32gui.LoadCursor(0, cursor_id)
+                for cursor_id in cls.busy_cursor_ids
+            )
+        except Exception:
+            return False
+
+    @classmethod
+    def for_process(cls, process_id: int, cpu_threshold: float) -> "BusySignal":
+        """
+        Create the signal of an application process, busy when the cursor is busy or the process uses the CPU.
+        The CPU usage is measured from the restart of the signal, after the other signals are sampled.
+        :param process_id: The id of the process.
+        :param cpu_threshold: The CPU usage in percent of one core above which the process is busy.
+        :return: The signal.
+        """
+        try:
+            process = psutil.Process(process_id)
+            # The first call starts the measure of the CPU usage.
+            process.cpu_percent(None)
+        except psutil.Error:
+            process = None
+
+        def busy() -> bool:
+            if cls.is_cursor_busy():
+                return True
+            try:
+                return process is not None and process.cpu_percent(None) > cpu_threshold
+            except psutil.Error:
+                return False
+
+        def restart() -> None:
+            try:
+                if process is not None:
+                    process.cpu_percent(None)
+            except psutil.Error:
+                pass
+
+        return cls(busy, restart)
+
+
+@dataclass
+class SettleResult:
+    """
+    The outcome of a wait until the UI is settled.
+    """
+
+    waited: float = 0.0
+    settled: bool = False
+    polls: int = 0
+    unstable: List[str] = field(default_factory=list)
+    adaptive: bool = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the result to a dict for the log.
+        :return: The result as a dict.
+        """
+        return dict(asdict(self), waited=round(self.waited, 3))
+
+
+class SettleWaiter:
+    """
+    Wait until the signals of the UI have all been stable for a quiet time, or until the maximum wait is reached.
+    The clock and the sleep are injectable, so that the waiter can be driven by scripted signals.
+    """
+
+    def __init__(
+        self,
+        signals: List[SettleSignal],
+        quiet_time: float = 0.5,
+        poll_interval: float = 0.1,
+        max_wait: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Initialize the waiter.
+        :param signals: The signals to watch.
+        :param quiet_time: The time the signals must stay stable for the UI to be settled.
+        :param poll_interval: The time between two samples.
+        :param max_wait: The maximum time to wait.
+        :param clock: The clock in seconds.
+        :param sleep: The sleep function.
+        """
+        self.signals = signals
+        self.quiet_time = quiet_time
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+
+    @staticmethod
+    def _sample(signal: SettleSignal) -> Any:
+        """
+        Sample a signal, None if the sampling fails, e.g. the window is closed.
+        :param signal: The signal.
+        :return: The sample.
+        """
+        try:
+            return signal.sample()
+        except Exception:
+            return None
+
+    def _restart(self) -> None:
+        """
+        Restart the measure of the signals after a round of samples.
+        """
+        for signal in self.signals:
+            try:
+                signal.restart()
+            except Exception:
+                pass
+
+    def _unstable(self, previous: List[Any], current: List[Any]) -> List[str]:
+        """
+        Get the signals changed between two rounds of samples. The signals that cannot be sampled are ignored.
+        :param previous: The previous samples.
+        :param current: The current samples.
+        :return: The names of the changed signals.
+        """
+        return [
+            signal.name()
+            for signal, before, after in zip(self.signals, previous, current)
+            if before is not None
+            and after is not None
+            and not signal.is_stable(before, after)
+        ]
+
+    def wait(self) -> SettleResult:
+        """
+        Wait until the UI is settled.
+        :return: The result of the wait.
+        """
+        start_time = self.clock()
+        previous = [self._sample(signal) for signal in self.signals]
+        self._restart()
+        unstable = self._unstable(previous, previous)
+        stable_since = None if unstable else start_time
+        polls = 1
+
+        while True:
+            now = self.clock()
+            if stable_since is not None and now - stable_since >= self.quiet_time:
+                return SettleResult(now - start_time, True, polls)
+            if now - start_time >= self.max_wait:
+                return SettleResult(now - start_time, False, polls, unstable)
+
+            self.sleep(
+                max(0.0, min(self.poll_interval, start_time + self.max_wait - now))
+            )
+
+            current = [self._sample(signal) for signal in self.signals]
+            self._restart()
+            polls += 1
+            unstable = self._unstable(previous, current)
+            if unstable:
+                stable_since = None
+            elif stable_since is None:
+                stable_since = self.clock()
+            previous = current
+
+    @staticmethod
+    def wait_for(
+        predicate: Callable[[], Any],
+        max_wait: float,
+        poll_interval: float = 0.25,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> Tuple[Any, float]:
+        """
+        Wait until a predicate returns a truthy value, e.g. the window of a launched application is found.
+        :param predicate: The predicate.
+        :param max_wait: The maximum time to wait.
+        :param poll_interval: The time between two calls of the predicate.
+        :param clock: The clock in seconds.
+        :param sleep: The sleep function.
+        :return: The last value of the predicate and the time waited.
+        """
+        start_time = clock()
+        while True:
+            value = predicate()
+            waited = clock() - start_time
+            if value or waited >= max_wait:
+                return value, waited
+            sleep(min(poll_interval, max_wait - waited))
+
+    @classmethod
+    def for_window(cls, window: Any, backend: str) -> "SettleWaiter":
+        """
+        Create the waiter of a window from the configuration.
+        :param window: The window.
+        :param backend: The backend of the control inspector.
+        :return: The waiter.
+        """
+        signals: List[SettleSignal] = []
+
+        # The busy signal is sampled first, its CPU measure stops before the tree is fetched from the application.
+        # The windows of the fake desktop have no real process to measure.
+        if not configs.get("FAKE_DESKTOP", False):
+            signals.append(
+                BusySignal.for_process(
+                    window.process_id(), configs.get("SETTLE_CPU_THRESHOLD", 30)
+                )
+            )
+        signals += [
+            TreeSignal.from_window(
+                window, backend, configs.get("SETTLE_TREE_INTERVAL", 0.5)
+            ),
+            FrameSignal.from_window(window, configs.get("SETTLE_FRAME_THRESHOLD", 1.0)),
+        ]
+
+        return cls(
+            signals,
+            quiet_time=configs.get("SETTLE_QUIET_TIME", 0.5),
+            poll_interval=configs.get("SETTLE_POLL_INTERVAL", 0.1),
+            max_wait=configs.get("SETTLE_MAX_WAIT", configs.get("SLEEP_TIME", 5)),
+        )
+
+    @classmethod
+    def wait_until_settled(
+        cls,
+        window: Any,
+        backend: str,
+        logger: Optional[logging.Logger] = None,
+        **log_info: Any,
+    ) -> SettleResult:
+        """
+        Wait until the window is settled, or sleep the fixed SLEEP_TIME if the adaptive wait is disabled.
+        :param window: The window, None to sleep the fixed time.
+        :param backend: The backend of the control inspector.
+        :param logger: The logger of the waits.
+        :param log_info: The information logged with the result, e.g. the step.
+        :return: The result of the wait.
+        """
+        if configs.get("SETTLE_WAIT", False) and window is not None:
+            try:
+                result = cls.for_window(window, backend).wait()
+            except Exception as e:
+                print_with_color(
+                    f"Warning: Failed to wait until the UI is settled: {e}, sleeping instead.",
+                    "yellow",
+                )
+                result = None
+        else:
+            result = None
+
+        if result is None:
+            sleep_time = configs.get("SLEEP_TIME", 5)
+            time.sleep(sleep_time)
+            result = SettleResult(sleep_time, False, 0, adaptive=False)
+
+        if logger is not None:
+            logger.info(json.dumps(dict(log_info, **result.to_dict())))
+
+        return result
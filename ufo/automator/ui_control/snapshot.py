@@ -0,0 +1,836 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ufo import utils
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+
+class ControlRecord:
+    """
+    A row of the snapshot table: the properties of a control fetched when the snapshot is taken.
+    """
+
+    __slots__ = (
+        "control",
+        "depth",
+        "name",
+        "control_type",
+        "class_name",
+        "control_id",
+        "rectangle",
+        "text",
+        "visible",
+        "enabled",
+        "runtime_id",
+    )
+
+    def __init__(
+        self,
+        control: Any,
+        depth: int,
+        name: str,
+        control_type: str,
+        class_name: str,
+        control_id: Optional[int],
+        rectangle: Any,
+        text: str,
+        visible: bool,
+        enabled: bool,
+        runtime_id: Tuple[int, ...],
+    ) -> None:
+        """
+        Initialize the record.
+        :param control: The live control wrapper.
+        :param depth: The depth of the control below the window, 1 for the children of the window.
+        :param name: The name of the control.
+        :param control_type: The control type of the control.
+        :param class_name: The class name of the control.
+        :param control_id: The control id of the control.
+        :param rectangle: The rectangle of the control.
+        :param text: The window text of the control.
+        :param visible: Whether the control is visible.
+        :param enabled: Whether the control is enabled.
+        :param runtime_id: The runtime id of the control.
+        """
+        self.control = control
+        self.depth = depth
+        self.name = name
+        self.control_type = control_type
+        self.class_name = class_name
+        self.control_id = control_id
+        self.rectangle = rectangle
+        self.text = text
+        self.visible = visible
+        self.enabled = enabled
+        self.runtime_id = runtime_id
+
+
+class CachedElementInfo:
+    """
+    The element info of a snapshot control. The fetched properties are read from the record, the others from the live element info.
+    """
+
+    def __init__(self, record: ControlRecord) -> None:
+        """
+        Initialize the element info.
+        :param record: The record of the control.
+        """
+        self._record = record
+
+    @property
+    def name(self) -> str:
+        return self._record.name
+
+    @property
+    def control_type(self) -> str:
+        return self._record.control_type
+
+    @property
+    def class_name(self) -> str:
+        return self._record.class_name
+
+    @property
+    def control_id(self) -> Optional[int]:
+        return self._record.control_id
+
+    @property
+    def rectangle(self) -> Any:
+        return self._record.rectangle
+
+    @property
+    def rich_text(self) -> str:
+        return self._record.text
+
+    @property
+    def visible(self) -> bool:
+        return self._record.visible
+
+    @property
+    def enabled(self) -> bool:
+        return self._record.enabled
+
+    @property
+    def runtime_id(self) -> Tuple[int, ...]:
+        return self._record.runtime_id
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_record":
+            raise AttributeError(name)
+        return getattr(self._record.control.element_info, name)
+
+
+class CachedControl:
+    """
+    A control of the snapshot. The property getters used by the filters, the annotator and the inspector are served from the snapshot,
+    the actions and any other attribute go to the live control wrapper.
+    """
+
+    def __init__(self, record: ControlRecord) -> None:
+        """
+        Initialize the control.
+        :param record: The record of the control.
+        """
+        self._record = record
+        self.element_info = CachedElementInfo(record)
+
+    @property
+    def record(self) -> ControlRecord:
+        """
+        Get the record of the control.
+        :return: The record.
+        """
+        return self._record
+
+    @property
+    def wrapped(self) -> Any:
+        """
+        Get the live control wrapper.
+        :return: The live control.
+        """
+        return self._record.control
+
+    def window_text(self) -> str:
+        return self._record.text
+
+    def rectangle(self) -> Any:
+        return self._record.rectangle
+
+    def is_visible(self) -> bool:
+        return self._record.visible
+
+    def is_enabled(self) -> bool:
+        return self._record.enabled
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_record":
+            raise AttributeError(name)
+        return getattr(self._record.control, name)
+
+    def __repr__(self) -> str:
+        return "CachedControl({control!r})".format(control=self._record.control)
+
+
+class UITreeProvider(ABC):
+    """
+    The interface of the providers that fetch the control tree of a window into snapshot records.
+    """
+
+    @abstractmethod
+    def fetch(
+        self, window: Any, previous: Optional[UITreeSnapshot] = None
+    ) -> List[ControlRecord]:
+        """
+        Fetch the descendants of the window.
+        :param window: The window to fetch.
+        :param previous: The snapshot of the window at the previous step. The controls found in it are not queried again
+        for their static properties, and their records are reused if nothing changed.
+        :return: The records of the descendants in depth-first order.
+        """
+        pass
+
+    @staticmethod
+    def refresh_record(
+        record: ControlRecord,
+        depth: int,
+        name: str,
+        rectangle: Any,
+        text: str,
+        visible: bool,
+        enabled: bool,
+    ) -> ControlRecord:
+        """
+        Refresh the record of a control of the previous snapshot with the properties that may change between steps.
+        :param record: The record of the control in the previous snapshot.
+        :param depth: The depth of the control.
+        :param name: The name of the control.
+        :param rectangle: The rectangle of the control.
+        :param text: The window text of the control.
+        :param visible: Whether the control is visible.
+        :param enabled: Whether the control is enabled.
+        :return: The previous record if nothing changed, otherwise a new record sharing the live wrapper and the static properties.
+        """
+        if (
+            record.depth == depth
+            and record.name == name
+            and record.text == text
+            and record.visible == visible
+            and record.enabled == enabled
+            and rect_tuple(record.rectangle) == rect_tuple(rectangle)
+        ):
+            return record
+
+        return ControlRecord(
+            control=record.control,
+            depth=depth,
+            name=name,
+            control_type=record.control_type,
+            class_name=record.class_name,
+            control_id=record.control_id,
+            rectangle=rectangle,
+            text=text,
+            visible=visible,
+            enabled=enabled,
+            runtime_id=record.runtime_id,
+        )
+
+
+class WrapperTreeProvider(UITreeProvider):
+    """
+    The provider that walks the children of the control wrappers once and reads the properties of each control.
+    It works for the win32 backend and the in-memory fake desktop, and is the fallback of the UIA cache provider.
+    """
+
+    def fetch(
+        self, window: Any, previous: Optional[UITreeSnapshot] = None
+    ) -> List[ControlRecord]:
+        """
+        Fetch the descendants of the window.
+        :param window: The window to fetch.
+        :param previous: The snapshot of the window at the previous step.
+        :return: The records of the descendants in depth-first order.
+        """
+        records = []
+        stack = [(child, 1) for child in reversed(window.children())]
+
+        while stack:
+            control, depth = stack.pop()
+            element_info = control.element_info
+            runtime_id = self.runtime_id(element_info)
+            previous_record = (
+                previous.get_record(runtime_id)
+                if previous is not None and runtime_id
+                else None
+            )
+
+            if previous_record is not None:
+                records.append(
+                    self.refresh_record(
+                        previous_record,
+                        depth,
+                        element_info.name,
+                        control.rectangle(),
+                        control.window_text(),
+                        control.is_visible(),
+                        control.is_enabled(),
+                    )
+                )
+            else:
+                records.append(
+                    ControlRecord(
+                        control=control,
+                        depth=depth,
+                        name=element_info.name,
+                        control_type=element_info.control_type,
+                        class_name=element_info.class_name,
+                        control_id=element_info.control_id,
+                        rectangle=control.rectangle(),
+                        text=control.window_text(),
+                        visible=control.is_visible(),
+                        enabled=control.is_enabled(),
+                        runtime_id=runtime_id,
+                    )
+                )
+            stack.extend((child, depth + 1) for child in reversed(control.children()))
+
+        return records
+
+    @staticmethod
+    def runtime_id(element_info: Any) -> Tuple[Any, ...]:
+        """
+        Get the runtime id of a control, or its window handle for the backends without runtime ids.
+        :param element_info: The element info of the control.
+        :return: The runtime id, empty if the control has neither.
+        """
+        try:
+            runtime_id = tuple(element_info.runtime_id or ())
+        except (AttributeError, NotImplementedError):
+            runtime_id = ()
+        if not runtime_id and getattr(element_info, "handle", None):
+            runtime_id = ("hwnd", element_info.handle)
+        return runtime_id
+
+
+class UIACacheTreeProvider(UITreeProvider):
+    """
+    The provider that fetches the whole subtree with one UIA cache request, which returns the elements together with
+    their cached properties, instead of a cross-process call per control and property.
+    With a previous snapshot, the tree is fetched with the volatile properties only, and the static properties are
+    queried for the new elements alone.
+    """
+
+    # The properties that may change between steps, and the properties fixed for the lifetime of an element.
+    volatile_properties = [
+        "RuntimeId",
+        "Name",
+        "BoundingRectangle",
+        "IsEnabled",
+        "IsOffscreen",
+        "ValueValue",
+    ]
+    static_properties = ["ControlType", "ClassName", "NativeWindowHandle"]
+
+    # The control types whose window text is their value instead of their name.
+    value_control_types = ["Edit", "Document"]
+
+    # Above this number of new elements, one request for the whole tree is cheaper than a request per element.
+    max_element_requests = 50
+
+    def fetch(
+        self, window: Any, previous: Optional[UITreeSnapshot] = None
+    ) -> List[ControlRecord]:
+        """
+        Fetch the descendants of the window.
+        :param window: The window to fetch.
+        :param previous: The snapshot of the window at the previous step.
+        :return: The records of the descendants in depth-first order.
+        """
+        from pywinauto.uia_defines import IUIA
+
+        iuia = IUIA()
+        full_request = self._cache_request(
+            iuia, self.volatile_properties + self.static_properties, "subtree"
+        )
+
+        if previous is None:
+            root = window.element_info.element.BuildUpdatedCache(full_request)
+            return [
+                self._build_record(iuia, element, depth)
+                for element, depth in self._cached_descendants(root)
+            ]
+
+        root = window.element_info.element.BuildUpdatedCache(
+            self._cache_request(iuia, self.volatile_properties, "subtree")
+        )
+
+        records: List[Optional[ControlRecord]] = []
+        new_elements = []
+        for element, depth in self._cached_descendants(root):
+            previous_record = previous.get_record(self._runtime_id(iuia, element))
+            if previous_record is None:
+                new_elements.append((len(records), element, depth))
+                records.append(None)
+                continue
+
+            records.append(
+                self.refresh_record(
+                    previous_record,
+                    depth,
+                    *self._volatile(
+                        iuia,
+                        element,
+                        previous_record.control_type,
+                        previous_record.control,
+                    ),
+                )
+            )
+
+        if len(new_elements) > self.max_element_requests:
+            # Most of the tree is new, fetch the static properties of the whole tree at once.
+            root = window.element_info.element.BuildUpdatedCache(full_request)
+            elements = {
+                self._runtime_id(iuia, element): element
+                for element, _ in self._cached_descendants(root)
+            }
+            for index, element, depth in new_elements:
+                element = elements.get(self._runtime_id(iuia, element), element)
+                records[index] = self._build_record(iuia, element, depth)
+        else:
+            element_request = self._cache_request(
+                iuia, self.volatile_properties + self.static_properties, "element"
+            )
+            for index, element, depth in new_elements:
+                records[index] = self._build_record(
+                    iuia, element.BuildUpdatedCache(element_request), depth
+                )
+
+        return records
+
+    @staticmethod
+    def _cache_request(iuia: Any, properties: List[str], scope: str) -> Any:
+        """
+        Create a UIA cache request on the raw view, the same view walked by the pywinauto descendants.
+        :param iuia: The pywinauto UIA interface.
+        :param properties: The names of the properties to cache.
+        :param scope: The tree scope of the request, "subtree" or "element".
+        :return: The cache request.
+        """
+        cache_request = iuia.iuia.CreateCacheRequest()
+        for name in properties:
+            cache_request.AddProperty(getattr(iuia.UIA_dll, f"UIA_{name}PropertyId"))
+        cache_request.TreeScope = iuia.tree_scope[scope]
+        cache_request.TreeFilter = iuia.true_condition
+        return cache_request
+
+    @staticmethod
+    def _runtime_id(iuia: Any, element: Any) -> Tuple[int, ...]:
+        """
+        Get the cached runtime id of an element.
+        :param iuia: The pywinauto UIA interface.
+        :param element: The cached element.
+        :return: The runtime id.
+        """
+        return tuple(
+            element.GetCachedPropertyValue(iuia.UIA_dll.UIA_RuntimeIdPropertyId) or ()
+        )
+
+    @classmethod
+    def _volatile(
+        cls, iuia: Any, element: Any, control_type: str, control: Any
+    ) -> Tuple[str, Any, str, bool, bool]:
+        """
+        Get the cached volatile properties of an element.
+        :param iuia: The pywinauto UIA interface.
+        :param element: The cached element.
+        :param control_type: The control type of the element.
+        :param control: The live control wrapper of the element.
+        :return: The name, rectangle, text, visibility and enablement of the element.
+        """
+        from pywinauto.win32structures import RECT
+
+        rect = element.CachedBoundingRectangle
+        return (
+            element.CachedName,
+            RECT(rect.left, rect.top, rect.right, rect.bottom),
+            cls._text(iuia, element, control_type, control),
+            not element.CachedIsOffscreen,
+            bool(element.CachedIsEnabled),
+        )
+
+    @classmethod
+    def _text(cls, iuia: Any, element: Any, control_type: str, control: Any) -> str:
+        """
+        Get the window text of an element, the same as the window_text of the live wrapper. The text of the edit and
+        document controls is their cached value, or is read from the live wrapper if they have no value pattern.
+        :param iuia: The pywinauto UIA interface.
+        :param element: The cached element.
+        :param control_type: The control type of the element.
+        :param control: The live control wrapper of the element.
+        :return: The text.
+        """
+        if control_type not in cls.value_control_types:
+            return element.CachedName
+
+        value = element.GetCachedPropertyValue(iuia.UIA_dll.UIA_ValueValuePropertyId)
+        if isinstance(value, str) and value:
+            return value
+
+        try:
+            return control.window_text()
+        except Exception:
+            return element.CachedName
+
+    def _build_record(self, iuia: Any, element: Any, depth: int) -> ControlRecord:
+        """
+        Build the record of an element cached with all the properties.
+        :param iuia: The pywinauto UIA interface.
+        :param element: The cached element.
+        :param depth: The depth of the element.
+        :return: The record.
+        """
+        from pywinauto import win32functions
+        from pywinauto.controls.uiawrapper import UIAWrapper
+        from pywinauto.uia_element_info import UIAElementInfo
+
+        control = UIAWrapper(UIAElementInfo(element))
+        control_type = iuia.known_control_type_ids.get(element.CachedControlType, "")
+        name, rectangle, text, visible, enabled = self._volatile(
+            iuia, element, control_type, control
+        )
+        handle = element.CachedNativeWindowHandle
+
+        return ControlRecord(
+            control=control,
+            depth=depth,
+            name=name,
+            control_type=control_type,
+            class_name=element.CachedClassName,
+            control_id=win32functions.GetDlgCtrlID(handle) if handle else None,
+            rectangle=rectangle,
+            text=text,
+            visible=visible,
+            enabled=enabled,
+            runtime_id=self._runtime_id(iuia, element),
+        )
+
+    @staticmethod
+    def _cached_descendants(root: Any) -> List[Tuple[Any, int]]:
+        """
+        Get the descendants of an element from the cached tree, without a call to the UI.
+        :param root: The element built with a subtree cache request.
+        :return: The descendant elements and their depths in depth-first order.
+        """
+
+        def cached_children(element: Any) -> List[Any]:
+            children = element.GetCachedChildren()
+            if children is None:
+                return []
+            return [children.GetElement(i) for i in range(children.Length)]
+
+        descendants = []
+        stack = [(child, 1) for child in reversed(cached_children(root))]
+        while stack:
+            element, depth = stack.pop()
+            descendants.append((element, depth))
+            stack.extend(
+                (child, depth + 1) for child in reversed(cached_children(element))
+            )
+        return descendants
+
+
+def rect_tuple(rectangle: Any) -> Tuple[int, int, int, int]:
+    """
+    Get the coordinates of a rectangle.
+    :param rectangle: The pywinauto RECT or the fake rectangle.
+    :return: The tuple of (left, top, right, bottom).
+    """
+    return (rectangle.left, rectangle.top, rectangle.right, rectangle.bottom)
+
+
+@dataclass
+class SnapshotDiff:
+    """
+    The changes of the control tree between the snapshots of two consecutive steps.
+    """
+
+    added: List[ControlRecord] = field(default_factory=list)
+    removed: List[ControlRecord] = field(default_factory=list)
+    moved: List[ControlRecord] = field(default_factory=list)
+    changed: List[ControlRecord] = field(default_factory=list)
+    unchanged: int = 0
+
+    def is_empty(self) -> bool:
+        """
+        Check whether the control tree is unchanged.
+        :return: True if nothing was added, removed, moved or changed.
+        """
+        return not (self.added or self.removed or self.moved or self.changed)
+
+    def to_dict(
+        self, annotation_dict: Optional[Dict[str, Any]] = None, max_items: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Convert the diff into a dict for the prompt and the logs. Only the named controls are listed.
+        :param annotation_dict: The annotation dict of the step, to add the labels of the listed controls.
+        :param max_items: The maximum number of controls listed per kind of change, unlimited if 0.
+        :return: The counts of the changes and the listed controls.
+        """
+        labels = {
+            id(control.record): label
+            for label, control in (annotation_dict or {}).items()
+            if isinstance(control, CachedControl)
+        }
+
+        def entries(records: List[ControlRecord]) -> List[Dict[str, str]]:
+            named = [record for record in records if record.name]
+            if max_items > 0:
+                named = named[:max_items]
+            return [
+                dict(
+                    {"label": labels[id(record)]} if id(record) in labels else {},
+                    control_text=record.name,
+                    control_type=record.control_type,
+                )
+                for record in named
+            ]
+
+        return {
+            "count": {
+                "added": len(self.added),
+                "removed": len(self.removed),
+                "moved": len(self.moved),
+                "changed": len(self.changed),
+                "unchanged": self.unchanged,
+            },
+            "added": entries(self.added),
+            "removed": entries(self.removed),
+            "moved": entries(self.moved),
+            "changed": entries(self.changed),
+        }
+
+
+class UITreeSnapshot:
+    """
+    The per-step table of the controls of a window, fetched with one walk of the UI tree.
+    The controls returned by the snapshot serve their properties from the table, so the later readers do not go back to the UI.
+    """
+
+    def __init__(
+        self, window: Any, records: List[ControlRecord], fetch_time: float = 0.0
+    ) -> None:
+        """
+        Initialize the snapshot.
+        :param window: The window of the snapshot.
+        :param records: The records of the descendants of the window in depth-first order.
+        :param fetch_time: The time spent on fetching the records.
+        """
+        self.window = window
+        self.records = records
+        self.fetch_time = fetch_time
+        self._controls = [CachedControl(record) for record in records]
+        self._index_tree()
+
+    def _index_tree(self) -> None:
+        """
+        Index the records by key, and compute the parent, the end of the subtree and the structural hash of every record.
+        The key is the runtime id, or the path of the control if it has no runtime id.
+        """
+        size = len(self.records)
+        self.keys: List[Tuple[Any, ...]] = [()] * size
+        self.parents: List[int] = [-1] * size
+        self.subtree_ends: List[int] = [size] * size
+        self.hashes: List[int] = [0] * size
+        self._index: Dict[Tuple[Any, ...], int] = {}
+
+        ancestors: List[int] = []
+        sibling_counts: Dict[Tuple[Any, ...], int] = {}
+        for i, record in enumerate(self.records):
+            while ancestors and self.records[ancestors[-1]].depth >= record.depth:
+                self.subtree_ends[ancestors.pop()] = i
+            self.parents[i] = ancestors[-1] if ancestors else -1
+
+            key = record.runtime_id
+            if not key:
+                parent_key = self.keys[self.parents[i]] if ancestors else ()
+                sibling = (parent_key, record.control_type, record.name)
+                sibling_counts[sibling] = sibling_counts.get(sibling, 0) + 1
+                key = ("path",) + sibling + (sibling_counts[sibling],)
+            self.keys[i] = key
+            self._index.setdefault(key, i)
+            ancestors.append(i)
+
+        # The hash of a subtree covers its root and the hashes of its children, computed bottom-up.
+        children_hashes: List[List[int]] = [[] for _ in range(size)]
+        for i in range(size - 1, -1, -1):
+            record = self.records[i]
+            self.hashes[i] = hash(
+                (
+                    self.keys[i],
+                    record.name,
+                    record.text,
+                    record.visible,
+                    record.enabled,
+                    rect_tuple(record.rectangle),
+                    tuple(reversed(children_hashes[i])),
+                )
+            )
+            if self.parents[i] >= 0:
+                children_hashes[self.parents[i]].append(self.hashes[i])
+
+    @classmethod
+    def take(
+        cls,
+        window: Any,
+        provider: UITreeProvider,
+        previous: Optional[UITreeSnapshot] = None,
+    ) -> UITreeSnapshot:
+        """
+        Take the snapshot of the window.
+        :param window: The window to take the snapshot.
+        :param provider: The provider to fetch the control tree.
+        :param previous: The snapshot of the window at the previous step, to fetch the tree incrementally.
+        :return: The snapshot.
+        """
+        start_time = time.perf_counter()
+        records = provider.fetch(window, previous)
+        return cls(window, records, time.perf_counter() - start_time)
+
+    def get_record(self, key: Tuple[Any, ...]) -> Optional[ControlRecord]:
+        """
+        Get the record of a control by its key.
+        :param key: The runtime id of the control.
+        :return: The record, None if the control is not in the snapshot.
+        """
+        index = self._index.get(key)
+        return self.records[index] if index is not None else None
+
+    def descendants(
+        self,
+        control_type: Optional[str] = None,
+        class_name: Optional[str] = None,
+        depth: Optional[int] = None,
+    ) -> List[CachedControl]:
+        """
+        Get the controls of the snapshot matching the criteria, like the pywinauto descendants.
+        :param control_type: The control type to match.
+        :param class_name: The class name to match.
+        :param depth: The maximum depth to search, unlimited if not given.
+        :return: The controls in depth-first order.
+        """
+        return [
+            control
+            for control in self._controls
+            if (control_type is None or control.record.control_type == control_type)
+            and (class_name is None or control.record.class_name == class_name)
+            and (depth is None or control.record.depth <= depth)
+        ]
+
+    def diff(self, previous: UITreeSnapshot) -> SnapshotDiff:
+        """
+        Compare the snapshot with the snapshot of the previous step. Subtrees with the same structural hash are skipped
+        without comparing their controls, so the cost follows the size of the changed subtrees.
+        :param previous: The snapshot of the previous step.
+        :return: The diff from the previous snapshot.
+        """
+        result = SnapshotDiff()
+
+        i = 0
+        while i < len(self.records):
+            j = previous._index.get(self.keys[i])
+            if j is None:
+                result.added.append(self.records[i])
+                i += 1
+                continue
+
+            if previous.hashes[j] == self.hashes[i]:
+                result.unchanged += self.subtree_ends[i] - i
+                i = self.subtree_ends[i]
+                continue
+
+            record, previous_record = self.records[i], previous.records[j]
+            parent_key = self.keys[self.parents[i]] if self.parents[i] >= 0 else ()
+            previous_parent_key = (
+                previous.keys[previous.parents[j]] if previous.parents[j] >= 0 else ()
+            )
+
+            if parent_key != previous_parent_key or rect_tuple(
+                record.rectangle
+            ) != rect_tuple(previous_record.rectangle):
+                result.moved.append(record)
+            elif (
+                record.name != previous_record.name
+                or record.text != previous_record.text
+                or record.visible != previous_record.visible
+                or record.enabled != previous_record.enabled
+            ):
+                result.changed.append(record)
+            else:
+                result.unchanged += 1
+            i += 1
+
+        # Every control of the previous snapshot that was matched is counted once, the rest were removed.
+        matched = result.unchanged + len(result.moved) + len(result.changed)
+        if matched < len(previous.records):
+            result.removed = [
+                record
+                for key, record in zip(previous.keys, previous.records)
+                if key not in self._index
+            ]
+
+        return result
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+class TreeProviderFactory:
+    """
+    A factory class to create the tree providers.
+    """
+
+    @staticmethod
+    def create_provider(backend: str, window: Any) -> UITreeProvider:
+        """
+        Create the tree provider for the window.
+        :param backend: The backend of the control inspector.
+        :param window: The window to fetch.
+        :return: The tree provider.
+        """
+        # The fake desktop has no UIA element to send the cache request to.
+        if backend == "uia" and not configs.get("FAKE_DESKTOP", False):
+            return UIACacheTreeProvider()
+        return WrapperTreeProvider()
+
+    @classmethod
+    def take_snapshot(
+        cls, backend: str, window: Any, previous: Optional[UITreeSnapshot] = None
+    ) -> UITreeSnapshot:
+        """
+        Take the snapshot of the window, falling back to walking the wrappers if the UIA cache request fails.
+        :param backend: The backend of the control inspector.
+        :param window: The window to take the snapshot.
+        :param previous: The snapshot taken at the previous step, ignored if it is of another window.
+        :return: The snapshot.
+        """
+        if previous is not None and previous.window != window:
+            previous = None
+
+        provider = cls.create_provider(backend, window)
+        try:
+            return UITreeSnapshot.take(window, provider, previous)
+        except Exception as e:
+            if isinstance(provider, WrapperTreeProvider):
+                raise
+            utils.print_with_color(
+                f"Warning: Failed to fetch the UI tree with the cache request: {e}, walking the controls instead.",
+                "yellow",
+            )
+            return UITreeSnapshot.take(window, WrapperTreeProvider(), previous)
@@ -0,0 +1,347 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from ufo.config.config import Config
+from ufo.utils import print_with_color
+
+configs = Config.get_instance().config_data
+
+
+class SystemClipboard:
+    """
+    The Windows clipboard, read and written as unicode text.
+    """
+
+    @staticmethod
+    def get_text() -> Optional[str]:
+        """
+        Get the text on the clipboard.
+        :return: The text, None if the clipboard has no text.
+        """
+        import win32clipboard
+
+        win32clipboard.OpenClipboard()
+        try:
+            if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_UNICODETEXT):
+                return win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
+            return None
+        finally:
+            win32clipboard.CloseClipboard()
+
+    @staticmethod
+    def set_text(text: Optional[str]) -> None:
+        """
+        Put the text on the clipboard.
+        :param text: The text, None to empty the clipboard.
+        """
+        import win32clipboard
+
+        win32clipboard.OpenClipboard()
+        try:
+            win32clipboard.EmptyClipboard()
+            if text is not None:
+                win32clipboard.SetClipboardText(text, win32clipboard.CF_UNICODETEXT)
+        finally:
+            win32clipboard.CloseClipboard()
+
+
+class TextInputStrategy(ABC):
+    """
+    A way to enter text into a control.
+    """
+
+    # Whether the strategy replaces the content of the control, or inserts the text at the caret.
+    replaces = False
+
+    @classmethod
+    @abstractmethod
+    def name(cls) -> str:
+        """
+        Get the name of the strategy.
+        :return: The name.
+        """
+        pass
+
+    def is_applicable(self, control: Any) -> bool:
+        """
+        Check whether the strategy can be used on the control.
+        :param control: The control.
+        :return: True if the strategy can be used.
+        """
+        return True
+
+    @abstractmethod
+    def input_text(self, control: Any, text: str, replace: bool) -> Any:
+        """
+        Enter the text into the control.
+        :param control: The control.
+        :param text: The text.
+        :param replace: Whether to replace the content of the control, otherwise the text is inserted at the caret.
+        :return: The result of the underlying control method.
+        """
+        pass
+
+
+class ValuePatternInput(TextInputStrategy):
+    """
+    Set the value of the control at once, with the UIA ValuePattern behind the pywinauto set_edit_text.
+    """
+
+    replaces = True
+
+    @classmethod
+    def name(cls) -> str:
+        return "value_pattern"
+
+    def is_applicable(self, control: Any) -> bool:
+        return hasattr(control, "set_edit_text")
+
+    def input_text(self, control: Any, text: str, replace: bool) -> Any:
+        return control.set_edit_text(text=text)
+
+
+class ClipboardPasteInput(TextInputStrategy):
+    """
+    Paste the text from the clipboard, restoring the previous text of the clipboard afterwards.
+    Only the text of the previous clipboard is restored.
+    """
+
+    # The time for the application to read the clipboard after the paste keys, before the clipboard is restored.
+    paste_delay = 0.2
+
+    @classmethod
+    def name(cls) -> str:
+        return "clipboard"
+
+    def input_text(self, control: Any, text: str, replace: bool) -> Any:
+        clipboard = TextInputManager.clipboard(control)
+        previous_text = clipboard.get_text()
+
+        try:
+            clipboard.set_text(text)
+            result = control.type_keys("^a^v" if replace else "^v")
+            time.sleep(self.paste_delay)
+        finally:
+            clipboard.set_text(previous_text)
+
+        return result
+
+
+class ChunkedTypeKeysInput(TextInputStrategy):
+    """
+    Type the text in chunks without pause between the keys, letting the application drain its input between the chunks.
+    """
+
+    chunk_pause = 0.05
+
+    @classmethod
+    def name(cls) -> str:
+        return "type_keys"
+
+    def input_text(self, control: Any, text: str, replace: bool) -> Any:
+        keys = self.to_keys(text)
+        chunk_size = max(1, configs.get("INPUT_TEXT_CHUNK_SIZE", 50))
+
+        result = None
+        if replace:
+            result = control.type_keys("^a{BACKSPACE}")
+
+        for start in range(0, len(keys), chunk_size):
+            if start > 0:
+                time.sleep(self.chunk_pause)
+            result = control.type_keys(
+                "".join(keys[start : start + chunk_size]), pause=0, with_spaces=True
+            )
+
+        return result
+
+    @staticmethod
+    def to_keys(text: str) -> List[str]:
+        """
+        Split the text into pywinauto keys, so that a chunk never cuts a {KEY}.
+        :param text: The text.
+        :return: The keys.
+        """
+        text = text.replace("\n", "{ENTER}").replace("\t", "{TAB}")
+        return re.findall(r"\{[^}]+\}|.", text, flags=re.DOTALL)
+
+
+class TextInputManager:
+    """
+    Pick the fastest reliable text input strategy for a control. The strategies are tried from the fastest, and the
+    outcome is learned per (application, control type), so that the next inputs go straight to the working strategy.
+    """
+
+    _strategies: List[TextInputStrategy] = [
+        ValuePatternInput(),
+        ClipboardPasteInput(),
+        ChunkedTypeKeysInput(),
+    ]
+
+    # The learned strategy and the failed strategies of each (application, control type).
+    _learned: Dict[Tuple[str, str], str] = {}
+    _failed: Dict[Tuple[str, str], Set[str]] = {}
+    _lock = threading.Lock()
+
+    # The function getting the clipboard of a control, replaced e.g. by the fake desktop, which has its own clipboard.
+    clipboard_provider: Optional[Callable[[Any], Any]] = None
+
+    @classmethod
+    def clipboard(cls, control: Any) -> Any:
+        """
+        Get the clipboard of the desktop of the control.
+        :param control: The control.
+        :return: The clipboard given by the clipboard provider if it is set, otherwise the system clipboard.
+        """
+        if cls.clipboard_provider is not None:
+            return cls.clipboard_provider(getattr(control, "wrapped", control))
+        return SystemClipboard
+
+    @staticmethod
+    def read_text(control: Any) -> Optional[str]:
+        """
+        Read back the text of the control from the live control.
+        :param control: The control.
+        :return: The text, None if it cannot be read.
+        """
+        control = getattr(control, "wrapped", control)
+        try:
+            if hasattr(control, "get_value"):
+                return str(control.get_value())
+            return control.window_text()
+        except Exception:
+            return None
+
+    @staticmethod
+    def normalize(text: Optional[str]) -> str:
+        """
+        Normalize a text for the comparison with the read back text.
+        :param text: The text.
+        :return: The normalized text.
+        """
+        return (text or "").replace("\r\n", "\n").replace("\r", "\n").strip()
+
+    @classmethod
+    def candidates(
+        cls, key: Tuple[str, str], control: Any, replace: bool
+    ) -> List[TextInputStrategy]:
+        """
+        Get the strategies to try for the control, the learned one first.
+        :param key: The (application, control type) of the control.
+        :param control: The control.
+        :param replace: Whether the content of the control is replaced.
+        :return: The strategies.
+        """
+        with cls._lock:
+            learned = cls._learned.get(key)
+            failed = set(cls._failed.get(key, set()))
+
+        strategies = [
+            strategy
+            for strategy in cls._strategies
+            if (replace or not strategy.replaces)
+            and strategy.name() not in failed
+            and strategy.is_applicable(control)
+        ]
+        strategies.sort(key=lambda strategy: strategy.name() != learned)
+
+        # The typing is the last resort, even if it failed before.
+        if not strategies:
+            strategies = [cls._strategies[-1]]
+        return strategies
+
+    @classmethod
+    def learn(cls, key: Tuple[str, str], strategy_name: str, success: bool) -> None:
+        """
+        Record the outcome of a strategy.
+        :param key: The (application, control type) of the control.
+        :param strategy_name: The name of the strategy.
+        :param success: Whether the text was entered.
+        """
+        with cls._lock:
+            if success:
+                cls._learned[key] = strategy_name
+                cls._failed.get(key, set()).discard(strategy_name)
+            else:
+                cls._failed.setdefault(key, set()).add(strategy_name)
+                if cls._learned.get(key) == strategy_name:
+                    del cls._learned[key]
+
+    @classmethod
+    def input_text(
+        cls, control: Any, text: str, app_root_name: str, replace: bool
+    ) -> Any:
+        """
+        Enter the text into the control with the fastest strategy that works, verified by reading back the text.
+        When replacing the content, a failed strategy is followed by the next one. When inserting at the caret, the next
+        strategy is only tried if the failed one left the text unchanged, so that the text is never entered twice.
+        :param control: The control.
+        :param text: The text.
+        :param app_root_name: The root name of the application of the control.
+        :param replace: Whether to replace the content of the control, otherwise the text is inserted at the caret.
+        :return: The result of the control method of the strategy used.
+        """
+        key = (app_root_name, control.element_info.control_type)
+        expected = cls.normalize(text)
+        result = None
+
+        for strategy in cls.candidates(key, control, replace):
+            text_before = cls.read_text(control)
+
+            try:
+                result = strategy.input_text(control, text, replace)
+            except Exception as e:
+                print_with_color(
+                    f"Warning: The {strategy.name()} text input failed on {control}: {e}",
+                    "yellow",
+                )
+                cls.learn(key, strategy.name(), False)
+                continue
+
+            text_after = cls.read_text(control)
+
+            # When inserting, the text must have changed, it may already contain the input before.
+            if (
+                text_after is not None
+                and expected in cls.normalize(text_after)
+                and (replace or text_after != text_before)
+            ):
+                cls.learn(key, strategy.name(), True)
+                return result
+
+            if not replace and text_after is None:
+                # The text cannot be read back from the control, e.g. a rich document. The input is assumed to work.
+                cls.learn(key, strategy.name(), True)
+                return result
+
+            # The strategy left the text unchanged or did not enter it, it is learned as failed.
+            cls.learn(key, strategy.name(), False)
+            if not replace and text_after != text_before:
+                # The text changed without containing the input, entering it again would duplicate it.
+                return result
+
+        return result
+
+    @classmethod
+    def learned_strategies(cls) -> Dict[Tuple[str, str], str]:
+        """
+        Get the learned strategies.
+        :return: The learned strategy of each (application, control type).
+        """
+        with cls._lock:
+            return dict(cls._learned)
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Forget the learned strategies.
+        """
+        with cls._lock:
+            cls._learned.clear()
+            cls._failed.clear()
@@ -8,6 +8,9 @@ import yaml
 
 from ufo.utils import print_with_color
 
+# The C loader of libyaml parses the configuration and the prompt templates much faster, if it is installed.
+YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 class Config:
     _instance = None
@@ -41,14 +44,14 @@ class Config:
 
         try:
             with open(path + "config.yaml", "r") as file:
-                yaml_data = yaml.safe_load(file)
+                yaml_data = yaml.load(file, Loader=YAMLLoader)
             # Update configs with YAML data
             if yaml_data:
                 configs.update(yaml_data)
             with open(path + "config_dev.yaml", "r") as file:
-                yaml_dev_data = yaml.safe_load(file)
+                yaml_dev_data = yaml.load(file, Loader=YAMLLoader)
             with open(path + "config_prices.yaml", "r") as file:
-                yaml_prices_data = yaml.safe_load(file)
+                yaml_prices_data = yaml.load(file, Loader=YAMLLoader)
             # Update configs with YAML data
             if yaml_data:
                 configs.update(yaml_dev_data)
@@ -5,6 +5,7 @@ import json
 import os
 import re
 
+from ufo.automator.ui_control.image_store import ImageStore
 from ufo.automator.ui_control.screenshot import PhotographerFacade
 from ufo.utils import print_with_color
 
@@ -54,8 +55,8 @@ class ExperienceLogLoader:
         :return: The maximum number in the filenames.
         """
 
-        # Get the list of files in the folder
-        files = os.listdir(log_path)
+        # Get the list of files in the folder, including the screenshots stored in the manifest
+        files = ImageStore.list_names(log_path)
 
         # Initialize an empty list to store extracted numbers
         numbers = []
@@ -95,8 +96,8 @@ class ExperienceLogLoader:
         )
         screenshot_path = os.path.join(self.log_path, filename)
 
-        # Check if the screenshot exists
-        if os.path.exists(screenshot_path):
+        # Check if the screenshot exists, as a file or in the manifest of the log
+        if ImageStore.exists(screenshot_path):
             image_url = PhotographerFacade.encode_image_from_path(screenshot_path)
         else:
             image_url = None
@@ -2,9 +2,57 @@
 # Licensed under the MIT License.
 
 import abc
+import threading
 from importlib import import_module
+from typing import Any, Dict
+
+
+class ConnectionCounter:
+    """
+    The counter of the HTTP requests of an httpx client and of the connections they opened. The other requests reused
+    a connection kept alive in the pool of the client.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the counter.
+        """
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def on_request(self, request: Any) -> None:
+        """
+        The request event hook of the client, tracing the connection used by the request.
+        :param request: The httpx request.
+        """
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """
+        The httpcore trace of a request, counting the new connections.
+        :param event_name: The name of the event.
+        :param info: The information of the event.
+        """
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the counters.
+        :return: The number of requests and of new connections.
+        """
+        with self._lock:
+            return {"requests": self.requests, "connections": self.connections}
+
 
 class BaseService(abc.ABC):
+    # Whether chat_completion can stream the completion to an on_field callback.
+    supports_streaming = False
+
     @abc.abstractmethod
     def __init__(self, *args, **kwargs):
         pass
@@ -13,6 +61,13 @@ class BaseService(abc.ABC):
     def chat_completion(self, *args, **kwargs):
         pass
 
+    def connection_stats(self) -> Dict[str, int]:
+        """
+        Get the number of HTTP requests sent by the service and of the connections they opened.
+        :return: The counters, empty if the service does not count its connections.
+        """
+        return {}
+
     @staticmethod
     def get_service(name):
         service_map = {
@@ -23,6 +78,7 @@ class BaseService(abc.ABC):
             "ollama": "OllamaService",
             "gemini": "GeminiService",
             "placeholder": "PlaceHolderService",
+            "scripted": "ScriptedService",
         }
         service_name = service_map.get(name, None)
         if service_name:
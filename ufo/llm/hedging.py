@@ -0,0 +1,258 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+
+class LatencyHistogram:
+    """
+    The rolling window of the latencies of the completions of an endpoint.
+    """
+
+    def __init__(self, window: int = 200) -> None:
+        """
+        Initialize the histogram.
+        :param window: The number of the most recent latencies kept.
+        """
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        """
+        Record the latency of a completion.
+        :param latency: The latency in seconds.
+        """
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Get a percentile of the recorded latencies.
+        :param percent: The percentile, between 0 and 100.
+        :return: The latency in seconds, None if no latency is recorded.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        rank = max(0, math.ceil(percent / 100 * len(latencies)) - 1)
+        return latencies[min(rank, len(latencies) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+
+class HedgedCompletionError(Exception):
+    """
+    The error raised when both the primary and the hedge completions failed.
+    """
+
+    def __init__(
+        self, primary_error: BaseException, hedge_error: BaseException
+    ) -> None:
+        """
+        Initialize the error.
+        :param primary_error: The error of the primary completion.
+        :param hedge_error: The error of the hedge completion.
+        """
+        super().__init__(f"{primary_error} (the hedge also failed: {hedge_error})")
+        self.primary_error = primary_error
+        self.hedge_error = hedge_error
+
+
+class HedgedCompletion:
+    """
+    Run a completion on the primary endpoint, and if it has not answered within a deadline adapted from the latency
+    percentile of the endpoint, run the same completion on the hedge endpoint and take the first answer.
+    The loser is cancelled if it has not started yet, otherwise its answer is discarded and its cost is reported to the
+    caller once it finishes.
+    """
+
+    _histograms: Dict[Hashable, LatencyHistogram] = {}
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+
+    _requests = 0
+    _hedged = 0
+    _hedge_wins = 0
+
+    @classmethod
+    def histogram(cls, key: Hashable) -> LatencyHistogram:
+        """
+        Get the latency histogram of an endpoint.
+        :param key: The key of the endpoint.
+        :return: The histogram.
+        """
+        with cls._lock:
+            histogram = cls._histograms.get(key)
+            if histogram is None:
+                histogram = cls._histograms[key] = LatencyHistogram(
+                    configs.get("HEDGE_WINDOW", 200)
+                )
+            return histogram
+
+    @classmethod
+    def deadline(cls, key: Hashable) -> float:
+        """
+        Get the time to wait for the primary endpoint before hedging.
+        :param key: The key of the primary endpoint.
+        :return: The deadline in seconds, the HEDGE_PERCENTILE latency of the endpoint once enough latencies are recorded.
+        """
+        histogram = cls.histogram(key)
+        if len(histogram) < configs.get("HEDGE_MIN_SAMPLES", 10):
+            return configs.get("HEDGE_INITIAL_DELAY", 20)
+
+        deadline = histogram.percentile(configs.get("HEDGE_PERCENTILE", 90))
+        return min(
+            max(deadline, configs.get("HEDGE_MIN_DELAY", 2)),
+            configs.get("HEDGE_MAX_DELAY", 60),
+        )
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """
+        Get the thread pool running the completions.
+        :return: The thread pool.
+        """
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=configs.get("HEDGE_MAX_WORKERS", 16),
+                    thread_name_prefix="ufo-hedge",
+                )
+            return cls._executor
+
+    @classmethod
+    def _timed_call(
+        cls, key: Hashable, call: Callable[[], Tuple[List[str], float]]
+    ) -> Tuple[List[str], float]:
+        """
+        Run a completion and record its latency in the histogram of its endpoint.
+        :param key: The key of the endpoint.
+        :param call: The completion.
+        :return: The responses and the cost.
+        """
+        start_time = time.perf_counter()
+        result = call()
+        cls.histogram(key).record(time.perf_counter() - start_time)
+        return result
+
+    @staticmethod
+    def _discard(
+        future: Future, on_late_cost: Optional[Callable[[float], None]]
+    ) -> None:
+        """
+        Cancel the losing completion, or report its cost once it finishes if it is already running.
+        :param future: The future of the completion.
+        :param on_late_cost: The function called with the cost of the completion once it finishes.
+        """
+        if future.cancel() or on_late_cost is None:
+            return
+
+        def report_cost(finished: Future) -> None:
+            if finished.cancelled() or finished.exception() is not None:
+                return
+            on_late_cost(finished.result()[1] or 0.0)
+
+        future.add_done_callback(report_cost)
+
+    @classmethod
+    def complete(
+        cls,
+        primary_key: Hashable,
+        primary_call: Callable[[], Tuple[List[str], float]],
+        hedge_key: Hashable,
+        hedge_call: Callable[[], Tuple[List[str], float]],
+        deadline: Optional[float] = None,
+        on_late_cost: Optional[Callable[[float], None]] = None,
+    ) -> Tuple[List[str], float]:
+        """
+        Run the completion with hedging.
+        :param primary_key: The key of the primary endpoint.
+        :param primary_call: The completion on the primary endpoint.
+        :param hedge_key: The key of the hedge endpoint.
+        :param hedge_call: The same completion on the hedge endpoint.
+        :param deadline: The time to wait for the primary before hedging, by default adapted from its latencies.
+        :param on_late_cost: The function called with the cost of the losing completion, if it finishes after the winner
+        is returned. The cost is not reported if not given.
+        :return: The responses of the first successful completion, and the cost of the completions finished so far.
+        :raise HedgedCompletionError: If the completion was hedged and both completions failed.
+        """
+        executor = cls._get_executor()
+        deadline = cls.deadline(primary_key) if deadline is None else deadline
+
+        with cls._lock:
+            cls._requests += 1
+
+        primary = executor.submit(cls._timed_call, primary_key, primary_call)
+        done, _ = wait([primary], timeout=deadline)
+        if done:
+            responses, cost = primary.result()
+            return responses, cost or 0.0
+
+        with cls._lock:
+            cls._hedged += 1
+        hedge = executor.submit(cls._timed_call, hedge_key, hedge_call)
+
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            # The primary wins a tie, and the cost of every finished completion is counted.
+            succeeded = [
+                future
+                for future in [primary, hedge]
+                if future in done and future.exception() is None
+            ]
+            if not succeeded:
+                continue
+
+            if succeeded[0] is hedge:
+                with cls._lock:
+                    cls._hedge_wins += 1
+            for loser in pending:
+                cls._discard(loser, on_late_cost)
+
+            cost = sum(future.result()[1] or 0.0 for future in succeeded)
+            return succeeded[0].result()[0], cost
+
+        # Both completions failed.
+        raise HedgedCompletionError(
+            primary.exception(), hedge.exception()
+        ) from primary.exception()
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """
+        Get the counters of the hedging.
+        :return: The number of requests, hedged requests and requests won by the hedge, and the deadline of each endpoint.
+        """
+        with cls._lock:
+            keys = list(cls._histograms.keys())
+            stats = {
+                "requests": cls._requests,
+                "hedged": cls._hedged,
+                "hedge_wins": cls._hedge_wins,
+            }
+        stats["deadlines"] = {str(key): cls.deadline(key) for key in keys}
+        return stats
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Forget the latencies and reset the counters.
+        """
+        with cls._lock:
+            cls._histograms.clear()
+            cls._requests = 0
+            cls._hedged = 0
+            cls._hedge_wins = 0
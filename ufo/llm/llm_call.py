@@ -3,16 +3,21 @@
 
 from ufo.utils import print_with_color
 from ..config.config import Config
-from typing import Tuple
+from typing import Any, Callable, Optional, Tuple
 
-from .base import BaseService
+from .hedging import HedgedCompletion, HedgedCompletionError
+from .service_pool import ServicePool
 
 
 configs = Config.get_instance().config_data
 
 
 def get_completion(
-    messages, agent: str = "APP", use_backup_engine: bool = True
+    messages,
+    agent: str = "APP",
+    use_backup_engine: bool = True,
+    on_field: Optional[Callable[[str, Any], None]] = None,
+    on_late_cost: Optional[Callable[[float], None]] = None,
 ) -> Tuple[str, float]:
     """
     Get completion for the given messages.
@@ -21,6 +26,8 @@ def get_completion(
         messages (list): List of messages to be used for completion.
         agent (str, optional): Type of agent. Possible values are 'hostagent', 'appagent' or 'backup'.
         use_backup_engine (bool, optional): Flag indicating whether to use the backup engine or not.
+        on_field (Callable[[str, Any], None], optional): The function called with each top-level field of the JSON response as soon as it is streamed, if the service supports streaming.
+        on_late_cost (Callable[[float], None], optional): The function called with the cost of a hedged completion finished after the response was returned.
 
     Returns:
         tuple: A tuple containing the completion response (str) and the cost (float).
@@ -28,13 +35,23 @@ def get_completion(
     """
 
     responses, cost = get_completions(
-        messages, agent=agent, use_backup_engine=use_backup_engine, n=1
+        messages,
+        agent=agent,
+        use_backup_engine=use_backup_engine,
+        n=1,
+        on_field=on_field,
+        on_late_cost=on_late_cost,
     )
     return responses[0], cost
 
 
 def get_completions(
-    messages, agent: str = "APP", use_backup_engine: bool = True, n: int = 1
+    messages,
+    agent: str = "APP",
+    use_backup_engine: bool = True,
+    n: int = 1,
+    on_field: Optional[Callable[[str, Any], None]] = None,
+    on_late_cost: Optional[Callable[[float], None]] = None,
 ) -> Tuple[list, float]:
     """
     Get completions for the given messages.
@@ -44,6 +61,8 @@ def get_completions(
         agent (str, optional): Type of agent. Possible values are 'hostagent', 'appagent' or 'BACKUP'.
         use_backup_engine (bool, optional): Flag indicating whether to use the backup engine or not.
         n (int, optional): Number of completions to generate.
+        on_field (Callable[[str, Any], None], optional): The function called with each top-level field of the JSON response as soon as it is streamed, if the service supports streaming.
+        on_late_cost (Callable[[float], None], optional): The function called with the cost of a hedged completion finished after the response was returned.
 
     Returns:
         tuple: A tuple containing the completion responses (list of str) and the cost (float).
@@ -58,23 +77,51 @@ def get_completions(
     else:
         raise ValueError(f"Agent {agent} not supported")
 
-    api_type = configs[agent_type]["API_TYPE"]
+    hedge_agent_type = configs.get("HEDGE_AGENT", "BACKUP_AGENT")
+
     try:
-        api_type_lower = api_type.lower()
-        service = BaseService.get_service(api_type_lower)
-        if service:
-            response, cost = service(configs, agent_type=agent_type).chat_completion(
-                messages, n
+        # Reuse the long-lived service of the agent type to keep its HTTP connections alive.
+        service = ServicePool.get_service(configs, agent_type)
+
+        # Stream the completion to the callback if the service supports it.
+        stream_kwargs = (
+            {"on_field": on_field}
+            if on_field is not None and service.supports_streaming
+            else {}
+        )
+
+        if (
+            use_backup_engine
+            and configs.get("HEDGE_REQUESTS", False)
+            and hedge_agent_type != agent_type
+            and hedge_agent_type in configs
+        ):
+            # Fire the same request at the hedge engine if the primary is slower than usual.
+            hedge_service = ServicePool.get_service(configs, hedge_agent_type)
+            return HedgedCompletion.complete(
+                ServicePool.service_key(configs, agent_type),
+                lambda: service.chat_completion(messages, n, **stream_kwargs),
+                ServicePool.service_key(configs, hedge_agent_type),
+                lambda: hedge_service.chat_completion(messages, n),
+                on_late_cost=on_late_cost,
             )
-            return response, cost
-        else:
-            raise ValueError(f"API_TYPE {api_type} not supported")
+
+        response, cost = service.chat_completion(messages, n, **stream_kwargs)
+        return response, cost
     except Exception as e:
-        if use_backup_engine:
+        # The hedge engine is the backup engine and it already failed the request, it is not called again.
+        backup_failed = (
+            isinstance(e, HedgedCompletionError) and hedge_agent_type == "BACKUP_AGENT"
+        )
+        if use_backup_engine and not backup_failed:
             print_with_color(f"The API request of {agent_type} failed: {e}.", "red")
             print_with_color(f"Switching to use the backup engine...", "yellow")
             return get_completions(
-                messages, agent="backup", use_backup_engine=False, n=n
+                messages,
+                agent="backup",
+                use_backup_engine=False,
+                n=n,
+                on_field=on_field,
             )
         else:
             raise e
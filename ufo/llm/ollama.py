@@ -3,7 +3,7 @@ import copy
 import io
 import json
 import time
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional
 
 import requests
 from PIL import Image
@@ -11,14 +11,19 @@ from PIL import Image
 from ufo.utils import print_with_color
 
 from .base import BaseService
+from .stream_parser import IncrementalJSONParser
 
 
 class OllamaService(BaseService):
+    supports_streaming = True
+
     def __init__(self, config, agent_type: str):
         self.config_llm = config[agent_type]
         self.config = config
         self.max_retry = self.config["MAX_RETRY"]
         self.timeout = self.config["TIMEOUT"]
+        # Keep the connection to the Ollama server alive across requests.
+        self.session = requests.Session()
 
     def chat_completion(
         self,
@@ -27,6 +32,7 @@ class OllamaService(BaseService):
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
         **kwargs: Any,
     ):
         """
@@ -38,6 +44,7 @@ class OllamaService(BaseService):
             temperature (float, optional): Controls the randomness of the generated completions. Higher values (e.g., 0.8) make the completions more random, while lower values (e.g., 0.2) make the completions more focused and deterministic. If not provided, the default value from the model configuration will be used.
             max_tokens (int, optional): The maximum number of tokens in the generated completions. If not provided, the default value from the model configuration will be used.
             top_p (float, optional): Controls the diversity of the generated completions. Higher values (e.g., 0.8) make the completions more diverse, while lower values (e.g., 0.2) make the completions more focused. If not provided, the default value from the model configuration will be used.
+            on_field (Callable[[str, Any], None], optional): If given, the first completion is streamed and the function is called with each top-level field of the JSON response as soon as it is decoded.
             **kwargs: Additional keyword arguments to be passed to the underlying completion method.
 
         Returns:
@@ -62,6 +69,7 @@ class OllamaService(BaseService):
                         temperature=temperature,
                         max_tokens=max_tokens,
                         top_p=top_p,
+                        on_field=on_field if i == 0 else None,
                         **kwargs,
                     )
                     responses.append(response)
@@ -82,6 +90,7 @@ class OllamaService(BaseService):
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
         **kwargs: Any,
     ):
         """
@@ -92,6 +101,7 @@ class OllamaService(BaseService):
             temperature: The temperature parameter controls the randomness of the output.
             max_tokens: The maximum number of tokens to generate in the response.
             top_p: The cumulative probability of the most likely tokens to include in the response.
+            on_field: If given, the completion is streamed and the function is called with each top-level field of the JSON response as soon as it is decoded.
             **kwargs: Additional keyword arguments.
 
         Returns:
@@ -109,17 +119,34 @@ class OllamaService(BaseService):
                 "temperature": temperature,
                 "top_p": top_p,
             },
-            "stream": False,
+            "stream": on_field is not None,
         }
 
-        resp = self._request_api(api_endpoint, payload)
+        resp = self._request_api(api_endpoint, payload, stream=on_field is not None)
         if resp.status_code != 200:
             raise Exception(
                 f"Failed to get completion with error code {resp.status_code}: {resp.text}",
             )
-        response: str = resp.json()["message"]["content"]
 
-        return response
+        if on_field is None:
+            response: str = resp.json()["message"]["content"]
+            return response
+
+        # The streamed completion is a JSON line per chunk, the last one is marked as done.
+        parser = IncrementalJSONParser(on_field)
+        chunks = []
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            content = data.get("message", {}).get("content", "")
+            if content:
+                chunks.append(content)
+                parser.feed(content)
+            if data.get("done", False):
+                break
+
+        return "".join(chunks)
 
     def resize_base64_image(self, base64_str):
         """
@@ -175,6 +202,25 @@ class OllamaService(BaseService):
                 message["images"] = [self.resize_base64_image(tmp_image)]
         return _messages
 
+    def connection_stats(self) -> Dict[str, int]:
+        """
+        Get the number of HTTP requests sent by the service and of the connections they opened, from the urllib3
+        connection pools of the session.
+        :return: The counters, empty if the pools cannot be read.
+        """
+        try:
+            pools = self.session.get_adapter(
+                self.config_llm["API_BASE"]
+            ).poolmanager.pools
+            stats = {"requests": 0, "connections": 0}
+            for key in pools.keys():
+                pool = pools[key]
+                stats["requests"] += pool.num_requests
+                stats["connections"] += pool.num_connections
+            return stats
+        except Exception:
+            return {}
+
     def _request_api(self, api_path: str, payload: Any, stream: bool = False):
         """
         Sends a POST request to the specified API path with the given payload.
@@ -188,7 +234,7 @@ class OllamaService(BaseService):
             Response: The response object returned by the API.
         """
         url = f"{self.config_llm['API_BASE']}{api_path}"
-        response = requests.post(
+        response = self.session.post(
             url=url, json=payload, timeout=self.timeout, stream=stream
         )
         return response
@@ -2,12 +2,18 @@
 # Licensed under the MIT License.
 
 import datetime
-from typing import Any, Optional
+import inspect
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import httpx
 import openai
 from openai import AzureOpenAI, OpenAI
 
-from ufo.llm.base import BaseService
+from ufo.llm.base import BaseService, ConnectionCounter
+from ufo.llm.stream_parser import IncrementalJSONParser
+from ufo.utils import print_with_color
 
 
 class OpenAIService(BaseService):
@@ -15,6 +21,18 @@ class OpenAIService(BaseService):
     The OpenAI service class to interact with the OpenAI API.
     """
 
+    # The services that own the token refresh thread, keyed by the Azure AD credential.
+    _token_owners: Dict[Tuple[str, str, str], "OpenAIService"] = {}
+    _token_lock = threading.Lock()
+
+    supports_streaming = True
+
+    # The first Azure OpenAI API version sending the usage at the end of a stream.
+    stream_usage_api_version = "2024-09-01"
+
+    # The estimated tokens of an image, the cost of a 1024x1024 image in high detail, when the usage is not sent.
+    image_tokens = 765
+
     def __init__(self, config, agent_type: str) -> None:
         """
         Create an OpenAI service instance.
@@ -27,28 +45,54 @@ class OpenAIService(BaseService):
         self.max_retry = self.config["MAX_RETRY"]
         self.prices = self.config["PRICES"]
         assert self.api_type in ["openai", "aoai", "azure_ad"], "Invalid API type"
+        self.token = None
+        # Whether the endpoint accepts streamed completions, turned off the first time it rejects one.
+        self.streaming_supported = True
+        self.usage_estimated = False
+        # The HTTP client of the service, with the default settings of the OpenAI client, counting its connections.
+        self.connection_counter = ConnectionCounter()
+        http_client = httpx.Client(
+            timeout=self.config["TIMEOUT"],
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            follow_redirects=True,
+            event_hooks={"request": [self.connection_counter.on_request]},
+        )
         self.client: OpenAI = (
             OpenAI(
                 base_url=self.config_llm["API_BASE"],
                 api_key=self.config_llm["API_KEY"],
                 max_retries=self.max_retry,
                 timeout=self.config["TIMEOUT"],
+                http_client=http_client,
             )
             if self.api_type == "openai"
             else AzureOpenAI(
                 max_retries=self.max_retry,
                 timeout=self.config["TIMEOUT"],
+                http_client=http_client,
                 api_version=self.config_llm["API_VERSION"],
                 azure_endpoint=self.config_llm["API_BASE"],
                 api_key=(
-                    self.config_llm["API_KEY"]
-                    if self.api_type == "aoai"
-                    else self.get_openai_token()
+                    self.config_llm["API_KEY"] if self.api_type == "aoai" else None
+                ),
+                azure_ad_token_provider=(
+                    self.get_token_provider() if self.api_type == "azure_ad" else None
                 ),
             )
         )
-        if self.api_type == "azure_ad":
-            self.auto_refresh_token()
+        self.stream_usage_supported = self.supports_stream_usage()
+
+    def supports_stream_usage(self) -> bool:
+        """
+        Check whether the usage can be requested at the end of a stream with the stream_options.
+        :return: True if both the OpenAI client and the API version support the stream_options.
+        """
+        create = self.client.chat.completions.create
+        if "stream_options" not in inspect.signature(create).parameters:
+            return False
+        if self.api_type == "openai":
+            return True
+        return self.config_llm["API_VERSION"][:10] >= self.stream_usage_api_version
 
     def chat_completion(
         self,
@@ -58,6 +102,7 @@ class OpenAIService(BaseService):
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
         **kwargs: Any,
     ):
         """
@@ -77,6 +122,8 @@ class OpenAIService(BaseService):
             top_p (float, optional): The top-p parameter for nucleus sampling.
                 It specifies the cumulative probability threshold for selecting the next token.
                 If not provided, the default value from the configuration will be used.
+            on_field (Callable[[str, Any], None], optional): If given and n is 1, the completion is streamed and the
+                function is called with each top-level field of the JSON response as soon as it is decoded.
             **kwargs: Additional keyword arguments to pass to the OpenAI API.
 
         Returns:
@@ -95,6 +142,28 @@ class OpenAIService(BaseService):
         top_p = top_p if top_p is not None else self.config["TOP_P"]
 
         try:
+            if on_field is not None and n == 1 and self.streaming_supported:
+                try:
+                    return self._stream_completion(
+                        model,
+                        messages,
+                        temperature,
+                        max_tokens,
+                        top_p,
+                        on_field,
+                        **kwargs,
+                    )
+                except (TypeError, openai.BadRequestError) as e:
+                    # Only a rejection of the streaming turns it off, not e.g. a too long context or a content filter.
+                    if not isinstance(e, TypeError) and "stream" not in str(e).lower():
+                        raise
+                    # The client or the API version does not support streaming, the completion is not streamed.
+                    self.streaming_supported = False
+                    print_with_color(
+                        f"Warning: Streaming is not supported by the endpoint, the completion is not streamed: {e}",
+                        "yellow",
+                    )
+
             response: Any = self.client.chat.completions.create(
                 model=model,
                 messages=messages,  # type: ignore
@@ -138,6 +207,132 @@ class OpenAIService(BaseService):
             # Handle API error, e.g. retry or log
             raise Exception(f"OpenAI API returned an API Error: {e}")
 
+    def _stream_completion(
+        self,
+        model: str,
+        messages,
+        temperature: float,
+        max_tokens: int,
+        top_p: float,
+        on_field: Callable[[str, Any], None],
+        **kwargs: Any,
+    ) -> Tuple[List[str], float]:
+        """
+        Generate a completion streamed from the OpenAI Chat API, parsing the JSON response while the chunks arrive.
+        :param model: The model.
+        :param messages: The messages of the conversation.
+        :param temperature: The temperature.
+        :param max_tokens: The maximum number of tokens of the completion.
+        :param top_p: The top-p of the nucleus sampling.
+        :param on_field: The function called with each top-level field of the response as soon as it is decoded.
+        :return: The completion and the estimated cost, from the tokens estimated from the texts if the endpoint does not
+        send the usage in the stream.
+        """
+        parser = IncrementalJSONParser(on_field)
+        chunks = []
+        usage = None
+
+        if self.stream_usage_supported:
+            kwargs = dict(kwargs, stream_options={"include_usage": True})
+
+        stream: Any = self.client.chat.completions.create(
+            model=model,
+            messages=messages,  # type: ignore
+            n=1,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            stream=True,
+            **kwargs,
+        )
+
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                chunks.append(content)
+                parser.feed(content)
+
+        response = "".join(chunks)
+
+        if usage is not None:
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens
+        else:
+            if not self.usage_estimated:
+                self.usage_estimated = True
+                print_with_color(
+                    "Warning: The endpoint does not send the usage of the streamed completions, their cost is estimated from the length of the texts.",
+                    "yellow",
+                )
+            prompt_tokens = self.estimate_prompt_tokens(messages)
+            completion_tokens = self.estimate_tokens(response)
+
+        cost = self.get_cost_estimator(
+            self.api_type, model, self.prices, prompt_tokens, completion_tokens
+        )
+
+        return [response], cost
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        Estimate the number of tokens of a text, about 4 characters per token.
+        :param text: The text.
+        :return: The estimated number of tokens.
+        """
+        return math.ceil(len(text) / 4)
+
+    @classmethod
+    def estimate_prompt_tokens(cls, messages: List[Dict[str, Any]]) -> int:
+        """
+        Estimate the number of tokens of the messages, from their texts and their number of images.
+        :param messages: The messages of the conversation.
+        :return: The estimated number of tokens.
+        """
+        tokens = 0
+        for message in messages:
+            content = message.get("content", "")
+            if isinstance(content, str):
+                tokens += cls.estimate_tokens(content)
+                continue
+            for part in content:
+                if part.get("type") == "image_url":
+                    tokens += cls.image_tokens
+                else:
+                    tokens += cls.estimate_tokens(part.get("text", ""))
+        return tokens
+
+    def connection_stats(self) -> Dict[str, int]:
+        """
+        Get the number of HTTP requests sent by the service and of the connections they opened.
+        :return: The counters.
+        """
+        return self.connection_counter.stats()
+
+    def get_token_provider(self) -> Callable[[], str]:
+        """
+        Get the Azure AD token provider shared by all the services with the same credential.
+        The first service of a credential starts the refresh thread, and the later ones read the token it refreshes.
+        :return: The callable returning the latest access token.
+        """
+        credential = (
+            self.config_llm["AAD_TENANT_ID"],
+            self.config_llm["AAD_API_SCOPE_BASE"],
+            self.config_llm["AAD_API_SCOPE"],
+        )
+
+        with OpenAIService._token_lock:
+            token_owner = OpenAIService._token_owners.get(credential)
+            if token_owner is None:
+                self.auto_refresh_token()
+                token_owner = OpenAIService._token_owners[credential] = self
+
+        return lambda: token_owner.token
+
     def get_openai_token(
         self,
         token_cache_file: str = "apim-token-cache.bin",
@@ -289,11 +484,12 @@ class OpenAIService(BaseService):
             )
             openai.base_url = self.config_llm["API_BASE"]
             openai.api_version = self.config_llm["API_VERSION"]
-            openai.api_key = self.get_openai_token(
+            self.token = self.get_openai_token(
                 token_cache_file=token_cache_file,
                 client_id=client_id,
                 client_secret=client_secret,
             )
+            openai.api_key = self.token
 
             if on_token_update is not None:
                 on_token_update()
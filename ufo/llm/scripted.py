@@ -0,0 +1,108 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from ufo.llm.base import BaseService
+from ufo.llm.stream_parser import IncrementalJSONParser
+
+
+class ScriptedService(BaseService):
+    """
+    The service replaying canned responses instead of calling a model, to run sessions offline, e.g. in benchmarks.
+    The responses are read from the SCRIPT of the agent configuration, a list of responses or the path of a JSON file
+    holding the list, and are returned in order, the last one being repeated once the script is exhausted.
+    Each completion takes LATENCY seconds, spread over the chunks of the response when it is streamed.
+    """
+
+    supports_streaming = True
+
+    def __init__(self, config: Dict[str, Any], agent_type: str) -> None:
+        """
+        Initialize the service.
+        :param config: The configuration of UFO.
+        :param agent_type: The agent type, e.g. "HOST_AGENT".
+        """
+        self.config_llm = config[agent_type]
+        self.config = config
+        self.latency = self.config_llm.get("LATENCY", 0)
+        self.chunk_size = max(1, self.config_llm.get("CHUNK_SIZE", 16))
+
+        self._responses = [
+            response if isinstance(response, str) else json.dumps(response)
+            for response in self.load_script(self.config_llm.get("SCRIPT", []))
+        ]
+        if not self._responses:
+            raise ValueError(f"The script of {agent_type} has no response.")
+
+        self._position = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load_script(script: Union[str, List[Any]]) -> List[Any]:
+        """
+        Load the responses of a script.
+        :param script: The list of responses, or the path of a JSON file holding the list.
+        :return: The responses.
+        """
+        if isinstance(script, str):
+            with open(script, "r", encoding="utf-8") as f:
+                script = json.load(f)
+        return list(script)
+
+    def next_response(self) -> str:
+        """
+        Take the next response of the script.
+        :return: The response.
+        """
+        with self._lock:
+            response = self._responses[min(self._position, len(self._responses) - 1)]
+            self._position += 1
+        return response
+
+    def chat_completion(
+        self,
+        messages,
+        n,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+        **kwargs: Any,
+    ) -> Tuple[List[str], float]:
+        """
+        Replay the next responses of the script.
+        :param messages: The messages, ignored.
+        :param n: The number of completions.
+        :param temperature: The temperature, ignored.
+        :param max_tokens: The maximum number of tokens, ignored.
+        :param top_p: The top-p, ignored.
+        :param on_field: The function called with each top-level field of the first response as soon as it is streamed.
+        :return: The responses and the cost, always 0.
+        """
+        responses = [self.next_response() for _ in range(n)]
+
+        if on_field is None:
+            time.sleep(self.latency)
+        else:
+            self._stream(responses[0], on_field)
+
+        return responses, 0.0
+
+    def _stream(self, response: str, on_field: Callable[[str, Any], None]) -> None:
+        """
+        Stream a response to the callback chunk by chunk, with the latency spread over the chunks.
+        :param response: The response.
+        :param on_field: The function called with each top-level field of the response.
+        """
+        parser = IncrementalJSONParser(on_field)
+        chunks = [
+            response[i : i + self.chunk_size]
+            for i in range(0, len(response), self.chunk_size)
+        ]
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            parser.feed(chunk)
@@ -0,0 +1,119 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from ufo.llm.base import BaseService
+
+
+class ServicePool:
+    """
+    The process-wide registry of long-lived LLM service instances.
+    A service is created once per (agent_type, API_TYPE, endpoint) and reused by every later completion,
+    so the underlying HTTP client keeps its connection pool alive between steps.
+    """
+
+    _instances: Dict[Tuple[str, str, str], BaseService] = {}
+    _lock = threading.Lock()
+
+    # The lock of each key held while its service is created, so that a slow creation only blocks the same key.
+    _key_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+
+    _hits = 0
+    _misses = 0
+    _setup_time = 0.0
+
+    @classmethod
+    def get_service(cls, configs: Dict[str, Any], agent_type: str) -> BaseService:
+        """
+        Get the pooled service instance for the agent type, creating it on the first call.
+        :param configs: The configuration of UFO.
+        :param agent_type: The agent type, e.g. "HOST_AGENT", "APP_AGENT" or "BACKUP_AGENT".
+        :return: The service instance.
+        """
+        key = cls.service_key(configs, agent_type)
+
+        with cls._lock:
+            service = cls._instances.get(key)
+            if service is not None:
+                cls._hits += 1
+                return service
+            key_lock = cls._key_locks.setdefault(key, threading.Lock())
+
+        # The service is created outside the pool lock, e.g. an azure_ad service may wait for an interactive sign-in.
+        with key_lock:
+            with cls._lock:
+                service = cls._instances.get(key)
+                if service is not None:
+                    cls._hits += 1
+                    return service
+
+            start_time = time.perf_counter()
+            service_class = BaseService.get_service(key[1])
+            service = service_class(configs, agent_type=agent_type)
+            setup_time = time.perf_counter() - start_time
+
+            with cls._lock:
+                cls._setup_time += setup_time
+                cls._misses += 1
+                cls._instances[key] = service
+
+        return service
+
+    @staticmethod
+    def service_key(configs: Dict[str, Any], agent_type: str) -> Tuple[str, str, str]:
+        """
+        Get the pool key of the agent type.
+        :param configs: The configuration of UFO.
+        :param agent_type: The agent type.
+        :return: The key of (agent_type, API_TYPE, endpoint).
+        """
+        config_llm = configs[agent_type]
+        return (
+            agent_type,
+            config_llm["API_TYPE"].lower(),
+            config_llm.get("API_BASE", ""),
+        )
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        """
+        Get the counters of the pool.
+        :return: The number of pool hits and misses, the time spent on creating services, the estimated time saved by the
+        hits, and the number of HTTP requests of the services counting their connections, of the connections they opened
+        and of the requests that reused a pooled connection.
+        """
+        with cls._lock:
+            services = list(cls._instances.values())
+
+        requests = 0
+        connections = 0
+        for service in services:
+            connection_stats = service.connection_stats()
+            requests += connection_stats.get("requests", 0)
+            connections += connection_stats.get("connections", 0)
+
+        average_setup_time = cls._setup_time / cls._misses if cls._misses else 0.0
+        return {
+            "hits": cls._hits,
+            "misses": cls._misses,
+            "setup_time": cls._setup_time,
+            "saved_time": cls._hits * average_setup_time,
+            "http_requests": requests,
+            "new_connections": connections,
+            "reused_connections": max(0, requests - connections),
+        }
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Remove all the pooled services and reset the counters.
+        """
+        with cls._lock:
+            cls._instances.clear()
+            cls._key_locks.clear()
+            cls._hits = 0
+            cls._misses = 0
+            cls._setup_time = 0.0
@@ -0,0 +1,154 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    Parse the top-level fields of a JSON object from the chunks of a streamed completion, emitting each field as soon
+    as its value is complete instead of waiting for the whole object. The text before the first "{", e.g. a markdown
+    code fence, and after the end of the object is ignored.
+    """
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None) -> None:
+        """
+        Initialize the parser.
+        :param on_field: The function called with the key and the value of each completed field.
+        """
+        self.on_field = on_field
+        self.fields: Dict[str, Any] = {}
+
+        self._text = ""
+        self._position = 0
+        self._depth = 0
+        self._phase = "key"
+        self._in_string = False
+        self._escape = False
+        self._start = 0
+        self._key: Optional[str] = None
+        self._done = False
+
+    @property
+    def done(self) -> bool:
+        """
+        Whether the end of the object is reached.
+        :return: True if the object is complete.
+        """
+        return self._done
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Feed a chunk of the completion.
+        :param chunk: The chunk.
+        :return: The fields completed by the chunk, as key and value pairs.
+        """
+        self._text += chunk
+        completed = []
+
+        for i in range(self._position, len(self._text)):
+            if self._done:
+                break
+            char = self._text[i]
+
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._phase == "key_string":
+                        self._key = self._decode(self._start, i + 1)
+                        self._phase = "colon"
+                    elif self._depth == 1 and self._phase == "string":
+                        completed += self._emit(self._start, i + 1)
+                continue
+
+            if self._depth > 1:
+                if char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == 1:
+                        completed += self._emit(self._start, i + 1)
+                continue
+
+            # The characters of the top-level object, between its fields.
+            if self._phase == "key":
+                if char == '"':
+                    self._start = i
+                    self._in_string = True
+                    self._phase = "key_string"
+                elif char == "}":
+                    self._done = True
+            elif self._phase == "colon":
+                if char == ":":
+                    self._phase = "value"
+            elif self._phase == "value":
+                if char.isspace():
+                    continue
+                self._start = i
+                if char == '"':
+                    self._in_string = True
+                    self._phase = "string"
+                elif char in "{[":
+                    self._depth += 1
+                    self._phase = "nested"
+                else:
+                    self._phase = "scalar"
+            elif self._phase == "scalar":
+                if char in ",}":
+                    completed += self._emit(self._start, i)
+                    self._phase = "key"
+                    self._done = char == "}"
+            elif self._phase == "next":
+                if char == ",":
+                    self._phase = "key"
+                elif char == "}":
+                    self._done = True
+
+        self._position = len(self._text)
+        return completed
+
+    def _decode(self, start: int, end: int) -> Any:
+        """
+        Decode a JSON value of the text.
+        :param start: The start of the value.
+        :param end: The end of the value.
+        :return: The value, None if it is not valid JSON.
+        """
+        try:
+            return json.loads(self._text[start:end])
+        except ValueError:
+            return None
+
+    def _emit(self, start: int, end: int) -> List[Tuple[str, Any]]:
+        """
+        Emit the field completed with a value of the text. A field with an invalid key or value is skipped and left to
+        the parser of the whole response.
+        :param start: The start of the value.
+        :param end: The end of the value.
+        :return: The completed field, empty if it is skipped.
+        """
+        key, self._key = self._key, None
+        self._phase = "next"
+
+        value = self._decode(start, end)
+        if not isinstance(key, str) or (
+            value is None and self._text[start:end].strip() != "null"
+        ):
+            return []
+
+        self.fields[key] = value
+        if self.on_field is not None:
+            self.on_field(key, value)
+        return [(key, value)]
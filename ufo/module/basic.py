@@ -17,9 +17,8 @@ For more details definition of the state pattern, please refer to the state.py m
 import json
 import logging
 import os
-import time
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 from pywinauto.controls.uiawrapper import UIAWrapper
 
@@ -27,12 +26,23 @@ from ufo import automator, utils
 from ufo.agents.agent.app_agent import AppAgent
 from ufo.agents.agent.basic import BasicAgent
 from ufo.agents.agent.evaluation_agent import EvaluationAgent
+from ufo.agents.memory.action_cache import ActionCache
 from ufo.agents.agent.host_agent import AgentFactory, HostAgent
 from ufo.agents.states.basic import AgentState, AgentStatus
+from ufo.automator.ui_control.image_store import ImageStore
 from ufo.automator.ui_control.screenshot import PhotographerFacade
+from ufo.automator.ui_control.settle import SettleWaiter
 from ufo.config.config import Config
-from ufo.experience.summarizer import ExperienceSummarizer
+from ufo.llm.hedging import HedgedCompletion
+from ufo.llm.service_pool import ServicePool
 from ufo.module.context import Context, ContextNames
+from ufo.module.profiler import PhaseProfiler
+from ufo.module.scheduler import DesktopScheduler
+from ufo.module.warmup import WarmUp
+from ufo.rag.retrieval_cache import RetrievalCache
+
+# Lazy import the experience summarizer, which loads langchain and FAISS, until an experience is saved.
+experience_summarizer = utils.LazyImport("..experience.summarizer")
 
 configs = Config.get_instance().config_data
 
@@ -109,8 +119,15 @@ class BaseRound(ABC):
 
             # If the subtask ends, capture the last snapshot of the application.
             if self.state.is_subtask_end():
-                time.sleep(configs["SLEEP_TIME"])
-                self.capture_last_snapshot(sub_round_id=self.subtask_amount)
+                with DesktopScheduler.desktop_phase():
+                    SettleWaiter.wait_until_settled(
+                        self.application_window,
+                        configs["CONTROL_BACKEND"],
+                        self.context.get(ContextNames.SETTLE_LOGGER),
+                        round=self.id,
+                        subtask=self.subtask_amount,
+                    )
+                    self.capture_last_snapshot(sub_round_id=self.subtask_amount)
                 self.subtask_amount += 1
 
         self.agent.blackboard.add_requests(
@@ -118,7 +135,8 @@ class BaseRound(ABC):
         )
 
         if self.application_window is not None:
-            self.capture_last_snapshot()
+            with DesktopScheduler.desktop_phase():
+                self.capture_last_snapshot()
 
         if self._should_evaluate:
             self.evaluation()
@@ -327,6 +345,7 @@ class BaseSession(ABC):
         utils.create_folder(self.log_path)
 
         self._rounds: Dict[int, BaseRound] = {}
+        self._evaluation_result: Dict[str, str] = {}
 
         self._context = Context()
         self._init_context()
@@ -342,6 +361,10 @@ class BaseSession(ABC):
             configs["ALLOW_OPENAPP"],
         )
 
+        # Load the resources of the first steps in the background, while the user types the first request.
+        if configs.get("WARM_UP", False):
+            self.context.set(ContextNames.WARM_UP, WarmUp.from_config().start())
+
     def run(self) -> None:
         """
         Run the session.
@@ -354,13 +377,24 @@ class BaseSession(ABC):
                 break
             round.run()
 
+        # Make sure the screenshots saved in the background are on disk before they are evaluated or summarized.
+        PhotographerFacade.flush_saved_images()
+
         if self.application_window is not None:
-            self.capture_last_snapshot()
+            with DesktopScheduler.desktop_phase():
+                self.capture_last_snapshot()
 
         if self._should_evaluate and not self.is_error():
             self.evaluation()
 
         self.print_cost()
+        self.print_service_pool_stats()
+        self.print_hedging_stats()
+        self.print_retrieval_cache_stats()
+        self.print_action_cache_stats()
+        self.print_image_store_stats()
+        self.print_warm_up_stats()
+        self.print_profile_summary()
 
     @abstractmethod
     def create_new_round(self) -> Optional[BaseRound]:
@@ -404,12 +438,22 @@ class BaseSession(ABC):
         logger = self.initialize_logger(self.log_path, "response.log")
         request_logger = self.initialize_logger(self.log_path, "request.log")
         eval_logger = self.initialize_logger(self.log_path, "evaluation.log")
+        settle_logger = self.initialize_logger(self.log_path, "settle.log")
 
         self.context.set(ContextNames.LOG_PATH, self.log_path)
 
         self.context.set(ContextNames.LOGGER, logger)
         self.context.set(ContextNames.REQUEST_LOGGER, request_logger)
         self.context.set(ContextNames.EVALUATION_LOGGER, eval_logger)
+        self.context.set(ContextNames.SETTLE_LOGGER, settle_logger)
+
+        # Initialize the profiler of the step phases
+        if configs.get("PROFILE_PHASES", False):
+            profile_logger = self.initialize_logger(self.log_path, "profile.log")
+            self.context.set(
+                ContextNames.PROFILER,
+                PhaseProfiler(profile_logger, configs.get("PROFILE_MEMORY", False)),
+            )
 
         # Initialize the session cost and step
         self.context.set(ContextNames.SESSION_COST, 0)
@@ -514,7 +558,7 @@ class BaseSession(ABC):
             "Summarizing and saving the execution flow as experience...", "yellow"
         )
 
-        summarizer = ExperienceSummarizer(
+        summarizer = experience_summarizer.ExperienceSummarizer(
             configs["APP_AGENT"]["VISUAL_MODE"],
             configs["EXPERIENCE_PROMPT"],
             configs["APPAGENT_EXAMPLE_PROMPT"],
@@ -554,6 +598,126 @@ class BaseSession(ABC):
                 "yellow",
             )
 
+    def print_service_pool_stats(self) -> None:
+        """
+        Print the reuse counters of the pooled LLM services.
+        """
+
+        stats = ServicePool.stats()
+        saved_per_step = stats["saved_time"] / self.step if self.step else 0.0
+        utils.print_with_color(
+            "LLM service pool: {hits} hits, {misses} misses, {saved:.3f}s client setup saved ({per_step:.3f}s per step).".format(
+                hits=stats["hits"],
+                misses=stats["misses"],
+                saved=stats["saved_time"],
+                per_step=saved_per_step,
+            ),
+            "yellow",
+        )
+        if stats["http_requests"]:
+            utils.print_with_color(
+                "LLM HTTP connections: {reused} of {requests} requests reused a connection, {new} new connections.".format(
+                    reused=stats["reused_connections"],
+                    requests=stats["http_requests"],
+                    new=stats["new_connections"],
+                ),
+                "yellow",
+            )
+
+    def print_hedging_stats(self) -> None:
+        """
+        Print the counters of the hedged LLM requests, if any request was hedged.
+        """
+
+        stats = HedgedCompletion.stats()
+        if stats["requests"] == 0:
+            return
+
+        utils.print_with_color(
+            "Hedged LLM requests: {requests} requests, {hedged} hedged, {hedge_wins} won by the hedge engine.".format(
+                **stats
+            ),
+            "yellow",
+        )
+
+    def print_retrieval_cache_stats(self) -> None:
+        """
+        Print the counters of the retrieval cache, if any retrieval was made.
+        """
+
+        stats = RetrievalCache.stats()
+        if stats["hits"] + stats["misses"] == 0:
+            return
+
+        utils.print_with_color(
+            "Retrieval cache: {hits} hits, {misses} misses, {size} results cached.".format(
+                **stats
+            ),
+            "yellow",
+        )
+
+    def print_action_cache_stats(self) -> None:
+        """
+        Print the counters of the action cache, if it was looked up.
+        """
+
+        stats = ActionCache.stats()
+        if stats["hits"] + stats["misses"] == 0:
+            return
+
+        utils.print_with_color(
+            "Action cache: {hits} hits, {misses} misses, {size} actions cached.".format(
+                **stats
+            ),
+            "yellow",
+        )
+
+    def print_profile_summary(self) -> None:
+        """
+        Print the percentiles of the step phases and write them to the profile log, if the profiler is enabled.
+        """
+
+        profiler = self.context.get(ContextNames.PROFILER)
+        if profiler is not None:
+            profiler.finish()
+
+    def print_image_store_stats(self) -> None:
+        """
+        Print the counters of the screenshot store of the session, if any screenshot was stored.
+        """
+
+        stats = ImageStore.for_directory(self.log_path).stats()
+        if stats["saved"] + stats["deduplicated"] == 0:
+            return
+
+        utils.print_with_color(
+            "Screenshot store: {images} screenshots in {blobs} blobs, {deduplicated} duplicates not saved again.".format(
+                **stats
+            ),
+            "yellow",
+        )
+
+    def print_warm_up_stats(self) -> None:
+        """
+        Print the counters of the warm-up of the session, if it is enabled.
+        """
+
+        warm_up = self.context.get(ContextNames.WARM_UP)
+        if warm_up is None:
+            return
+
+        stats = warm_up.stats()
+        utils.print_with_color(
+            "Warm-up: {resources} resources loaded in {time:.2f}s, the steps waited {waited:.2f}s for them.".format(
+                **stats
+            ),
+            "yellow",
+        )
+        for name, error in stats["errors"].items():
+            utils.print_with_color(
+                f"Warning: Failed to warm up {name}: {error}", "yellow"
+            )
+
     def is_error(self):
         """
         Check if the session is in error state.
@@ -610,6 +774,23 @@ class BaseSession(ABC):
         evaluator.print_response(result)
 
         self.evaluation_logger.info(json.dumps(result))
+        self._evaluation_result = result
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get the summary of the session, to be aggregated with the other sessions of a batch.
+        return: The summary of the session.
+        """
+        return {
+            "id": self._id,
+            "session_type": self.session_type,
+            "log_path": self.log_path,
+            "rounds": self.total_rounds,
+            "steps": self.step,
+            "cost": self.cost,
+            "error": self.is_error(),
+            "evaluation": self._evaluation_result.get("complete", ""),
+        }
 
     @property
     def session_type(self) -> str:
@@ -2,9 +2,20 @@
 # Licensed under the MIT License.
 
 
-from typing import List
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
 
+from ufo import utils
+from ufo.automator.ui_control.fake_desktop import FakeDesktop
+from ufo.config.config import Config
 from ufo.module.basic import BaseSession
+from ufo.module.scheduler import DesktopScheduler
+
+configs = Config.get_instance().config_data
 
 
 class UFOClientManager:
@@ -12,20 +23,117 @@ class UFOClientManager:
     The manager for the UFO clients.
     """
 
-    def __init__(self, session_list: List[BaseSession]) -> None:
+    def __init__(self, session_list: List[BaseSession], workers: int = 1) -> None:
         """
         Initialize a batch UFO client.
+        :param session_list: The sessions to run.
+        :param workers: The number of sessions to run concurrently.
         """
 
         self._session_list = session_list
+        self._workers = max(1, workers)
+        self._summaries: List[Dict[str, Any]] = []
 
     def run_all(self) -> None:
         """
-        Run the batch UFO client.
+        Run the batch UFO client. With more than one worker, the sessions run concurrently:
+        their LLM calls overlap, while their desktop phases are serialised unless each session has its own fake desktop.
+        """
+
+        if self._workers == 1:
+            self._summaries = [
+                self.run_session(session) for session in self.session_list
+            ]
+        else:
+            DesktopScheduler.enable(not configs.get("FAKE_DESKTOP", False))
+            try:
+                with ThreadPoolExecutor(max_workers=self._workers) as executor:
+                    self._summaries = list(
+                        executor.map(self.run_session, self.session_list)
+                    )
+            finally:
+                DesktopScheduler.enable(False)
+
+        if len(self._summaries) > 1:
+            self.print_summary()
+
+    @staticmethod
+    def run_session(session: BaseSession) -> Dict[str, Any]:
+        """
+        Run a session and summarize it. An exception in the session does not stop the other sessions of the batch.
+        :param session: The session to run.
+        :return: The summary of the session.
         """
 
-        for session in self.session_list:
+        # Every session starts from a fresh fake desktop, even on a reused worker thread.
+        if configs.get("FAKE_DESKTOP", False):
+            FakeDesktop.reset()
+
+        start_time = time.time()
+        exception = ""
+
+        try:
             session.run()
+        except Exception:
+            exception = traceback.format_exc()
+            utils.print_with_color(
+                f"Session {session.log_path} failed: {exception}", "red"
+            )
+
+        summary = session.summary()
+        summary["time"] = time.time() - start_time
+        summary["exception"] = exception
+
+        return summary
+
+    @property
+    def summaries(self) -> List[Dict[str, Any]]:
+        """
+        Get the summaries of the sessions run by run_all.
+        :return: The summaries of the sessions.
+        """
+        return self._summaries
+
+    def print_summary(self) -> None:
+        """
+        Print the aggregated summary of the sessions.
+        """
+
+        total_cost = sum(
+            summary["cost"]
+            for summary in self._summaries
+            if isinstance(summary["cost"], float)
+        )
+        failed = sum(
+            1 for summary in self._summaries if summary["error"] or summary["exception"]
+        )
+        completed = sum(
+            1 for summary in self._summaries if summary["evaluation"] == "yes"
+        )
+
+        utils.print_with_color(
+            "Batch summary: {num} sessions, {failed} failed, {completed} evaluated as complete, {steps} steps, total cost ${cost:.2f}.".format(
+                num=len(self._summaries),
+                failed=failed,
+                completed=completed,
+                steps=sum(summary["steps"] for summary in self._summaries),
+                cost=total_cost,
+            ),
+            "yellow",
+        )
+
+    def save_summary(self, summary_path: str) -> None:
+        """
+        Save the summaries of the sessions into a JSON file.
+        :param summary_path: The path of the summary file.
+        """
+
+        if not self._summaries:
+            return
+
+        utils.create_folder(os.path.dirname(summary_path))
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(self._summaries, f, indent=4)
 
     @property
     def session_list(self) -> List[BaseSession]:
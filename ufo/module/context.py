@@ -27,6 +27,7 @@ class ContextNames(Enum):
     REQUEST_LOGGER = "REQUEST_LOGGER"  # The logger for the LLM request
     LOGGER = "LOGGER"  # The logger for the session
     EVALUATION_LOGGER = "EVALUATION_LOGGER"  # The logger for the evaluation
+    SETTLE_LOGGER = "SETTLE_LOGGER"  # The logger for the waits until the UI is settled
     ROUND_STEP = "ROUND_STEP"  # The step of all rounds
     SESSION_STEP = "SESSION_STEP"  # The step of the current session
     CURRENT_ROUND_ID = "CURRENT_ROUND_ID"  # The ID of the current round
@@ -47,6 +48,8 @@ class ContextNames(Enum):
         "CURRENT_ROUND_SUBTASK_AMOUNT"  # The amount of subtasks in the current round
     )
     STRUCTURAL_LOGS = "STRUCTURAL_LOGS"  # The structural logs of the session
+    PROFILER = "PROFILER"  # The profiler of the phases of the steps, None if disabled
+    WARM_UP = "WARM_UP"  # The warm-up of the resources of the steps, None if disabled
 
     @property
     def default_value(self) -> Any:
@@ -91,6 +94,7 @@ class ContextNames(Enum):
             self == ContextNames.REQUEST_LOGGER
             or self == ContextNames.LOGGER
             or self == ContextNames.EVALUATION_LOGGER
+            or self == ContextNames.SETTLE_LOGGER
         ):
             return None  # Assuming Logger should be initialized elsewhere
         elif self == ContextNames.APPLICATION_WINDOW:
@@ -144,6 +148,7 @@ class ContextNames(Enum):
             self == ContextNames.REQUEST_LOGGER
             or self == ContextNames.LOGGER
             or self == ContextNames.EVALUATION_LOGGER
+            or self == ContextNames.SETTLE_LOGGER
         ):
             return Logger
         elif self == ContextNames.APPLICATION_WINDOW:
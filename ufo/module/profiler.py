@@ -0,0 +1,333 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+import logging
+import math
+import threading
+import time
+import tracemalloc
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Type
+
+from ufo.utils import print_with_color
+
+
+class ProfileExporter(ABC):
+    """
+    The exporter of the profiles of the steps, e.g. to a metrics backend. The exporters are registered to the
+    PhaseProfiler with PhaseProfiler.register.
+    """
+
+    @abstractmethod
+    def export_step(self, record: Dict[str, Any]) -> None:
+        """
+        Export the profile of a step.
+        :param record: The profile of the step, as written to the profile log.
+        """
+        pass
+
+    def export_summary(self, summary: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+        """
+        Export the summary of the session.
+        :param summary: The percentiles of each phase of each agent type.
+        """
+        pass
+
+
+class PhaseTimer:
+    """
+    The timer of a phase of a step, measuring the wall time, the CPU time of the thread and the peak of the memory
+    allocated during the phase.
+    """
+
+    def __init__(self, step: "StepProfile", name: str) -> None:
+        """
+        Initialize the timer.
+        :param step: The profile of the step.
+        :param name: The name of the phase.
+        """
+        self.step = step
+        self.name = name
+        self._wall = 0.0
+        self._cpu = 0.0
+        self._memory = 0
+
+    def __enter__(self) -> "PhaseTimer":
+        if self.step.trace_memory:
+            self._memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        peak = (
+            max(0, tracemalloc.get_traced_memory()[1] - self._memory)
+            if self.step.trace_memory
+            else None
+        )
+        self.step.add_phase(self.name, wall, cpu, peak)
+
+
+class NullPhaseTimer:
+    """
+    The timer used when the profiler is disabled, doing nothing.
+    """
+
+    def __enter__(self) -> "NullPhaseTimer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+class StepProfile:
+    """
+    The profile of the phases of a processor step.
+    """
+
+    def __init__(
+        self, profiler: "PhaseProfiler", agent_type: str, info: Dict[str, Any]
+    ) -> None:
+        """
+        Initialize the profile of the step.
+        :param profiler: The profiler of the session.
+        :param agent_type: The type of the agent executing the step, e.g. AppAgent.
+        :param info: The information of the step written with the profile, e.g. the step number.
+        """
+        self.profiler = profiler
+        self.agent_type = agent_type
+        self.info = info
+        self.trace_memory = profiler.trace_memory
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self._start_time = time.perf_counter()
+
+    def phase(self, name: str) -> PhaseTimer:
+        """
+        Time a phase of the step.
+        :param name: The name of the phase.
+        :return: The timer, to be used as a context manager.
+        """
+        return PhaseTimer(self, name)
+
+    def add_phase(
+        self, name: str, wall: float, cpu: float, peak: Optional[int]
+    ) -> None:
+        """
+        Add the measures of a phase. The measures of a phase run twice in the step are summed, with the largest peak.
+        :param name: The name of the phase.
+        :param wall: The wall time in seconds.
+        :param cpu: The CPU time of the thread in seconds.
+        :param peak: The peak of the memory allocated in bytes, None if the memory is not traced.
+        """
+        phase = self.phases.setdefault(
+            name, {"wall": 0.0, "cpu": 0.0, "peak_alloc": peak, "calls": 0}
+        )
+        phase["wall"] += wall
+        phase["cpu"] += cpu
+        phase["calls"] += 1
+        if peak is not None:
+            phase["peak_alloc"] = max(phase["peak_alloc"] or 0, peak)
+
+    def finish(self) -> None:
+        """
+        Finish the step and hand its profile to the profiler.
+        """
+        self.profiler.record_step(self, time.perf_counter() - self._start_time)
+
+
+class NullStepProfile:
+    """
+    The profile of a step when the profiler is disabled, doing nothing.
+    """
+
+    _timer = NullPhaseTimer()
+
+    def phase(self, name: str) -> NullPhaseTimer:
+        return self._timer
+
+    def finish(self) -> None:
+        pass
+
+
+class PhaseProfiler:
+    """
+    The profiler of the phases of the processor steps of a session. The profile of each step is written as a JSON line
+    to the profile log and handed to the registered exporters, and the wall times are aggregated into percentiles per
+    agent type and phase.
+    """
+
+    _exporters: List[ProfileExporter] = []
+    _exporters_lock = threading.Lock()
+
+    # The profile of the steps when the profiler is disabled.
+    disabled = NullStepProfile()
+
+    def __init__(
+        self, logger: Optional[logging.Logger] = None, trace_memory: bool = False
+    ) -> None:
+        """
+        Initialize the profiler.
+        :param logger: The logger of the profiles of the steps.
+        :param trace_memory: Whether to trace the peak of the memory allocated in each phase. Tracing the allocations
+        slows the process down.
+        """
+        self.logger = logger
+        self.trace_memory = trace_memory
+        self._wall_times: Dict[str, Dict[str, List[float]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        self._lock = threading.Lock()
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def register(cls, exporter_class: Type[ProfileExporter]) -> Type[ProfileExporter]:
+        """
+        Decorator to register an exporter class, instantiated without arguments.
+        :param exporter_class: The exporter class.
+        :return: The exporter class.
+        """
+        cls.add_exporter(exporter_class())
+        return exporter_class
+
+    @classmethod
+    def add_exporter(cls, exporter: ProfileExporter) -> None:
+        """
+        Register an exporter.
+        :param exporter: The exporter.
+        """
+        with cls._exporters_lock:
+            cls._exporters.append(exporter)
+
+    @classmethod
+    def remove_exporter(cls, exporter: ProfileExporter) -> None:
+        """
+        Unregister an exporter.
+        :param exporter: The exporter.
+        """
+        with cls._exporters_lock:
+            if exporter in cls._exporters:
+                cls._exporters.remove(exporter)
+
+    @classmethod
+    def _export(cls, method: str, data: Dict[str, Any]) -> None:
+        """
+        Hand the data to the exporters. A failing exporter is reported and does not stop the session.
+        :param method: The method of the exporters to call.
+        :param data: The data.
+        """
+        with cls._exporters_lock:
+            exporters = list(cls._exporters)
+        for exporter in exporters:
+            try:
+                getattr(exporter, method)(data)
+            except Exception as e:
+                print_with_color(
+                    f"Warning: The profile exporter {type(exporter).__name__} failed: {e}",
+                    "yellow",
+                )
+
+    def start_step(self, agent_type: str, **info: Any) -> StepProfile:
+        """
+        Start the profile of a step.
+        :param agent_type: The type of the agent executing the step.
+        :param info: The information of the step written with the profile.
+        :return: The profile of the step.
+        """
+        return StepProfile(self, agent_type, info)
+
+    def record_step(self, step: StepProfile, total: float) -> None:
+        """
+        Record the profile of a finished step.
+        :param step: The profile of the step.
+        :param total: The wall time of the whole step in seconds.
+        """
+        with self._lock:
+            wall_times = self._wall_times[step.agent_type]
+            for name, phase in step.phases.items():
+                wall_times[name].append(phase["wall"])
+            wall_times["total"].append(total)
+
+        record = dict(
+            step.info,
+            Agent=step.agent_type,
+            Total=round(total, 6),
+            Phases={
+                name: dict(
+                    phase, wall=round(phase["wall"], 6), cpu=round(phase["cpu"], 6)
+                )
+                for name, phase in step.phases.items()
+            },
+        )
+        if self.logger is not None:
+            self.logger.info(json.dumps(record))
+        self._export("export_step", record)
+
+    @staticmethod
+    def percentile(values: List[float], percent: float) -> float:
+        """
+        Get a percentile of the values, by the nearest rank.
+        :param values: The values.
+        :param percent: The percentile, between 0 and 100.
+        :return: The percentile.
+        """
+        values = sorted(values)
+        rank = max(0, math.ceil(percent / 100 * len(values)) - 1)
+        return values[min(rank, len(values) - 1)]
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Aggregate the wall times of the steps.
+        :return: The count, mean, p50, p95 and p99 of each phase of each agent type, in seconds.
+        """
+        with self._lock:
+            wall_times = {
+                agent_type: {name: list(values) for name, values in phases.items()}
+                for agent_type, phases in self._wall_times.items()
+            }
+
+        return {
+            agent_type: {
+                name: {
+                    "count": len(values),
+                    "mean": sum(values) / len(values),
+                    "p50": self.percentile(values, 50),
+                    "p95": self.percentile(values, 95),
+                    "p99": self.percentile(values, 99),
+                }
+                for name, values in phases.items()
+            }
+            for agent_type, phases in wall_times.items()
+        }
+
+    def finish(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Finish the session: write the summary to the profile log, hand it to the exporters and print it as a table.
+        :return: The summary.
+        """
+        summary = self.summary()
+        if not summary:
+            return summary
+
+        if self.logger is not None:
+            self.logger.info(json.dumps({"Summary": summary}))
+        self._export("export_summary", summary)
+
+        lines = [
+            f"{'Agent':<16}{'Phase':<22}{'Count':>6}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}"
+        ]
+        for agent_type, phases in summary.items():
+            for name, stats in phases.items():
+                lines.append(
+                    f"{agent_type:<16}{name:<22}{stats['count']:>6}"
+                    f"{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}"
+                )
+        print_with_color("Step phase profile:\n" + "\n".join(lines), "yellow")
+
+        return summary
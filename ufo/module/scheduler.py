@@ -0,0 +1,45 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class DesktopScheduler:
+    """
+    The scheduler of the desktop-interaction phases of concurrent sessions.
+    When enabled, only one session at a time can capture, inspect or act on the desktop, while the LLM calls of all the sessions overlap.
+    """
+
+    _lock = threading.RLock()
+    _enabled = False
+
+    @classmethod
+    def enable(cls, enabled: bool = True) -> None:
+        """
+        Enable or disable the serialisation of the desktop phases.
+        :param enabled: Whether to serialise the desktop phases.
+        """
+        cls._enabled = enabled
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        """
+        Check whether the desktop phases are serialised.
+        :return: True if the desktop phases are serialised, otherwise False.
+        """
+        return cls._enabled
+
+    @classmethod
+    @contextmanager
+    def desktop_phase(cls) -> Iterator[None]:
+        """
+        The context of a desktop-interaction phase. It holds the desktop lock if the scheduler is enabled.
+        """
+        if not cls._enabled:
+            yield
+            return
+
+        with cls._lock:
+            yield
@@ -0,0 +1,167 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from ufo import utils
+from ufo.automator.ui_control.control_filter import ControlFilterFactory
+from ufo.automator.ui_control.screenshot import AnnotationDecorator
+from ufo.config.config import Config
+from ufo.llm.service_pool import ServicePool
+
+# Lazy import the registry of the vector databases, which loads langchain and FAISS, until a database is preloaded.
+registry = utils.LazyImport("..rag.registry")
+
+configs = Config.get_instance().config_data
+
+
+class WarmUp:
+    """
+    The warm-up of the resources needed by the first steps of a session, e.g. the models of the control filters and the
+    vector databases, loaded on a background thread while the user types the first request. The resources are kept in
+    their process-wide caches, and the steps wait until the warm-up is ready before using them.
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+
+    def __init__(self, tasks: Dict[str, Callable[[], Any]]) -> None:
+        """
+        Initialize the warm-up.
+        :param tasks: The loading tasks, keyed by the name of the resource.
+        """
+        self.tasks = tasks
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.waited = 0.0
+        self._future: Optional[Future] = None
+
+    @classmethod
+    def from_config(cls) -> "WarmUp":
+        """
+        Create the warm-up of the resources the configuration will need.
+        :return: The warm-up.
+        """
+        tasks: Dict[str, Callable[[], Any]] = {}
+
+        agent_types = ["HOST_AGENT", "APP_AGENT"]
+        if configs.get("HEDGE_REQUESTS", False):
+            agent_types.append(configs.get("HEDGE_AGENT", "BACKUP_AGENT"))
+        for agent_type in agent_types:
+            if agent_type in configs:
+                tasks[f"llm_service:{agent_type}"] = partial(
+                    ServicePool.get_service, configs, agent_type
+                )
+
+        control_filter_types = [
+            control_filter_type.lower()
+            for control_filter_type in configs.get("CONTROL_FILTER_TYPE", [])
+        ]
+        for control_filter_type in ["semantic", "icon"]:
+            if control_filter_type in control_filter_types:
+                model_name = configs[
+                    f"CONTROL_FILTER_MODEL_{control_filter_type.upper()}_NAME"
+                ]
+                tasks[f"control_filter:{control_filter_type}"] = partial(
+                    ControlFilterFactory.create_control_filter,
+                    control_filter_type,
+                    model_name,
+                )
+
+        databases = {
+            "RAG_EXPERIENCE": ("EXPERIENCE_SAVED_PATH", "experience_db"),
+            "RAG_DEMONSTRATION": ("DEMONSTRATION_SAVED_PATH", "demonstration_db"),
+        }
+        for key, (path_key, db_name) in databases.items():
+            db_path = os.path.join(configs.get(path_key, ""), db_name)
+            if configs.get(key, False) and os.path.exists(db_path):
+                tasks[f"vector_db:{db_name}"] = (
+                    lambda db_path=db_path: registry.VectorDBRegistry.load_local(
+                        db_path
+                    )
+                )
+
+        tasks["annotation_font"] = AnnotationDecorator.load_font
+
+        return cls(tasks)
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """
+        Get the thread running the warm-ups.
+        :return: The thread pool.
+        """
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="ufo-warmup"
+                )
+            return cls._executor
+
+    def start(self) -> "WarmUp":
+        """
+        Start loading the resources in the background.
+        :return: The warm-up.
+        """
+        self._future = self._get_executor().submit(self._run)
+        return self
+
+    def _run(self) -> None:
+        """
+        Load the resources. A resource failing to load is reported, and is loaded again by the step needing it.
+        """
+        for name, task in self.tasks.items():
+            start_time = time.perf_counter()
+            try:
+                task()
+            except Exception as e:
+                self.errors[name] = str(e)
+            self.timings[name] = time.perf_counter() - start_time
+
+    @property
+    def future(self) -> Optional[Future]:
+        """
+        Get the readiness future of the warm-up.
+        :return: The future, None if the warm-up is not started.
+        """
+        return self._future
+
+    @property
+    def ready(self) -> bool:
+        """
+        Check whether the resources are loaded.
+        :return: True if the warm-up is done or not started.
+        """
+        return self._future is None or self._future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the resources are loaded.
+        :param timeout: The maximum time to wait in seconds, no limit if not given.
+        :return: True if the warm-up is done.
+        """
+        if self.ready:
+            return True
+
+        start_time = time.perf_counter()
+        wait([self._future], timeout=timeout)
+        self.waited += time.perf_counter() - start_time
+
+        return self.ready
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the counters of the warm-up.
+        :return: The number of resources loaded, the loading time, the time the steps waited, and the errors.
+        """
+        return {
+            "resources": len(self.timings) - len(self.errors),
+            "time": sum(self.timings.values()),
+            "waited": self.waited,
+            "errors": dict(self.errors),
+        }
@@ -2,7 +2,7 @@
 # Licensed under the MIT License.
 
 import json
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from ufo.config.config import Config
 from ufo.prompter.basic import BasicPrompter
@@ -40,6 +40,13 @@ class HostAgentPrompter(BasicPrompter):
         Construct the prompt for app selection.
         return: The prompt for app selection.
         """
+        return self.memoize_system_prompt((), self._system_prompt_construction)
+
+    def _system_prompt_construction(self) -> str:
+        """
+        Render the prompt for app selection, without memoization.
+        return: The prompt for app selection.
+        """
         if self.allow_openapp:
             open_app_guideline = self.prompt_template.get("open_app_guideline", "")
             open_app_comment = self.prompt_template.get("open_app_comment", "")
@@ -234,6 +241,21 @@ class AppAgentPrompter(BasicPrompter):
         return: The prompt for app selection.
         """
 
+        return self.memoize_system_prompt(
+            (json.dumps(additional_examples), tuple(tips)),
+            lambda: self._system_prompt_construction(additional_examples, tips),
+        )
+
+    def _system_prompt_construction(
+        self, additional_examples: List[str] = [], tips: List[str] = []
+    ) -> str:
+        """
+        Render the prompt for app selection, without memoization.
+        :param additional_examples: The additional examples added to the prompt.
+        :param tips: The tips added to the prompt.
+        return: The prompt for app selection.
+        """
+
         apis = self.api_prompt_helper(verbose=1)
         examples = self.examples_prompt_helper(additional_examples=additional_examples)
         tips_prompt = "\n".join(tips)
@@ -296,6 +318,7 @@ class AppAgentPrompter(BasicPrompter):
         host_message: List[str],
         retrieved_docs: str = "",
         include_last_screenshot: bool = True,
+        ui_changes: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, str]]:
         """
         Construct the prompt for LLMs.
@@ -308,6 +331,7 @@ class AppAgentPrompter(BasicPrompter):
         :param current_application: The current application.
         :param host_message: The host message.
         :param retrieved_docs: The retrieved documents.
+        :param ui_changes: The changes of the controls since the last step, omitted if None.
         return: The prompt for LLMs.
         """
 
@@ -325,6 +349,16 @@ class AppAgentPrompter(BasicPrompter):
                 user_content.append({"type": "text", "text": screenshot_text[i]})
                 user_content.append({"type": "image_url", "image_url": {"url": image}})
 
+        if ui_changes:
+            user_content.append(
+                {
+                    "type": "text",
+                    "text": "<Control Changes Since the Last Step:> {changes}".format(
+                        changes=json.dumps(ui_changes)
+                    ),
+                }
+            )
+
         user_content.append(
             {
                 "type": "text",
@@ -405,6 +439,11 @@ class AppAgentPrompter(BasicPrompter):
 
             api_list.append(api_text)
 
+        if configs.get("ACTION_BATCH", False):
+            api_list.append(
+                '- You can chain several UI element actions in one step when their outcome does not need to be observed before the next action, e.g. clicking a field, typing a text, then typing in the next field. Add the field "ActionList" to your response with the ordered list of the actions, each in the format {"ControlLabel": <label>, "ControlText": <text>, "Function": <action type>, "Args": <arguments>}, and fill ControlLabel, ControlText, Function and Args with the first action of the list. All the controls must be in the current <Available Control Item>. The actions are executed in order until the first failure, and you will observe the application only after the whole list.'
+            )
+
         # Construct the prompt for COM APIs
         if self.app_api_prompt_template:
 
@@ -467,11 +506,13 @@ class FollowerAgentPrompter(AppAgentPrompter):
         else:
             self.app_info_prompt_template = None
 
-    def system_prompt_construction(
+    def _system_prompt_construction(
         self, additional_examples: List[str] = [], tips: List[str] = []
     ) -> str:
         """
-        Construct the prompt for app selection.
+        Render the prompt for app selection, without memoization.
+        :param additional_examples: The additional examples added to the prompt.
+        :param tips: The tips added to the prompt.
         return: The prompt for app selection.
         """
 
@@ -1,12 +1,14 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import copy
 import os
 from abc import ABC, abstractmethod
-from typing import Dict, List, Union
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
 
 import yaml
 
+from ufo.config.config import YAMLLoader
 from ufo.utils import print_with_color
 
 
@@ -15,6 +17,9 @@ class BasicPrompter(ABC):
     The BasicPrompter class is the abstract class for the prompter.
     """
 
+    # The parsed templates shared by all the prompters, keyed by (path, mtime, is_visual).
+    _template_cache: Dict[Tuple[str, int, Optional[bool]], Any] = {}
+
     def __init__(
         self, is_visual: bool, prompt_template: str, example_prompt_template: str
     ):
@@ -36,10 +41,13 @@ class BasicPrompter(ABC):
         else:
             self.example_prompt_template = ""
 
+        # The rendered system prompts, keyed by their dynamic inputs.
+        self._system_prompt_cache: Dict[Hashable, str] = {}
+
     @staticmethod
     def load_prompt_template(template_path: str, is_visual=None) -> Dict[str, str]:
         """
-        Load the prompt template.
+        Load the prompt template. The parsed templates are cached until the file is modified, and every caller gets its own copy.
         :return: The prompt template.
         """
 
@@ -54,14 +62,42 @@ class BasicPrompter(ABC):
             return {}
 
         if os.path.exists(path):
-            try:
-                prompt = yaml.safe_load(open(path, "r", encoding="utf-8"))
-            except yaml.YAMLError as exc:
-                print_with_color(f"Error loading prompt template: {exc}", "yellow")
+            key = (os.path.abspath(path), os.stat(path).st_mtime_ns, is_visual)
+            prompt = BasicPrompter._template_cache.get(key)
+            if prompt is None:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        prompt = yaml.load(f, Loader=YAMLLoader)
+                    BasicPrompter._template_cache[key] = prompt
+                except yaml.YAMLError as exc:
+                    print_with_color(f"Error loading prompt template: {exc}", "yellow")
         else:
             raise FileNotFoundError(f"Prompt template not found at {path}")
 
-        return prompt
+        # The prompters may modify their templates, e.g. the HostAgent removes the AppsToOpen of the examples.
+        return copy.deepcopy(prompt)
+
+    @staticmethod
+    def clear_template_cache() -> None:
+        """
+        Remove all the cached prompt templates.
+        """
+        BasicPrompter._template_cache.clear()
+
+    def memoize_system_prompt(self, key: Hashable, build: Callable[[], str]) -> str:
+        """
+        Memoize the system prompt of the prompter. The system prompt only depends on the templates loaded at initialization
+        and on the dynamic inputs in the key, so the same inputs give the byte-identical prompt, which lets the provider-side
+        prompt caching hit across steps.
+        :param key: The dynamic inputs of the system prompt.
+        :param build: The function rendering the system prompt.
+        :return: The system prompt.
+        """
+        if key not in self._system_prompt_cache:
+            if len(self._system_prompt_cache) >= 16:
+                self._system_prompt_cache.clear()
+            self._system_prompt_cache[key] = build()
+        return self._system_prompt_cache[key]
 
     @staticmethod
     def prompt_construction(
@@ -6,7 +6,11 @@ import json
 import os
 from typing import Dict, List, Optional
 
-from ufo.automator.ui_control.screenshot import PhotographerFacade
+from ufo.automator.ui_control.image_store import ImageStore
+from ufo.automator.ui_control.screenshot import (
+    ImageEncodingPolicy,
+    PhotographerFacade,
+)
 from ufo.config.config import Config
 from ufo.prompter.agent_prompter import APIPromptLoader
 from ufo.prompter.basic import BasicPrompter
@@ -168,7 +172,7 @@ class EvaluationAgentPrompter(BasicPrompter):
             if self.is_visual:
                 screenshot_path = os.path.join(log_path, f"action_step{step}.png")
 
-                if os.path.exists(screenshot_path):
+                if ImageStore.exists(screenshot_path):
                     screenshot_str = self.load_single_screenshot(screenshot_path)
                     user_content.append(
                         {"type": "image_url", "image_url": {"url": screenshot_str}}
@@ -181,7 +185,7 @@ class EvaluationAgentPrompter(BasicPrompter):
         if self.is_visual:
             final_screenshot_path = os.path.join(log_path, "action_step_final.png")
 
-            if os.path.exists(final_screenshot_path):
+            if ImageStore.exists(final_screenshot_path):
                 user_content.append({"type": "text", "text": "<Final Screenshot:>"})
                 screenshot_str = self.load_single_screenshot(final_screenshot_path)
 
@@ -249,11 +253,14 @@ class EvaluationAgentPrompter(BasicPrompter):
     @staticmethod
     def load_single_screenshot(screenshot_path: str) -> str:
         """
-        Load a single screenshot from the log path.
+        Load a single screenshot from the log path, resolved through the manifest of the log if it is stored as a blob.
         :param screenshot_path: The path of the screenshot.
         """
-        if os.path.exists(screenshot_path):
-            return PhotographerFacade().encode_image_from_path(screenshot_path)
+        if ImageStore.exists(screenshot_path):
+            return PhotographerFacade().encode_image_from_path(
+                screenshot_path,
+                policy=ImageEncodingPolicy.from_config("EVALUATION_AGENT"),
+            )
         return ""
 
     def get_max_step(self, log_path: str) -> int:
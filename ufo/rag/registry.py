@@ -0,0 +1,110 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
+
+from ufo.rag.retrieval_cache import RetrievalCache
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+
+class EmbeddingModelRegistry:
+    """
+    The process-wide registry of the embedding models, so that all the retrievers and summarizers share one copy of the model weights.
+    """
+
+    _models: Dict[str, HuggingFaceEmbeddings] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_embedding_model(
+        cls, model_name: str = DEFAULT_EMBEDDING_MODEL
+    ) -> HuggingFaceEmbeddings:
+        """
+        Get the embedding model, loading it on the first call.
+        :param model_name: The name of the embedding model.
+        :return: The embedding model.
+        """
+        with cls._lock:
+            if model_name not in cls._models:
+                cls._models[model_name] = HuggingFaceEmbeddings(model_name=model_name)
+            return cls._models[model_name]
+
+
+class VectorDBRegistry:
+    """
+    The process-wide cache of the loaded FAISS indexes, keyed by the path and the modification time of the index files.
+    An index rewritten on disk gets a new key, so a stale index is never returned.
+    """
+
+    _indexers: Dict[str, Tuple[int, FAISS]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def index_mtime(path: str) -> int:
+        """
+        Get the modification time of an index saved by FAISS.save_local.
+        :param path: The folder of the index.
+        :return: The latest modification time of the index files in nanoseconds.
+        """
+        mtimes = [
+            os.stat(os.path.join(path, file_name)).st_mtime_ns
+            for file_name in ("index.faiss", "index.pkl")
+            if os.path.exists(os.path.join(path, file_name))
+        ]
+        return max(mtimes) if mtimes else os.stat(path).st_mtime_ns
+
+    @classmethod
+    def load_local(
+        cls, path: str, model_name: str = DEFAULT_EMBEDDING_MODEL
+    ) -> FAISS:
+        """
+        Load the index from the path, reusing the loaded index if the files are unchanged.
+        The returned index is shared, it must not be modified by the caller.
+        :param path: The folder of the index.
+        :param model_name: The name of the embedding model of the index.
+        :return: The loaded index.
+        """
+        key = os.path.abspath(path)
+        mtime = cls.index_mtime(path)
+
+        with cls._lock:
+            cached = cls._indexers.get(key)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        embeddings = EmbeddingModelRegistry.get_embedding_model(model_name)
+        indexer = FAISS.load_local(path, embeddings)
+
+        with cls._lock:
+            stale = cls._indexers.get(key)
+            cls._indexers[key] = (mtime, indexer)
+
+        # The index was rewritten on disk, the results retrieved from its previous version are stale.
+        if stale is not None and stale[1] is not indexer:
+            RetrievalCache.invalidate(stale[1])
+
+        return indexer
+
+    @classmethod
+    def invalidate(cls, path: Optional[str] = None) -> None:
+        """
+        Drop the cached index of the path, or all the cached indexes if the path is not given, with their retrieval results.
+        :param path: The folder of the index.
+        """
+        with cls._lock:
+            if path is None:
+                cls._indexers.clear()
+                dropped = None
+            else:
+                dropped = cls._indexers.pop(os.path.abspath(path), None)
+
+        if path is None:
+            RetrievalCache.invalidate()
+        elif dropped is not None:
+            RetrievalCache.invalidate(dropped[1])
@@ -0,0 +1,133 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class RetrievalCache:
+    """
+    The process-wide LRU cache of the retrieval results, keyed by (index, query, top_k, filter).
+    The entries of an index are dropped when the index is rebuilt or merged, see VectorDBRegistry.invalidate.
+    """
+
+    _results: "OrderedDict[Tuple[Hashable, ...], Tuple[Any, List[Any]]]" = OrderedDict()
+    _lock = threading.Lock()
+    _max_size = 256
+
+    _hits = 0
+    _misses = 0
+    _generation = 0
+
+    @staticmethod
+    def filter_key(
+        filter: Any = None, filter_key: Optional[Hashable] = None
+    ) -> Optional[Hashable]:
+        """
+        Get the cache key of a retrieval filter.
+        :param filter: The filter of the retrieval, None, a metadata dict or a callable.
+        :param filter_key: The key given by the caller for a callable filter.
+        :return: The key of the filter, None if the filter is a callable without a key and the result cannot be cached.
+        """
+        if filter_key is not None:
+            return ("key", filter_key)
+        if filter is None:
+            return ("none",)
+        if isinstance(filter, dict):
+            return ("dict", json.dumps(filter, sort_keys=True, default=str))
+        return None
+
+    @classmethod
+    def get(
+        cls, indexer: Any, query: str, top_k: int, filter_key: Hashable
+    ) -> Optional[List[Any]]:
+        """
+        Get the cached result of a retrieval.
+        :param indexer: The index searched.
+        :param query: The query.
+        :param top_k: The number of documents retrieved.
+        :param filter_key: The key of the filter.
+        :return: The retrieved documents, None on a cache miss.
+        """
+        key = (id(indexer), query, top_k, filter_key)
+
+        with cls._lock:
+            entry = cls._results.get(key)
+            # The index is kept in the entry, so a new index reusing the id of a dropped one does not match.
+            if entry is None or entry[0] is not indexer:
+                cls._misses += 1
+                return None
+
+            cls._results.move_to_end(key)
+            cls._hits += 1
+            return list(entry[1])
+
+    @classmethod
+    def put(
+        cls,
+        indexer: Any,
+        query: str,
+        top_k: int,
+        filter_key: Hashable,
+        documents: List[Any],
+    ) -> None:
+        """
+        Cache the result of a retrieval.
+        :param indexer: The index searched.
+        :param query: The query.
+        :param top_k: The number of documents retrieved.
+        :param filter_key: The key of the filter.
+        :param documents: The retrieved documents.
+        """
+        key = (id(indexer), query, top_k, filter_key)
+
+        with cls._lock:
+            cls._results[key] = (indexer, list(documents))
+            cls._results.move_to_end(key)
+            while len(cls._results) > cls._max_size:
+                cls._results.popitem(last=False)
+
+    @classmethod
+    def invalidate(cls, indexer: Any = None) -> None:
+        """
+        Drop the cached results of an index, or all the cached results if the index is not given.
+        :param indexer: The index rebuilt or merged.
+        """
+        with cls._lock:
+            if indexer is None:
+                cls._results.clear()
+            else:
+                for key in [
+                    key for key, entry in cls._results.items() if entry[0] is indexer
+                ]:
+                    del cls._results[key]
+            cls._generation += 1
+
+    @classmethod
+    def generation(cls) -> int:
+        """
+        Get the number of invalidations, for the callers memoizing what they built from the retrieved documents.
+        :return: The generation of the cache.
+        """
+        return cls._generation
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """
+        Get the counters of the cache.
+        :return: The number of hits, misses and cached results.
+        """
+        return {"hits": cls._hits, "misses": cls._misses, "size": len(cls._results)}
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Remove all the cached results and reset the counters.
+        """
+        with cls._lock:
+            cls._results.clear()
+            cls._hits = 0
+            cls._misses = 0
+            cls._generation += 1
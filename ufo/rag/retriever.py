@@ -2,12 +2,12 @@
 # Licensed under the MIT License.
 
 from abc import ABC, abstractmethod
-
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+from typing import Hashable, Optional
 
 from ufo.config.config import get_offline_learner_indexer_config
 from ufo.rag import web_search
+from ufo.rag.registry import VectorDBRegistry
+from ufo.rag.retrieval_cache import RetrievalCache
 from ufo.utils import print_with_color
 
 
@@ -57,18 +57,34 @@ class Retriever(ABC):
         """
         pass
 
-    def retrieve(self, query: str, top_k: int, filter=None):
+    def retrieve(
+        self,
+        query: str,
+        top_k: int,
+        filter=None,
+        filter_key: Optional[Hashable] = None,
+    ):
         """
-        Retrieve the document from the given query.
+        Retrieve the document from the given query. The results are cached per index, see RetrievalCache.
         :param query: The query to retrieve the document from.
         :param top_k: The number of documents to retrieve.
         :filter: The filter to apply to the retrieved documents.
+        :param filter_key: The key identifying a callable filter. Without it, the results of a callable filter are not cached.
         :return: The document from the given query.
         """
         if not self.indexer:
             return None
 
-        return self.indexer.similarity_search(query, top_k, filter=filter)
+        cache_key = RetrievalCache.filter_key(filter, filter_key)
+        if cache_key is None:
+            return self.indexer.similarity_search(query, top_k, filter=filter)
+
+        documents = RetrievalCache.get(self.indexer, query, top_k, cache_key)
+        if documents is None:
+            documents = self.indexer.similarity_search(query, top_k, filter=filter)
+            RetrievalCache.put(self.indexer, query, top_k, cache_key, documents)
+
+        return documents
 
 
 class OfflineDocRetriever(Retriever):
@@ -112,11 +128,7 @@ class OfflineDocRetriever(Retriever):
             return None
 
         try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-mpnet-base-v2"
-            )
-            db = FAISS.load_local(path, embeddings)
-            return db
+            return VectorDBRegistry.load_local(path)
         except:
             print_with_color(
                 "Warning: Failed to load offline indexer from {path}.".format(
@@ -146,11 +158,7 @@ class ExperienceRetriever(Retriever):
         """
 
         try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-mpnet-base-v2"
-            )
-            db = FAISS.load_local(db_path, embeddings)
-            return db
+            return VectorDBRegistry.load_local(db_path)
         except:
             print_with_color(
                 "Warning: Failed to load experience indexer from {path}.".format(
@@ -216,11 +224,7 @@ class DemonstrationRetriever(Retriever):
         """
 
         try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-mpnet-base-v2"
-            )
-            db = FAISS.load_local(db_path, embeddings)
-            return db
+            return VectorDBRegistry.load_local(db_path)
         except:
             print_with_color(
                 "Warning: Failed to load demonstration indexer from {path}.".format(
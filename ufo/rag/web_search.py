@@ -4,10 +4,10 @@
 import requests
 from langchain.docstore.document import Document
 from langchain.text_splitter import HTMLHeaderTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 
 from ufo.config.config import Config
+from ufo.rag.registry import EmbeddingModelRegistry
 from ufo.utils import print_with_color
 
 configs = Config.get_instance().config_data
@@ -112,9 +112,7 @@ class BingSearchWeb:
         :param query: The query to create an indexer for.
         :return: The created indexer.
         """
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2"
-        )
+        embeddings = EmbeddingModelRegistry.get_embedding_model()
 
         db = FAISS.from_documents(documents, embeddings)
 
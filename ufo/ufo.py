@@ -33,6 +33,18 @@ args.add_argument(
     type=str,
     default="",
 )
+args.add_argument(
+    "--workers",
+    "-w",
+    help="The number of sessions to run concurrently. Default is 1.",
+    type=int,
+    default=1,
+)
+args.add_argument(
+    "--fake_desktop",
+    help="Replace the UI automator with an in-memory fake desktop, loaded from FAKE_DESKTOP_RECORDING if it is set.",
+    action="store_true",
+)
 
 
 parsed_args = args.parse_args()
@@ -47,13 +59,20 @@ def main():
 
     To use follower mode that follows a plan file or folder, run the following command:
     python -m ufo -t task_name -m follower -p path_to_plan_file_or_folder
+
+    To run the plans of a folder concurrently on the fake desktop, run the following command:
+    python -m ufo -t task_name -m follower -p path_to_plan_folder -w 8 --fake_desktop
     """
+    if parsed_args.fake_desktop:
+        configs["FAKE_DESKTOP"] = True
+
     sessions = SessionFactory().create_session(
         task=parsed_args.task, mode=parsed_args.mode, plan=parsed_args.plan
     )
 
-    clients = UFOClientManager(sessions)
+    clients = UFOClientManager(sessions, workers=parsed_args.workers)
     clients.run_all()
+    clients.save_summary(f"logs/{parsed_args.task}/session_summary.json")
 
 
 if __name__ == "__main__":
@@ -2,9 +2,12 @@
 # Licensed under the MIT License.
 
 import importlib
+import importlib.util
 import json
 import os
-from typing import Optional, Any, Dict
+import threading
+import types
+from typing import Optional, Any, Dict, List
 
 from colorama import Fore, Style, init
 
@@ -105,15 +108,54 @@ def revise_line_breaks(args: Dict[str, Any]) -> Dict[str, Any]:
     return args
 
 
-def LazyImport(module_name: str) -> Any:
+class LazyModule(types.ModuleType):
     """
-    Import a module as a global variable.
-    :param module_name: The name of the module to import.
-    :return: The imported module.
+    A module imported on the first access to one of its attributes, so that the heavy dependencies of the features
+    that are disabled are never loaded.
     """
-    global_name = module_name.split(".")[-1]
-    globals()[global_name] = importlib.import_module(module_name, __package__)
-    return globals()[global_name]
+
+    def __init__(self, module_name: str) -> None:
+        """
+        Initialize the lazy module.
+        :param module_name: The absolute name of the module.
+        """
+        super().__init__(module_name)
+        self._lazy_module: Optional[types.ModuleType] = None
+        self._lazy_lock = threading.Lock()
+
+    def _load(self) -> types.ModuleType:
+        """
+        Import the module, once.
+        :return: The imported module.
+        """
+        if self._lazy_module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    self._lazy_module = importlib.import_module(self.__name__)
+        return self._lazy_module
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Check whether the module is imported.
+        :return: True if the module is imported.
+        """
+        return self._lazy_module is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def __dir__(self) -> List[str]:
+        return dir(self._load())
+
+
+def LazyImport(module_name: str) -> LazyModule:
+    """
+    Import a module lazily: the module is only imported when one of its attributes is accessed.
+    :param module_name: The name of the module to import, relative to the ufo.utils package if it starts with a dot.
+    :return: The lazy module.
+    """
+    return LazyModule(importlib.util.resolve_name(module_name, __package__))
 
 
 def find_desktop_path() -> Optional[str]: